@@ -0,0 +1,162 @@
+import os
+import random
+
+# --------------------------
+# Synthetic C Corpus Generator
+# --------------------------
+# Every file is built from the same kinds of blocks: headers, block comments,
+# declarations, functions (short and long), lines with dense operators and a
+# few pathological long lines. The density decides how many of the generated
+# constructs violate a rule. The same seed always produces the same corpus.
+
+TYPES = [('int', 'i'), ('float', 'f'), ('double', 'd'), ('char', 'c'),
+         ('unsigned int', 'ui'), ('long int', 'li'), ('short', 'si')]
+
+
+def _name(rng, prefix, correct):
+    """Build a variable name with or without the Hungarian notation prefix"""
+    base = rng.choice(['count', 'value', 'index', 'total', 'size', 'flag', 'result'])
+    base += str(rng.randrange(1000))
+    return prefix + base.capitalize() if correct else base
+
+
+def _declaration(rng, density):
+    """Generate a variable declaration"""
+    var_type, prefix = rng.choice(TYPES)
+    correct = rng.random() >= density
+    if rng.random() < 0.2:
+        return f"    {var_type} a{prefix}Table{rng.randrange(1000)}[{rng.randrange(1, 64)}] = {{0}};"
+    return f"    {var_type} {_name(rng, prefix, correct)} = {rng.randrange(100)};"
+
+
+def _operator_line(rng, density, operands=6):
+    """Generate an assignment with many binary operators"""
+    spacing = '' if rng.random() < density else ' '
+    terms = [f"iValue{rng.randrange(100)}" for _ in range(operands)]
+    expression = terms[0]
+    for term in terms[1:]:
+        expression += f"{spacing}{rng.choice(['+', '-', '/', '*'])}{spacing}{term}"
+    return f"    iResult{spacing}={spacing}{expression};"
+
+
+def _block_comment(rng, density):
+    """Generate a comment, a multi-line block comment if it should violate A4"""
+    if rng.random() < density:
+        return ["/*", f" * Generated block comment {rng.randrange(1000)}", " */"]
+    return [f"// Generated comment {rng.randrange(1000)}"]
+
+
+def _function(rng, density, name, body_lines):
+    """Generate a function definition with the given body length"""
+    lines = []
+    if rng.random() < density:
+        lines.append(f"int {name}(int iValue0, int iValue1) {{")
+    else:
+        lines.append(f"int {name}(int iValue0, int iValue1)")
+        lines.append("{")
+    lines.append("    int iResult = 0;")
+    while len(lines) < body_lines:
+        choice = rng.random()
+        if choice < 0.4:
+            lines.append(_operator_line(rng, density))
+        elif choice < 0.7:
+            lines.append(_declaration(rng, density))
+        elif choice < 0.85:
+            lines.append("    if (iResult > iValue0)")
+            lines.append("    {")
+            lines.append("        iResult = iResult - 1;")
+            lines.append("    }")
+        else:
+            lines.extend("    " + line for line in _block_comment(rng, density))
+    lines.append("    return iResult;")
+    lines.append("}")
+    lines.append("")
+    return lines
+
+
+def generate_file(rng, line_count, density, long_line_operators=0):
+    """Generate the lines of one synthetic C file
+    Args:
+        rng: Seeded random.Random instance
+        line_count: Approximate number of lines
+        density: Share of constructs (0.0-1.0) that violate a rule
+        long_line_operators: Operators in one pathological long line (0: none)
+    Returns:
+        List of source lines
+    """
+    lines = ["#include <stdio.h>", "#include <stdlib.h>", '#include "Bench.h"', ""]
+    lines.append(f"#define BENCH_SIZE {rng.randrange(1, 100)}")
+    lines.append("")
+    for _ in range(5):
+        lines.append(_declaration(rng, density).strip())
+    lines.append("")
+    lines += _function(rng, density, "main", 12)
+    function = 0
+    while len(lines) < line_count:
+        lines += _block_comment(rng, density)
+        # Every fifth function is longer than the 40 lines allowed by A6
+        body = rng.randrange(45, 120) if function % 5 == 0 else rng.randrange(8, 35)
+        lines += _function(rng, density, f"bench{function}", body)
+        function += 1
+    if long_line_operators:
+        lines.append("int iLong = 0;")
+        lines.append("void vLong(void)")
+        lines.append("{")
+        # Dense operators without spaces are the worst case for CL5
+        lines.append(_operator_line(rng, 1.0, long_line_operators))
+        lines.append("}")
+    return lines
+
+
+def generate_corpus(files=20, lines=2000, density=0.2, seed=1, long_line_operators=2000):
+    """Generate a deterministic synthetic corpus
+    Args:
+        files: Number of files
+        lines: Approximate number of lines per file
+        density: Share of constructs (0.0-1.0) that violate a rule
+        seed: Random seed
+        long_line_operators: Operators in the long line of the first file (0: none)
+    Returns:
+        List of (file name, lines) tuples
+    """
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(files):
+        operators = long_line_operators if i == 0 else 0
+        corpus.append((f"Bench{i}.c", generate_file(rng, lines, density, operators)))
+    return corpus
+
+
+def generate_long_line(size, seed=1):
+    """Generate a single minified line, as found in generated code
+    The terms mix pointers, parentheses, negations, addresses, strings, chars and
+    block comments, joined by operators without spaces.
+    Args:
+        size: Approximate length of the line in bytes
+        seed: Random seed
+    Returns:
+        Source line
+    """
+    rng = random.Random(seed)
+    terms = ['iValue{}', '(iValue{})', '*pValue{}', '!bFlag{}', '&iValue{}', "'{}'", '"s+{}"', 'iValue{}/*a+b*/']
+    operators = ['+', '-', '/', '*', '==', '&&', '||']
+    parts = ['iResult=']
+    length = len(parts[0])
+    while length < size:
+        part = rng.choice(terms).format(rng.randrange(10)) + rng.choice(operators)
+        parts.append(part)
+        length += len(part)
+    parts.append('0;')
+    return ''.join(parts)
+
+
+def write_corpus(corpus, directory):
+    """Write a generated corpus to disk (e.g. for end-to-end runs of the tools)
+    Args:
+        corpus: List of (file name, lines) tuples
+        directory: Target directory
+    """
+    os.makedirs(directory, exist_ok=True)
+    for filename, lines in corpus:
+        with open(os.path.join(directory, filename), 'w') as f:
+            f.write("\n".join(lines) + "\n")
@@ -0,0 +1,324 @@
+import os
+import sys
+import gc
+import json
+import time
+import platform
+import tracemalloc
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import style_checker
+import style_converter
+from c_lexer import iter_lines
+from c_outline import iter_outline
+from corpus import generate_corpus, generate_long_line, write_corpus
+
+# Default benchmark settings, every option can be overridden on the command line
+DEFAULT_OPTIONS = {
+    'files': 20,
+    'lines': 2000,
+    'density': 0.2,
+    'seed': 1,
+    'long-line': 2000,
+    'scaling': 2,
+    'repeat': 3,
+    'output': '',
+    'baseline': '',
+    'corpus-dir': '',
+    'threshold': 10.0,
+}
+
+# For linear code the time per byte stays the same on longer lines. The longest line
+# of the scaling benchmark may take at most this factor more time per byte than the
+# shortest, quadratic code would take 4 times as long.
+SCALING_LIMIT = 1.5
+
+
+# --------------------------
+# Measurements
+# --------------------------
+
+
+def measure(function, repeat):
+    """Measure the best wall time and the peak memory of a function
+    Time and memory are measured in separate runs, tracing slows down the code.
+    Args:
+        function: Function without arguments
+        repeat: Number of timed runs
+    Returns:
+        Tuple of (best time in seconds, peak memory in KiB)
+    """
+    best = best_time(function, repeat)
+    gc.collect()
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak // 1024
+
+
+def best_time(function, repeat):
+    """Measure the best wall time of a function
+    Args:
+        function: Function without arguments
+        repeat: Number of timed runs
+    Returns:
+        Best time in seconds
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_check(check, filename, lexed):
+    """Feed already lexed lines through a single check
+    Args:
+        check: Check generator function from style_checker.CHECKS
+        filename: Name of the file
+        lexed: List of c_outline.OutlineLine
+    Returns:
+        List of violation messages
+    """
+    machine = check(filename)
+    next(machine)
+    for line in lexed:
+        machine.send(line)
+    return machine.send(None)
+
+
+def result_entry(seconds, peak, line_count):
+    """Build the JSON entry of a measurement"""
+    return {
+        'seconds': round(seconds, 6),
+        'lines_per_second': round(line_count / seconds) if seconds else None,
+        'peak_kib': peak,
+    }
+
+
+def benchmark_checks(corpus, repeat):
+    """Benchmark the lexer and every check of the style checker
+    Args:
+        corpus: List of (file name, lines) tuples
+        repeat: Number of timed runs
+    Returns:
+        Dict mapping names to measurement entries
+    """
+    line_count = sum(len(lines) for _, lines in corpus)
+    results = {}
+    seconds, peak = measure(lambda: [list(iter_lines(lines)) for _, lines in corpus], repeat)
+    results['lexer'] = result_entry(seconds, peak, line_count)
+
+    lexed = [(filename, list(iter_lines(lines))) for filename, lines in corpus]
+    seconds, peak = measure(lambda: [list(iter_outline(lines)) for _, lines in lexed], repeat)
+    results['outline'] = result_entry(seconds, peak, line_count)
+
+    # Checks are measured on outlined lines, so lexer and outline are not counted twice
+    lexed = [(filename, list(iter_outline(lines))) for filename, lines in lexed]
+    for check_id, check in style_checker.CHECKS.items():
+        seconds, peak = measure(lambda: [run_check(check, filename, lines) for filename, lines in lexed], repeat)
+        results[check_id] = result_entry(seconds, peak, line_count)
+    del lexed
+
+    checks = list(style_checker.CHECKS)
+    seconds, peak = measure(lambda: [style_checker.check_content("\n".join(lines).encode(), filename, checks)
+                                     for filename, lines in corpus], repeat)
+    results['all'] = result_entry(seconds, peak, line_count)
+    return results
+
+
+def benchmark_scaling(megabytes, repeat):
+    """Benchmark lexer and CL5 on single long lines of growing length
+    Lines of a quarter, half and all of the given size are measured. The time per
+    byte has to stay about the same, otherwise the code is not linear in the line length.
+    Args:
+        megabytes: Length of the longest line in MiB
+        repeat: Number of timed runs
+    Returns:
+        Dict mapping names to {'bytes': [...], 'seconds': [...], 'growth': factor}, the
+        growth is the time per byte of the longest line divided by that of the shortest
+    """
+    sizes = [megabytes * 1024 * 1024 // 4, megabytes * 1024 * 1024 // 2, megabytes * 1024 * 1024]
+    check = style_checker.CHECKS['CL5']
+    results = {'lexer': {'bytes': [], 'seconds': []}, 'CL5': {'bytes': [], 'seconds': []}}
+    for size in sizes:
+        line = generate_long_line(size)
+        seconds = best_time(lambda: list(iter_lines([line])), repeat)
+        results['lexer']['bytes'].append(len(line))
+        results['lexer']['seconds'].append(round(seconds, 6))
+        lexed = list(iter_lines([line]))
+        seconds = best_time(lambda: run_check(check, 'Long.c', lexed), repeat)
+        results['CL5']['bytes'].append(len(line))
+        results['CL5']['seconds'].append(round(seconds, 6))
+        del lexed
+    for entry in results.values():
+        first = entry['seconds'][0] / entry['bytes'][0]
+        last = entry['seconds'][-1] / entry['bytes'][-1]
+        entry['growth'] = round(last / first, 2) if first else None
+    return results
+
+
+def run_converter(function, lines):
+    """Run a converter function on a copy of the lines, errors are reported not raised"""
+    try:
+        function(list(lines))
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+    return None
+
+
+def benchmark_converters(corpus, repeat):
+    """Benchmark every conversion of the style converter
+    Args:
+        corpus: List of (file name, lines) tuples
+        repeat: Number of timed runs
+    Returns:
+        Dict mapping names to measurement entries
+    """
+    line_count = sum(len(lines) for _, lines in corpus)
+    results = {}
+    debug = style_converter.DEBUG
+    style_converter.DEBUG = False
+    try:
+        # Some conversions print unconditionally, that is not what is measured here
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            for check_id, function in style_converter.CHECKS.items():
+                errors = []
+                seconds, peak = measure(lambda: errors.extend(
+                    filter(None, (run_converter(function, lines) for _, lines in corpus))), repeat)
+                results[check_id] = result_entry(seconds, peak, line_count)
+                if errors:
+                    results[check_id]['errors'] = sorted(set(errors))
+            function = style_converter.convert_filename_to_uppercase
+            seconds, peak = measure(lambda: [function(filename.lower()) for filename, _ in corpus], repeat)
+            results['A5'] = result_entry(seconds, peak, line_count)
+    finally:
+        style_converter.DEBUG = debug
+    return results
+
+
+# --------------------------
+# Reporting
+# --------------------------
+
+
+def compare(results, baseline, threshold):
+    """Print the change of every measurement against a baseline
+    Args:
+        results: Current benchmark results
+        baseline: Saved benchmark results
+        threshold: Slowdown in percent that counts as a regression
+    Returns:
+        List of regressed measurement names
+    """
+    regressions = []
+    print(f"\n{'Benchmark':<16}{'Baseline lines/s':>18}{'Current lines/s':>18}{'Change':>10}")
+    for group in ('checks', 'converters'):
+        for name, entry in results[group].items():
+            old = baseline.get(group, {}).get(name)
+            label = f"{group[:-1]} {name}"
+            if not old or not old.get('lines_per_second') or not entry['lines_per_second']:
+                print(f"{label:<16}{'-':>18}{entry['lines_per_second'] or '-':>18}{'new':>10}")
+                continue
+            change = (entry['lines_per_second'] / old['lines_per_second'] - 1) * 100
+            print(f"{label:<16}{old['lines_per_second']:>18}{entry['lines_per_second']:>18}{change:>+9.1f}%")
+            if change < -threshold:
+                regressions.append(label)
+    return regressions
+
+
+def print_results(results):
+    """Print the benchmark results as a table"""
+    print(f"\n{'Benchmark':<16}{'Lines/s':>14}{'Seconds':>12}{'Peak KiB':>12}")
+    for group in ('checks', 'converters'):
+        for name, entry in results[group].items():
+            label = f"{group[:-1]} {name}"
+            print(f"{label:<16}{entry['lines_per_second'] or '-':>14}{entry['seconds']:>12.4f}{entry['peak_kib']:>12}")
+            for error in entry.get('errors', []):
+                print(f"    error: {error}")
+
+
+def print_scaling(scaling):
+    """Print the long line measurements and return the names that do not scale linearly"""
+    failed = []
+    print(f"\n{'Long line':<16}" + ''.join(f"{f'{size / 1024 / 1024:.2f} MiB':>12}"
+                                           for size in next(iter(scaling.values()))['bytes']) + f"{'Growth':>10}")
+    for name, entry in scaling.items():
+        print(f"{name:<16}" + ''.join(f"{seconds:>11.3f}s" for seconds in entry['seconds']) + f"{entry['growth']:>10}")
+        if entry['growth'] is not None and entry['growth'] > SCALING_LIMIT:
+            failed.append(name)
+    return failed
+
+
+def parse_options(args):
+    """Parse '--name value' options, values take the type of their default
+    Args:
+        args: Command line arguments without the program name
+    Returns:
+        Dict of options
+    """
+    options = dict(DEFAULT_OPTIONS)
+    i = 0
+    while i < len(args):
+        name = args[i][2:] if args[i].startswith('--') else None
+        if name not in options or i + 1 >= len(args):
+            print(f"Usage: python run_benchmarks.py {' '.join(f'[--{key} VALUE]' for key in DEFAULT_OPTIONS)}")
+            sys.exit(1)
+        try:
+            options[name] = type(DEFAULT_OPTIONS[name])(args[i + 1])
+        except ValueError:
+            print(f"Error: invalid value for --{name}: {args[i + 1]}")
+            sys.exit(1)
+        i += 2
+    return options
+
+
+def main():
+    """Generate a corpus, benchmark checker and converter and compare with a baseline"""
+    options = parse_options(sys.argv[1:])
+    corpus = generate_corpus(options['files'], options['lines'], options['density'],
+                             options['seed'], options['long-line'])
+    if options['corpus-dir']:
+        write_corpus(corpus, options['corpus-dir'])
+    line_count = sum(len(lines) for _, lines in corpus)
+    print(f"Corpus: {len(corpus)} files, {line_count} lines, density {options['density']}, seed {options['seed']}")
+
+    results = {
+        'options': {key: options[key] for key in ('files', 'lines', 'density', 'seed', 'long-line', 'scaling', 'repeat')},
+        'lines': line_count,
+        'python': platform.python_version(),
+        'checks': benchmark_checks(corpus, options['repeat']),
+        'converters': benchmark_converters(corpus, options['repeat']),
+    }
+    if options['scaling']:
+        results['scaling'] = benchmark_scaling(options['scaling'], options['repeat'])
+    print_results(results)
+    nonlinear = print_scaling(results['scaling']) if options['scaling'] else []
+
+    if options['output']:
+        with open(options['output'], 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved as {options['output']}")
+
+    if options['baseline']:
+        with open(options['baseline']) as f:
+            baseline = json.load(f)
+        if baseline.get('options') != results['options']:
+            print("\nWarning: the baseline was measured with different options")
+        regressions = compare(results, baseline, options['threshold'])
+        if regressions:
+            print(f"\nRegressions over {options['threshold']}%: {', '.join(regressions)}")
+            sys.exit(1)
+
+    if nonlinear:
+        print(f"\nNot linear in the line length (growth over {SCALING_LIMIT}): {', '.join(nonlinear)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
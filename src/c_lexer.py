@@ -0,0 +1,197 @@
+import re
+from collections import namedtuple
+
+# --------------------------
+# Token Definitions
+# --------------------------
+
+# Token kinds produced by the lexer
+COMMENT = 'comment'
+BLOCK_COMMENT = 'block_comment'
+STRING = 'string'
+CHAR = 'char'
+PREPROCESSOR = 'preprocessor'
+IDENTIFIER = 'identifier'
+NUMBER = 'number'
+OPERATOR = 'operator'
+BRACE = 'brace'
+PUNCTUATION = 'punctuation'
+
+# A single token (line is 1-based, column is 0-based)
+Token = namedtuple('Token', ['kind', 'text', 'line', 'column'])
+
+
+
+class Line:
+    """A lexed source line
+    Plain code lines (see iter_lines) are split into tokens only when a check
+    first asks for them, most checks look at the code text only.
+    Attributes:
+        number: 1-based line number
+        text:   Raw source code line
+        tokens: Tokens of this line
+        code:   Stripped line text with all comments removed
+        lexed:  Tokens if they were split already, None if not
+    """
+    __slots__ = ('number', 'text', 'lexed', 'code')
+
+    def __init__(self, number, text, tokens, code):
+        self.number = number
+        self.text = text
+        self.lexed = tokens
+        self.code = code
+
+    @property
+    def tokens(self):
+        tokens = self.lexed
+        if tokens is None:
+            # A plain code line starts and ends in the initial lexer state
+            tokens = self.lexed = tokenize_line(self.text, self.number)[0]
+        return tokens
+
+
+# Lexer state carried from one line to the next
+#   in_block_comment: Line starts inside an unterminated /* comment
+#   in_preprocessor:  Line continues a preprocessor directive ending with '\'
+LexerState = namedtuple('LexerState', ['in_block_comment', 'in_preprocessor'])
+INITIAL_STATE = LexerState(False, False)
+
+# Patterns for code tokens (longest operators first), leading whitespace is skipped
+_TOKEN_PATTERN = re.compile(r'''\s*(?:
+      (?P<comment>//.*)
+    | (?P<block_comment>/\*)
+    | (?P<string>"(?:\\.|[^"\\])*"?)
+    | (?P<char>'(?:\\.|[^'\\])*'?)
+    | (?P<number>\.?\d(?:[eEpP][+-]|[\w.])*)
+    | (?P<identifier>[A-Za-z_]\w*)
+    | (?P<brace>[{}])
+    | (?P<operator><<=|>>=|->|\+\+|--|<<|>>|<=|>=|==|!=|&&|\|\||[-+*/%&|^]=|[-+*/%&|^!~<>=?:])
+    | (?P<punctuation>\S)
+)''', re.VERBOSE)
+
+# Start of a comment, string, char or preprocessor directive. Lines without
+# one are plain code, which leaves the lexer state as it is.
+_LEXED_PATTERN = re.compile(r'/[/*]|["\'#]')
+
+# Start of a comment behind a preprocessor directive, strings and chars are
+# matched as a whole so that a '//' or '/*' in them is skipped
+_DIRECTIVE_COMMENT_PATTERN = re.compile(r'''//|/\*|"(?:\\.|[^"\\])*"?|'(?:\\.|[^'\\])*'?''')
+
+# Create a Token without the keyword handling of its constructor
+_new_token = tuple.__new__
+
+
+# --------------------------
+# Lexer Implementation
+# --------------------------
+
+
+def tokenize_line(line, line_no, state=INITIAL_STATE):
+    """Split a single source line into tokens
+    Args:
+        line: Source code line without line break
+        line_no: 1-based number of the line
+        state: Lexer state left behind by the previous line
+    Returns:
+        Tuple of (list of tokens, lexer state for the next line)
+    """
+    tokens = []
+    pos = 0
+    length = len(line)
+
+    # Continue a block comment from the previous line
+    if state.in_block_comment:
+        end = line.find('*/')
+        if end < 0:
+            if line.strip():
+                tokens.append(Token(BLOCK_COMMENT, line, line_no, 0))
+            return tokens, LexerState(True, False)
+        pos = end + 2
+        tokens.append(Token(BLOCK_COMMENT, line[:pos], line_no, 0))
+
+    # Preprocessor directives (and their continuation lines) are a single token
+    stripped = line.lstrip()
+    if state.in_preprocessor or (pos == 0 and stripped.startswith('#')):
+        start = length - len(stripped)
+        end = length
+        for match in _DIRECTIVE_COMMENT_PATTERN.finditer(line, start):
+            if match[0][0] == '/':
+                end = match.start()
+                break
+        directive = line[start:end].rstrip()
+        if directive:
+            tokens.append(Token(PREPROCESSOR, directive, line_no, start))
+        continues = directive.endswith('\\')
+        if end == length:
+            return tokens, LexerState(False, continues)
+        # Lex the trailing comment as regular code
+        pos = end
+        state = LexerState(False, continues)
+    else:
+        state = INITIAL_STATE
+
+    # Without a comment in the rest of the line the regex alone splits it
+    if line.find('//', pos) < 0 and line.find('/*', pos) < 0:
+        tokens += [_new_token(Token, (match.lastgroup, match[match.lastindex], line_no, match.start(match.lastindex)))
+                   for match in _TOKEN_PATTERN.finditer(line, pos)]
+        return tokens, state
+
+    while True:
+        match = _TOKEN_PATTERN.match(line, pos)
+        if match is None:
+            # Only whitespace is left
+            break
+        kind = match.lastgroup
+        start = match.start(kind)
+        if kind == 'block_comment':
+            end = line.find('*/', start + 2)
+            if end < 0:
+                tokens.append(Token(BLOCK_COMMENT, line[start:], line_no, start))
+                return tokens, LexerState(True, False)
+            tokens.append(Token(BLOCK_COMMENT, line[start:end + 2], line_no, start))
+            pos = end + 2
+            continue
+        tokens.append(_new_token(Token, (kind, match[kind], line_no, start)))
+        pos = match.end()
+    return tokens, state
+
+
+def code_text(line, tokens):
+    """Get the stripped text of a line with all comments removed
+    Args:
+        line: Source code line
+        tokens: Tokens of this line
+    Returns:
+        Stripped line text without comments
+    """
+    parts = []
+    pos = 0
+    for token in tokens:
+        if token.kind == COMMENT or token.kind == BLOCK_COMMENT:
+            parts.append(line[pos:token.column])
+            pos = token.column + len(token.text)
+    if not parts:
+        return line.strip()
+    parts.append(line[pos:])
+    return ' '.join(parts).strip()
+
+
+def iter_lines(lines):
+    """Lex source lines one at a time
+    Only the lexer state is carried between lines, so a file can be lexed
+    while it is read without keeping it in memory. Lines without comments,
+    strings, chars and preprocessor directives are plain code, their tokens
+    are split only when they are used (see Line).
+    Args:
+        lines: Iterable of source code lines without line breaks
+    Returns:
+        Generator of lexed lines (Line)
+    """
+    state = INITIAL_STATE
+    for i, line in enumerate(lines, 1):
+        # Plain code lines cannot change the lexer state, their tokens are split on first use
+        if state == INITIAL_STATE and not _LEXED_PATTERN.search(line):
+            yield Line(i, line, None, line.strip())
+            continue
+        tokens, state = tokenize_line(line, i, state)
+        yield Line(i, line, tokens, code_text(line, tokens) if tokens else '')
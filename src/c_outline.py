@@ -0,0 +1,181 @@
+import re
+from collections import namedtuple
+from c_lexer import Line, BRACE, COMMENT, BLOCK_COMMENT, PREPROCESSOR, IDENTIFIER, OPERATOR, PUNCTUATION, STRING
+
+# --------------------------
+# Outline Definitions
+# --------------------------
+
+# A function definition (1-based numbers of the first signature line and of the closing brace line)
+Function = namedtuple('Function', ['name', 'start', 'end'])
+
+
+
+class OutlineLine(Line):
+    """A lexed line with its place in the structure of the file
+    Attributes:
+        number, text, tokens, code, lexed: See c_lexer.Line
+        depth:   Brace depth at the start of the line
+        section: File section of the line (see SECTION_ORDER), None for lines inside
+                 braces and lines that belong to no section
+        blocks:  Opening braces of the line that start a block (function body, statement,
+                 struct/union/enum body); braces of initializer lists are left out
+        ended:   Functions whose body is closed in this line
+    """
+    __slots__ = ('depth', 'section', 'blocks', 'ended')
+
+    def __init__(self, number, text, tokens, code, depth, section, blocks, ended):
+        self.number = number
+        self.text = text
+        self.lexed = tokens
+        self.code = code
+        self.depth = depth
+        self.section = section
+        self.blocks = blocks
+        self.ended = ended
+
+
+# Outline state carried from one line to the next
+#   stack:    Kinds of the open braces (tuple)
+#   function: (name, first line) of the function whose body is open, or None
+#   start:    First line of the current statement, None before its first token
+#   name:     Function name found in the current statement, or None
+#   assign:   The current statement contains a '='
+#   count:    Number of tokens of the current statement
+#   previous: Last code token seen, or None
+#   scope:    The current statement opens a namespace or extern "C" block
+OutlineState = namedtuple('OutlineState', ['stack', 'function', 'start', 'name', 'assign', 'count', 'previous', 'scope'])
+INITIAL_OUTLINE = OutlineState((), None, None, None, False, 0, None, False)
+
+# Sections recognized by the start of a line, checked in this order
+SECTION_PATTERNS = {
+    'system_headers': re.compile(r'^\s*#include\s*<.*>'),
+    'user_headers': re.compile(r'^\s*#include\s*".*"'),
+    'data_types': re.compile(r'^\s*(#define|const|enum|struct|union|typedef)'),
+}
+
+# Expected section order (globals are not detected yet)
+SECTION_ORDER = ['system_headers', 'user_headers', 'data_types', 'globals',
+                 'function_declarations', 'function_implementations']
+
+# Kinds of open braces
+FUNCTION_BODY = 'function'
+BLOCK = 'block'
+INITIALIZER = 'initializer'
+# Body of a namespace or extern "C" block, its content is at file level
+SCOPE = 'scope'
+
+
+# --------------------------
+# Outline Implementation
+# --------------------------
+
+
+def iter_outline(lines, state=INITIAL_OUTLINE, states=None):
+    """Add brace depth, sections and function spans to lexed lines
+    A function is a statement at file level with a return type and a name followed by
+    '(' whose body opens with '{'; the same statement ending with ';' is a declaration.
+    The bodies of namespaces and extern "C" blocks count as file level.
+    Args:
+        lines: Iterable of c_lexer.Line
+        state: Outline state left behind by the line before the first one
+        states: List receiving the outline state after every line (before the line
+                is yielded), or None
+    Returns:
+        Generator of OutlineLine
+    """
+    # Kinds of the currently open braces
+    stack = list(state.stack)
+    # Name and first line of the function whose body is open
+    function = state.function
+    # Current statement (since the last ';', '{' or '}')
+    start = state.start
+    name = state.name
+    assign = state.assign
+    count = state.count
+    previous = state.previous
+    scope = state.scope
+
+    for line in lines:
+        depth = len(stack)
+        blocks = []
+        ended = []
+        implementation = declaration = False
+
+        code = line.code
+        # Inside braces only braces and the '=' of initializers matter, most lines have no
+        # brace and no '=' behind the ';' that ends their statement
+        if stack and stack[-1] != SCOPE and '{' not in code and '}' not in code:
+            end = code.rfind(';')
+            if '=' not in code or (end >= 0 and '=' not in code[end:] and '"' not in code and "'" not in code):
+                if end >= 0:
+                    start = name = None
+                    assign = scope = False
+                    count = 0
+                if states is not None:
+                    states.append(OutlineState(tuple(stack), function, start, name, assign, count, previous, scope))
+                yield OutlineLine(line.number, line.text, line.lexed, code, depth, None, blocks, ended)
+                continue
+
+        for token in line.tokens:
+            kind = token.kind
+            if kind == COMMENT or kind == BLOCK_COMMENT or kind == PREPROCESSOR:
+                continue
+            text = token.text
+            if kind == BRACE:
+                if text == '{':
+                    outer = not stack or stack[-1] == SCOPE
+                    if assign or (stack and stack[-1] == INITIALIZER):
+                        brace = INITIALIZER
+                    elif outer and name is not None:
+                        brace = FUNCTION_BODY
+                        function = (name, start)
+                        implementation = True
+                    elif outer and scope:
+                        brace = SCOPE
+                    else:
+                        brace = BLOCK
+                    if brace != INITIALIZER:
+                        blocks.append(token)
+                    stack.append(brace)
+                elif stack and stack.pop() == FUNCTION_BODY:
+                    ended.append(Function(function[0], function[1], line.number))
+                    function = None
+                start = name = None
+                assign = scope = False
+                count = 0
+            elif kind == PUNCTUATION and text == ';':
+                if not stack and name is not None and not assign:
+                    declaration = True
+                start = name = None
+                assign = scope = False
+                count = 0
+            else:
+                if start is None:
+                    start = line.number
+                # The name is the identifier in front of the first '(', after at least a type
+                if (text == '(' and name is None and count >= 2
+                        and previous.kind == IDENTIFIER and kind == PUNCTUATION):
+                    name = previous.text
+                elif kind == OPERATOR and text == '=':
+                    assign = True
+                elif (kind == IDENTIFIER and text == 'namespace') or (
+                        kind == STRING and previous is not None and previous.text == 'extern'):
+                    scope = True
+                count += 1
+            previous = token
+
+        section = None
+        if depth == 0 and code:
+            for candidate, pattern in SECTION_PATTERNS.items():
+                if pattern.match(code):
+                    section = candidate
+                    break
+            else:
+                if implementation:
+                    section = 'function_implementations'
+                elif declaration:
+                    section = 'function_declarations'
+        if states is not None:
+            states.append(OutlineState(tuple(stack), function, start, name, assign, count, previous, scope))
+        yield OutlineLine(line.number, line.text, line.lexed, code, depth, section, blocks, ended)
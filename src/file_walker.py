@@ -0,0 +1,325 @@
+import os
+import re
+from collections import namedtuple
+from style_cache import file_digest
+
+# Directories that never contain sources to check
+PRUNED_DIRECTORIES = ('.git', '.hg', '.svn', '.stylecache')
+
+# Excluded unless ignore rules are disabled: the folders written by the style converter
+DEFAULT_EXCLUDES = ('output/',)
+
+# Larger files (generated amalgamations, embedded data) are skipped, in bytes
+DEFAULT_MAX_SIZE = 4 * 1024 * 1024
+
+# --------------------------
+# Walk Options
+# --------------------------
+#   excludes:  Additional patterns in .gitignore syntax, relative to the searched directory
+#   gitignore: Honor .gitignore files and DEFAULT_EXCLUDES
+#   max_size:  Files larger than this are skipped (bytes, None for no limit)
+WalkOptions = namedtuple('WalkOptions', ['excludes', 'gitignore', 'max_size'])
+
+DEFAULT_WALK = WalkOptions((), True, DEFAULT_MAX_SIZE)
+
+# A compiled ignore pattern
+#   base:     Directory the pattern is relative to ('' or a path ending with '/', relative to the top)
+#   regex:    Compiled pattern matched against the path below base
+#   negate:   Pattern started with '!' and includes the path again
+#   dir_only: Pattern ended with '/' and only matches directories
+IgnoreRule = namedtuple('IgnoreRule', ['base', 'regex', 'negate', 'dir_only'])
+
+# A directory visited by walk_files, enough to search it again on its own (see walk_directory)
+#   relative:  Path relative to the top of the rules ('' or ending with '/')
+#   inherited: Ignore rules of the parent directories
+#   rules:     Ignore rules of the entries (inherited and the directory's own .gitignore)
+#   mtime:     Modification time (ns) when it was read, changes when entries are added or removed
+WalkedDirectory = namedtuple('WalkedDirectory', ['relative', 'inherited', 'rules', 'mtime'])
+
+
+# --------------------------
+# Ignore Patterns
+# --------------------------
+
+
+def glob_to_regex(glob):
+    """Translate a .gitignore glob into a regex
+    '*' and '?' do not match '/', '**' matches any number of directories.
+    Args:
+        glob: Pattern without leading '!' and trailing '/'
+    Returns:
+        Regex source (without anchors)
+    """
+    parts = []
+    i = 0
+    n = len(glob)
+    while i < n:
+        if glob.startswith('**/', i):
+            parts.append('(?:.*/)?')
+            i += 3
+        elif glob.startswith('**', i):
+            parts.append('.*')
+            i += 2
+        elif glob[i] == '*':
+            parts.append('[^/]*')
+            i += 1
+        elif glob[i] == '?':
+            parts.append('[^/]')
+            i += 1
+        elif glob[i] == '[' and ']' in glob[i + 2:]:
+            end = glob.index(']', i + 2)
+            content = glob[i + 1:end]
+            if content.startswith('!'):
+                content = '^' + content[1:]
+            parts.append('[' + content.replace('\\', '\\\\') + ']')
+            i = end + 1
+        elif glob[i] == '\\' and i + 1 < n:
+            parts.append(re.escape(glob[i + 1]))
+            i += 2
+        else:
+            parts.append(re.escape(glob[i]))
+            i += 1
+    return ''.join(parts)
+
+
+def compile_rule(pattern, base=''):
+    """Compile a line of a .gitignore file or an --exclude pattern
+    Args:
+        pattern: Pattern text
+        base: Directory the pattern is relative to (see IgnoreRule)
+    Returns:
+        IgnoreRule, None for blank lines and comments
+    """
+    pattern = pattern.rstrip('\n')
+    # Trailing spaces are ignored unless escaped
+    if not pattern.endswith('\\ '):
+        pattern = pattern.rstrip(' ')
+    if not pattern or pattern.startswith('#'):
+        return None
+    negate = pattern.startswith('!')
+    if negate:
+        pattern = pattern[1:]
+    elif pattern.startswith('\\'):
+        pattern = pattern[1:]
+    dir_only = pattern.endswith('/')
+    pattern = pattern.rstrip('/')
+    if not pattern:
+        return None
+    # Patterns with a '/' (other than at the end) are anchored to their directory,
+    # the others match a name at any depth
+    if '/' in pattern:
+        regex = '^' + glob_to_regex(pattern.lstrip('/')) + '$'
+    else:
+        regex = '^(?:.*/)?' + glob_to_regex(pattern) + '$'
+    return IgnoreRule(base, re.compile(regex), negate, dir_only)
+
+
+def read_ignore_file(path, base):
+    """Read the rules of a .gitignore file
+    Args:
+        path: Path of the .gitignore file
+        base: Directory of the file (see IgnoreRule)
+    Returns:
+        List of IgnoreRule, empty if the file cannot be read
+    """
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            rules = [compile_rule(line, base) for line in f]
+    except OSError:
+        return []
+    return [rule for rule in rules if rule is not None]
+
+
+def is_ignored(rules, relative_path, is_dir):
+    """Check a path against ignore rules, the last matching rule decides
+    Args:
+        rules: List of IgnoreRule
+        relative_path: Path relative to the top, separated by '/'
+        is_dir: The path is a directory
+    Returns:
+        True if the path is ignored
+    """
+    for rule in reversed(rules):
+        if rule.dir_only and not is_dir:
+            continue
+        if not relative_path.startswith(rule.base):
+            continue
+        if rule.regex.match(relative_path[len(rule.base):]):
+            return not rule.negate
+    return False
+
+
+def find_work_tree(directory):
+    """Find the git work tree containing a directory
+    Args:
+        directory: Directory inside the work tree
+    Returns:
+        Absolute path of the work tree, None outside of git work trees
+    """
+    current = os.path.abspath(directory)
+    while True:
+        if os.path.exists(os.path.join(current, '.git')):
+            return current
+        parent = os.path.dirname(current)
+        if parent == current:
+            return None
+        current = parent
+
+
+# --------------------------
+# Walking
+# --------------------------
+
+
+def walk_files(root, extensions, walk=None, too_large=None, directories=None):
+    """Collect the files with the given extensions below a directory
+    Ignored directories are pruned before they are read. Symlinked directories are
+    followed, but every directory and file is visited only once, so links to the
+    same target (and link loops) do not yield duplicates.
+    Args:
+        root: Directory to search
+        extensions: Tuple of file extensions
+        walk: WalkOptions, None for DEFAULT_WALK
+        too_large: List receiving the paths of files skipped because of their size, or None
+        directories: Dict receiving a WalkedDirectory for the path of every visited directory, or None
+    Returns:
+        List of file paths in sorted order, the files of a directory before its subdirectories
+    """
+    walk = walk or DEFAULT_WALK
+    prefix, rules = root_rules(root, walk)
+    return walk_directory(root, prefix, rules, extensions, walk, too_large, directories)
+
+
+def root_rules(root, walk):
+    """Find the ignore rules that apply to a directory that is searched
+    Args:
+        root: Directory to search
+        walk: WalkOptions
+    Returns:
+        Tuple of (path of root relative to the top of the rules, '' or ending with '/',
+        list of IgnoreRule without those of root's own .gitignore)
+    """
+    # Rules of .gitignore files above root apply as well, so paths are relative to the work tree
+    top = os.path.abspath(root)
+    rules = []
+    if walk.gitignore:
+        work_tree = find_work_tree(root)
+        if work_tree is not None:
+            parents = []
+            directory = top
+            while directory != work_tree:
+                directory = os.path.dirname(directory)
+                parents.append(directory)
+            top = work_tree
+            for directory in reversed(parents):
+                base = os.path.relpath(directory, top).replace(os.sep, '/') + '/'
+                rules += read_ignore_file(os.path.join(directory, '.gitignore'), '' if base == './' else base)
+    prefix = os.path.relpath(os.path.abspath(root), top).replace(os.sep, '/') + '/'
+    prefix = '' if prefix == './' else prefix
+    if walk.gitignore:
+        rules += [compile_rule(pattern, prefix) for pattern in DEFAULT_EXCLUDES]
+    rules += [rule for rule in (compile_rule(pattern, prefix) for pattern in walk.excludes) if rule is not None]
+    return prefix, rules
+
+
+def walk_directory(directory, relative, inherited, extensions, walk, too_large=None, directories=None):
+    """Collect the files with the given extensions below a directory whose rules are known
+    Used by walk_files, and to search a directory of an earlier walk again (see WalkedDirectory).
+    Args:
+        directory: Directory to search
+        relative: Path of the directory relative to the top of the rules ('' or ending with '/')
+        inherited: List of IgnoreRule of the parent directories
+        extensions: Tuple of file extensions
+        walk: WalkOptions
+        too_large: List receiving the paths of files skipped because of their size, or None
+        directories: Dict receiving a WalkedDirectory for the path of every visited directory, or None;
+                     subdirectories that are already in it are not searched again
+    Returns:
+        List of file paths in sorted order, the files of a directory before its subdirectories
+    """
+    file_paths = []
+    visited = set()
+    seen_files = set()
+
+    def visit(directory, relative, inherited):
+        try:
+            info = os.stat(directory)
+        except OSError:
+            return
+        if (info.st_dev, info.st_ino) in visited:
+            return
+        visited.add((info.st_dev, info.st_ino))
+        rules = inherited
+        if walk.gitignore:
+            rules = rules + read_ignore_file(os.path.join(directory, '.gitignore'), relative)
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError:
+            return
+        if directories is not None:
+            directories[directory] = WalkedDirectory(relative, inherited, rules, info.st_mtime_ns)
+        # Files of a directory come before its subdirectories, like with os.walk
+        subdirectories = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                continue
+            path = relative + entry.name
+            if is_dir:
+                if directories is not None and entry.path in directories:
+                    continue
+                if entry.name not in PRUNED_DIRECTORIES and not is_ignored(rules, path, True):
+                    subdirectories.append((entry.path, path + '/'))
+            elif entry.name.endswith(extensions) and not is_ignored(rules, path, False):
+                try:
+                    info = entry.stat()
+                except OSError:
+                    # Broken symlink
+                    continue
+                if (info.st_dev, info.st_ino) in seen_files:
+                    continue
+                seen_files.add((info.st_dev, info.st_ino))
+                if walk.max_size is not None and info.st_size > walk.max_size:
+                    if too_large is not None:
+                        too_large.append(entry.path)
+                    continue
+                file_paths.append(entry.path)
+        for path, relative_path in subdirectories:
+            visit(path, relative_path, rules)
+
+    visit(directory, relative, inherited)
+    return file_paths
+
+
+def find_duplicates(file_paths):
+    """Find byte-identical files with the same extension
+    Only files whose size equals that of another file are hashed.
+    Args:
+        file_paths: List of file paths
+    Returns:
+        Dict mapping every duplicate to the first path in file_paths with the same content
+    """
+    by_size = {}
+    for file_path in file_paths:
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            continue
+        by_size.setdefault((size, os.path.splitext(file_path)[1]), []).append(file_path)
+    duplicates = {}
+    for candidates in by_size.values():
+        if len(candidates) < 2:
+            continue
+        first = {}
+        for file_path in candidates:
+            try:
+                digest = file_digest(file_path)
+            except OSError:
+                continue
+            if digest in first:
+                duplicates[file_path] = first[digest]
+            else:
+                first[digest] = file_path
+    return duplicates
@@ -0,0 +1,96 @@
+import re
+import os
+import bisect
+import subprocess
+
+# Hunk header of a unified diff without context ("@@ -old,count +new,count @@")
+HUNK_PATTERN = re.compile(r'^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@')
+
+# Escapes git uses in quoted paths (besides three-digit octal bytes)
+PATH_ESCAPES = {'a': 7, 'b': 8, 't': 9, 'n': 10, 'v': 11, 'f': 12, 'r': 13, '"': 34, '\\': 92}
+
+
+def unquote_path(text):
+    """Decode a path of a diff header
+    git puts a TAB behind paths containing spaces and writes paths with special
+    characters as C string literals.
+    Args:
+        text: Path as written in the '+++ ' line
+    Returns:
+        Path
+    """
+    if not text.startswith('"'):
+        return text[:-1] if text.endswith('\t') else text
+    data = bytearray()
+    i = 1
+    end = text.rindex('"')
+    while i < end:
+        char = text[i]
+        if char == '\\' and i + 1 < end:
+            escaped = text[i + 1]
+            if escaped in '01234567':
+                data.append(int(text[i + 1:i + 4], 8))
+                i += 4
+                continue
+            data.append(PATH_ESCAPES.get(escaped, ord(escaped)))
+            i += 2
+            continue
+        data += char.encode('utf-8', 'surrogateescape')
+        i += 1
+    return data.decode('utf-8', 'surrogateescape')
+
+
+def changed_lines(directory, rev, extensions):
+    """Read the changed line ranges of all files below a directory from git diff
+    Args:
+        directory: Directory inside a git work tree
+        rev: Revision to compare the work tree against
+        extensions: File extensions to consider
+    Returns:
+        Dict mapping file paths to sorted lists of (first, last) changed lines,
+        files with only deleted lines have an empty list
+    Raises:
+        RuntimeError: If git is missing or the diff fails
+    """
+    # Non-ASCII paths are written as they are, other special characters are still quoted.
+    # Paths come without prefix, whatever diff.mnemonicPrefix or diff.noprefix say.
+    command = ['git', '-C', directory, '-c', 'core.quotePath=false', 'diff', '--unified=0', '--no-color', '--no-ext-diff',
+               '--no-renames', '--relative', '--no-prefix', '--diff-filter=d', rev, '--']
+    try:
+        result = subprocess.run(command, capture_output=True, encoding='utf-8', errors='surrogateescape')
+    except OSError as e:
+        raise RuntimeError(f"Unable to run git: {e}")
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or f"git diff {rev} failed")
+
+    changes = {}
+    ranges = None
+    for line in result.stdout.splitlines():
+        if line.startswith('+++ '):
+            path = unquote_path(line[4:])
+            ranges = None
+            if path.endswith(extensions):
+                ranges = changes.setdefault(os.path.normpath(os.path.join(directory, path)), [])
+        elif ranges is not None and line.startswith('@@'):
+            match = HUNK_PATTERN.match(line)
+            if match:
+                first = int(match.group(1))
+                count = 1 if match.group(2) is None else int(match.group(2))
+                # A count of 0 is a pure deletion, no new line to check
+                if count > 0:
+                    ranges.append((first, first + count - 1))
+    for ranges in changes.values():
+        ranges.sort()
+    return changes
+
+
+def in_changed_lines(line, ranges):
+    """Check whether a line number falls into one of the changed ranges
+    Args:
+        line: 1-based line number
+        ranges: Sorted list of (first, last) changed lines
+    Returns:
+        True if the line was changed
+    """
+    index = bisect.bisect_right(ranges, (line, float('inf'))) - 1
+    return index >= 0 and ranges[index][0] <= line <= ranges[index][1]
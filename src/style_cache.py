@@ -0,0 +1,156 @@
+import os
+import json
+# hashlib and tempfile are imported where they are used, runs without the cache or
+# duplicate detection do not need them
+
+# Default location of the result cache (relative to the working directory)
+DEFAULT_CACHE_DIR = '.stylecache'
+
+# Default upper bound for the total size of all cache entries
+DEFAULT_CACHE_SIZE = 64 * 1024 * 1024
+
+# Fingerprint of the checker sources, computed once per process
+_fingerprints = {}
+
+# --------------------------
+# Cache Keys
+# --------------------------
+
+
+def source_fingerprint(paths):
+    """Hash the given source files, so cached results die with a code change
+    Args:
+        paths: Paths of the modules that influence the results
+    Returns:
+        Hex digest of the module contents
+    """
+    key = tuple(paths)
+    if key not in _fingerprints:
+        import hashlib
+        digest = hashlib.sha256()
+        for path in paths:
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        _fingerprints[key] = digest.hexdigest()
+    return _fingerprints[key]
+
+
+def file_digest(file_path):
+    """Hash the content of a file without loading it into memory at once
+    Args:
+        file_path: Path to the file
+    Returns:
+        Hex digest of the file content
+    """
+    import hashlib
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(content_digest, filename, enabled_checks, fingerprint):
+    """Build the cache key of a file
+    Args:
+        content_digest: Hex digest of the file content (see file_digest)
+        filename: Name of the file (file name rules depend on it)
+        enabled_checks: List of check IDs (order matters for the issue order)
+        fingerprint: Checker version fingerprint
+    Returns:
+        Hex digest identifying the check result
+    """
+    import hashlib
+    digest = hashlib.sha256(content_digest.encode())
+    for part in (filename, ','.join(enabled_checks), fingerprint):
+        digest.update(b'\0' + part.encode('utf-8', 'surrogateescape'))
+    return digest.hexdigest()
+
+
+# --------------------------
+# Cache Access
+# --------------------------
+
+
+def _entry_path(cache_dir, key):
+    """Get the path of a cache entry (entries are spread over 256 subfolders)"""
+    return os.path.join(cache_dir, key[:2], key + '.json')
+
+
+def load_result(cache_dir, key):
+    """Look up a cached result
+    Args:
+        cache_dir: Cache directory
+        key: Cache key from cache_key()
+    Returns:
+        Cached value, or None on a cache miss
+    """
+    path = _entry_path(cache_dir, key)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            value = json.load(f)
+        # Mark the entry as recently used for the eviction
+        os.utime(path)
+    except (OSError, ValueError):
+        # Missing, evicted in the meantime or damaged entries are misses
+        return None
+    return value
+
+
+def store_result(cache_dir, key, value):
+    """Store a result in the cache
+    The entry is written to a temporary file and renamed, so concurrent
+    readers never see a half-written entry.
+    Args:
+        cache_dir: Cache directory
+        key: Cache key from cache_key()
+        value: JSON serializable result
+    """
+    import tempfile
+    path = _entry_path(cache_dir, key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(value, f)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+    except OSError:
+        # A cache that cannot be written must not break the check
+        pass
+
+
+def prune_cache(cache_dir, max_bytes=DEFAULT_CACHE_SIZE):
+    """Evict the least recently used entries until the cache fits its size limit
+    Args:
+        cache_dir: Cache directory
+        max_bytes: Maximum total size of all entries
+    Returns:
+        Number of evicted entries
+    """
+    entries = []
+    total = 0
+    for root, _, files in os.walk(cache_dir):
+        for file in files:
+            path = os.path.join(root, file)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+    evicted = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.unlink(path)
+            evicted += 1
+        except OSError:
+            # Already removed by a concurrent run
+            pass
+        total -= size
+    return evicted
@@ -1,190 +1,249 @@
+import io
 import re
 import os
 import sys
+import json
+import stat
+import time
+import functools
+import contextlib
+
+from c_lexer import iter_lines, BLOCK_COMMENT, COMMENT, OPERATOR, PUNCTUATION
+from c_outline import iter_outline, SECTION_ORDER
+from style_cache import cache_key, file_digest, load_result, store_result, prune_cache, source_fingerprint
+from style_cache import DEFAULT_CACHE_DIR, DEFAULT_CACHE_SIZE
+from file_walker import walk_files, find_duplicates, WalkOptions, DEFAULT_MAX_SIZE
+from style_output import report_writer, format_text, Issue, FORMATS
+from style_profile import add_time, merge_profile, print_profile, write_profile
+# Only some modes need style_converter (--fix), multiprocessing (--jobs), git_changes (--diff),
+# style_watch (--watch), symbol_index (--index), hashlib and tempfile (--cache), they are
+# imported where they are used so checking a single file starts fast
 
 # Verbose mode for debugging
 DEBUG = False
 
+# File extensions handled by the style checker
+SOURCE_EXTENSIONS = ('.c', '.cpp', '.h')
+
+# Target amount of source bytes handed to a worker process at once
+CHUNK_BYTES = 256 * 1024
+
+# Read buffer size for streaming files through the checks
+STREAM_BUFFER = 1024 * 1024
+
+# Reported instead of the issues of a file that is not valid UTF-8
+ENCODING_ERROR = "File encoding error - unable to process"
+
+# Files that failed in earlier runs with an issue limit, checked first by the next one
+DEFAULT_FAILURES_FILE = '.stylefailures.json'
+
+# Modules whose code determines the check results (invalidates cached results)
+CHECKER_SOURCES = [os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+                   for name in ('style_checker.py', 'c_lexer.py', 'c_outline.py', 'style_output.py')]
+
+# --------------------------
+# Compiled Patterns and Tables
+# --------------------------
+
+# Define Hungarian notation prefixes
+TYPE_PREFIXES = {
+    'int': 'i',
+    'float': 'f',
+    'double': 'd',
+    '_Bool': 'b',
+    'short': 'si',
+    'signed char': 'c',
+    'char': 'c',
+    'short int': 'si',
+    'long int': 'li',
+    'long long int': 'lli',
+    'long double': 'ld',
+    'unsigned short int': 'usi',
+    'unsigned char': 'uc',
+    'unsigned int': 'ui',
+    'unsigned long int': 'uli',
+    'unsigned long long int': 'ulli',
+}
+
+# Regex to detect variable declarations (longest type names first)
+VAR_DECL_PATTERN = re.compile(r'(\b(?:' + '|'.join(sorted(TYPE_PREFIXES, key=len, reverse=True)) + r')\s*\**?\s+)(\w+)(\[\d*\])?')
+
+# Operators that need spaces around them
+SPACED_OPERATORS = frozenset(('==', '!=', '<=', '>=', '=', '+', '-', '/', '&&', '||'))
+# Operator characters between two non-blank characters, a line without them has no CL5 violation
+TOUCHING_OPERATOR_PATTERN = re.compile(r'\S[=+\-/&|]+\S')
+
+# Characters in front of the left operand of an operator that mark pointers, primary and
+# unary expressions (CL5), only whether each was seen an odd number of times matters
+OPERAND_CHARS = '*()!&'
+
+# Bit masks of the operand characters a token text holds an odd number of times
+_operand_masks = {}
+
 # --------------------------
 # Style Check Implementations
 # --------------------------
+# Every check is a generator that is fed the lexed lines of a file one at a
+# time (c_lexer.Line) and receives None after the last line. It then yields
+# its list of violations (style_output.Issue). Checks only keep the state they need, so
+# memory does not grow with the file size.
 
 
-def check_block_comments(lines, filename):
+def check_block_comments(filename):
     """Verify only single-line comments are used (Rule A4)
     Args:
-        lines: List of source code lines
         filename: Name of current file
-    Returns:
-        List of violation messages
+    Receives:
+        Lexed source lines (c_lexer.Line), None after the last line
+    Yields:
+        List of Issue
     """
     issues = []
-    in_block_comment = False
-    for i, line in enumerate(lines, 1):
-        if '/*' in line:
-            in_block_comment = True
-            issues.append(f"Line {i}: Block comment started (violates A4)")
-        if '*/' in line:
-            in_block_comment = False
-    return issues
+    line = yield
+    while line is not None:
+        # Cheap text test first, the tokens tell whether it really is a comment
+        if '/*' not in line.text:
+            line = yield
+            continue
+        for token in line.tokens:
+            # Only the first segment of a comment starts it, report each line once
+            if token.kind == BLOCK_COMMENT and token.text.startswith('/*'):
+                issues.append(Issue('A4', line.number, token.column, "Block comment started (violates A4)"))
+                break
+        line = yield
+    yield issues
 
-def check_uppercase_filename(lines, filename):
+def check_uppercase_filename(filename):
     """Verify file names start with uppercase letter (Rule A5)
     Args:
-        lines: List of source code lines
         filename: Name of current file
-    Returns:
-        List of violation messages
+    Receives:
+        Source lines (not lexed if only UNLEXED_CHECKS run), None after the last line
+    Yields:
+        List of Issue
     """
     issues = []
-    if filename.endswith(('.c', '.h')):  # Only check C/C++ files
-        base_name = os.path.splitext(filename)[0]
-        if not base_name[0].isupper():
-            issues.append(f"Filename {filename} does not start with uppercase letter (violates A5)")
-    return issues
+    base_name = os.path.splitext(filename)[0]
+    if not base_name[0].isupper():
+        issues.append(Issue('A5', None, None, f"Filename {filename} does not start with uppercase letter (violates A5)"))
+    # The content does not matter for this check
+    line = yield
+    while line is not None:
+        line = yield
+    yield issues
 
-def check_function_length(lines, filename):
+def check_function_length(filename):
     """Check that functions are not longer than 40 lines (Rule A6)
     Args:
-        lines: List of source code lines
         filename: Name of current file
-    Returns:
-        List of violation messages
+    Receives:
+        Outlined source lines (c_outline.OutlineLine), None after the last line
+    Yields:
+        List of Issue
     """
     issues = []
-    if not filename.endswith(('.c', '.cpp')):
-        return issues  # Only check C/C++ implementation files
-        
-    in_function = False
-    function_start_line = 0
-    function_name = ""
-    brace_count = 0
-    
-    # Function signature detection regex
-    func_signature = re.compile(r'^\s*\w+\s+(\w+)\s*\([^)]*\)\s*({?)$')
-    
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
-        i += 1  # Increment line counter
-        
-        # Skip preprocessor directives, comments, and empty lines
-        if not line or line.startswith('#') or line.startswith('//'):
-            continue
-            
-        # Function definition detection
-        if not in_function:
-            match = func_signature.match(line)
-            if match:
-                function_name = match.group(1)
-                function_start_line = i
-                
-                # If opening brace not on this line, look for it
-                if not match.group(2):
-                    # Find the opening brace
-                    for j in range(i, min(i+5, len(lines))):  # Look ahead a few lines
-                        if '{' in lines[j]:
-                            in_function = True
-                            brace_count = 1
-                            break
-                else:
-                    in_function = True
-                    brace_count = 1
-                
-        # Inside function tracking
-        elif in_function:
-            brace_count += line.count('{')
-            brace_count -= line.count('}')
-            
-            # End of function detection
-            if brace_count == 0:
-                function_length = i - function_start_line + 1
-                if function_length > 40:
-                    issues.append(f"Function '{function_name}' has {function_length} lines (violates A6: 4-40 lines)")
-                in_function = False
-    
-    return issues
+    line = yield
+    while line is not None:
+        # Function spans come from the outline, from the signature to the closing brace
+        for function in line.ended:
+            issue = function_length_issue(function)
+            if issue is not None:
+                issues.append(issue)
+        line = yield
+    yield issues
 
-def check_file_length(lines, filename):
+def function_length_issue(function):
+    """Check the length of a single function (Rule A6)
+    Args:
+        function: Function span (c_outline.Function)
+    Returns:
+        Issue, None if the function is short enough
+    """
+    function_length = function.end - function.start + 1
+    if function_length > 40:
+        return Issue('A6', None, None, f"Function '{function.name}' has {function_length} lines (violates A6: 4-40 lines)")
+    return None
+
+def check_file_length(filename):
     """Validate C file line count (Rule A7)
     Args:
-        lines: List of source code lines
         filename: Name of current file
+    Receives:
+        Source lines (not lexed if only UNLEXED_CHECKS run), None after the last line
+    Yields:
+        List of Issue
+    """
+    line_count = 0
+    line = yield
+    while line is not None:
+        line_count += 1
+        line = yield
+    yield file_length_issues(line_count)
+
+def file_length_issues(line_count):
+    """Validate the line count of a C file (Rule A7)
+    Args:
+        line_count: Number of lines of the file
     Returns:
-        List of violation messages
+        List of Issue
     """
     issues = []
-    if filename.endswith('.c') and (len(lines) < 4 or len(lines) > 400):
-        issues.append(f"File length {len(lines)} violates A7 (4-400 lines)")
+    if line_count < 4 or line_count > 400:
+        issues.append(Issue('A7', None, None, f"File length {line_count} violates A7 (4-400 lines)"))
     return issues
 
-def check_file_structure(lines, filename):
+def check_file_structure(filename):
     """Verify C file structure follows the required order (Rule A8)
     Args:
-        lines: List of source code lines
         filename: Name of current file
-    Returns:
-        List of violation messages
+    Receives:
+        Outlined source lines (c_outline.OutlineLine), None after the last line
+    Yields:
+        List of Issue
     """
-    if not filename.endswith('.c'):
-        return []  # Only check C files
-        
-    issues = []
-    
-    # Define section markers with their patterns
-    section_patterns = {
-        'system_headers': re.compile(r'^\s*#include\s*<.*>'),
-        'user_headers': re.compile(r'^\s*#include\s*".*"'),
-        'data_types': re.compile(r'^\s*(#define|const|enum|struct|union|typedef)'),
-        'function_declarations': re.compile(r'^\s*[a-zA-Z_][a-zA-Z0-9_]*\s+[a-zA-Z_][a-zA-Z0-9_]*\s*\([^{]*\)\s*;'),
-        'function_implementations': re.compile(r'^\s*[a-zA-Z_][a-zA-Z0-9_]*\s+[a-zA-Z_][a-zA-Z0-9_]*\s*\([^;]*\)\s*({|$)')
-    }
-    
     # Track sections in order of appearance
     section_order = []
-    
-    # Process the file line by line
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
-        i += 1
-        
-        # Skip empty lines and comments
-        if not line or line.startswith('//'):
-            continue
-            
-        # Check which section this line belongs to
-        for section, pattern in section_patterns.items():
-            if pattern.match(line):
-                if section not in section_order:
-                    # Debug print section order and line
-                    if DEBUG:print(f"Found section '{section}' in {filename} at line {i}")
-                    section_order.append(section)
-                break
-    
-    # Check if main is the first implemented function
+
+    # Track whether main is the first implemented function
     main_found = False
     first_func = None
     
-    for i, line in enumerate(lines):
-        line = line.strip()
-        if not line or line.startswith('//') or line.startswith('#'):
-            continue
-            
-        match = re.search(r'^\s*(\w+)\s+(\w+)\s*\(', line)
-        if match and match.group(2) == 'main':
-            main_found = True
-            if first_func and first_func != 'main':
-                issues.append(f"Main is not the first implemented function (violates A8)")
-            break
-        elif match and section_patterns['function_implementations'].match(line):
+    # Process the file line by line
+    line = yield
+    while line is not None:
+        # The outline only assigns sections to lines outside of braces
+        section = line.section
+        if section is not None and section not in section_order:
+            # Debug print section order and line
+            if DEBUG:print(f"Found section '{section}' in {filename} at line {line.number}")
+            section_order.append(section)
+
+        # Check if main is the first implemented function
+        for function in line.ended:
             if first_func is None:
-                first_func = match.group(2)
-    
-    # Expected section order
-    expected_order = ['system_headers', 'user_headers', 'data_types', 'globals', 
-                     'function_declarations', 'function_implementations']
-    
+                first_func = function.name
+            if function.name == 'main':
+                main_found = True
+        line = yield
+
+    yield file_structure_issues(filename, section_order, first_func, main_found)
+
+def file_structure_issues(filename, section_order, first_func, main_found):
+    """Evaluate the structure collected from a C file (Rule A8)
+    Args:
+        filename: Name of current file
+        section_order: Sections in order of their first appearance
+        first_func: Name of the first implemented function, None if there is none
+        main_found: Whether main is implemented
+    Returns:
+        List of Issue
+    """
+    issues = []
+    if main_found and first_func != 'main':
+        issues.append(Issue('A8', None, None, "Main is not the first implemented function (violates A8)"))
+
+    expected_order = SECTION_ORDER
+
     # Check if sections appear in correct order
     last_section_idx = -1
 
@@ -195,180 +254,200 @@ def check_file_structure(lines, filename):
     for section in section_order:
         current_idx = expected_order.index(section)
         if current_idx < last_section_idx:
-            issues.append(f"File structure violates A8: {section} appears after {expected_order[last_section_idx]}")
+            issues.append(Issue('A8', None, None,
+                                f"File structure violates A8: {section} appears after {expected_order[last_section_idx]}"))
         last_section_idx = current_idx
-    
+
     return issues
 
-def check_brace_placement(lines, filename):
+def check_brace_placement(filename):
     """Verify proper brace positioning (Rule CL1)
     Args:
-        lines: List of source code lines
         filename: Name of current file
-    Returns:
-        List of violation messages
+    Receives:
+        Outlined source lines (c_outline.OutlineLine), None after the last line
+    Yields:
+        List of Issue
     """
     issues = []
-    for i, line in enumerate(lines, 1):
-        stripped = line.strip()
-        # Check for opening brace on a new line
-        if '{' in stripped and not (stripped.startswith('{') or '=' in stripped):
-                issues.append(f"Line {i}: Opening brace are not on a new line (violates CL1)")
-    return issues
+    line = yield
+    while line is not None:
+        # Braces of initializer lists are not part of the outline blocks
+        if line.blocks:
+            brace = line.blocks[0]
+            first = next(t for t in line.tokens if t.kind not in (COMMENT, BLOCK_COMMENT))
+            # Check for opening brace on a new line
+            if first is not brace:
+                issues.append(Issue('CL1', line.number, brace.column, "Opening brace are not on a new line (violates CL1)"))
+        line = yield
+    yield issues
 
-def check_operator_spacing(lines, filename):
+def check_operator_spacing(filename):
     """Check operator spacing consistency (Rule CL5)
     Args:
-        lines: List of source code lines
         filename: Name of current file
-    Returns:
-        List of violation messages
+    Receives:
+        Lexed source lines (c_lexer.Line), None after the last line
+    Yields:
+        List of Issue
     """
     issues = []
-    operator_pattern = re.compile(r'(\S)(==|!=|<=|>=|=|\+|-|/|&&|\|\|)(\S)')
-    for i, line in enumerate(lines, 1):
-        for match in operator_pattern.finditer(line):
-            left_space = match.start(1) > 0 and line[match.start(1)-1] != ' '
-            right_space = match.end(3) < len(line) and line[match.end(3)] != ' '
-            # Check for spaces around the operator
-            if left_space or right_space:
-                # Check if its in a string
-                if not (line[:match.start(1)].count('"') % 2 == 0 and line[:match.start(1)].count("'") % 2 == 0):
-                    continue
-                # Check if its in a comment
-                if not (line[:match.start(1)].count('//') % 2 == 0 and line[:match.start(1)].count('/*') % 2 == 0):
-                    continue
-                # Check if its in a preprocessor directive
-                if not (line[:match.start(1)].count('#') % 2 == 0):
-                    continue
-                # Check if its a pointer
-                if not (line[:match.start(1)].count('*') % 2 == 0):
-                    continue
-                # Check if its a primary expression
-                if not (line[:match.start(1)].count('(') % 2 == 0 and line[:match.start(1)].count(')') % 2 == 0):
-                    continue
-                # Check if its an unary expression
-                if not (line[:match.start(1)].count('!') % 2 == 0 and line[:match.start(1)].count('&') % 2 == 0):
-                    continue
-                issues.append(f"Line {i}: Missing spaces around operator '{match.group(2)}' (violates CL5)")
-    return issues
+    operators = SPACED_OPERATORS
+    masks = _operand_masks
+    line = yield
+    while line is not None:
+        # Only operators touching both operands are reported, so only lines with an
+        # operator character between two non-blank characters have to be scanned
+        if not TOUCHING_OPERATOR_PATTERN.search(line.code):
+            line = yield
+            continue
+        text = line.text
+        # One left-to-right pass: the parities of the operand characters in front of the
+        # left operand are kept as bits (see OPERAND_CHARS), an operator is decided as
+        # soon as the token behind it is known
+        parity = 0
+        previous = None
+        pending = None
+        for token in line.tokens:
+            kind = token.kind
+            if kind == COMMENT or kind == BLOCK_COMMENT:
+                continue
+            if pending is not None:
+                operator, before, odd = pending
+                pending = None
+                start = operator.column
+                end = start + len(operator.text)
+                # Operator must touch both operands, pointers, primary and unary expressions are skipped
+                if not odd and before.column + len(before.text) == start and token.column == end:
+                    left_space = start - 1 > 0 and text[start - 2] != ' '
+                    right_space = end + 1 < len(text) and text[end + 1] != ' '
+                    if left_space or right_space:
+                        issues.append(Issue('CL5', line.number, start,
+                                            f"Missing spaces around operator '{operator.text}' (violates CL5)"))
+            if previous is not None:
+                if kind == OPERATOR and token.text in operators:
+                    pending = (token, previous, parity)
+                # Count the previous token, it is the left operand of the next operator
+                previous_kind = previous.kind
+                if previous_kind == OPERATOR or previous_kind == PUNCTUATION:
+                    bits = masks.get(previous.text)
+                    if bits is None:
+                        bits = operand_mask(previous.text)
+                    parity ^= bits
+            previous = token
+        line = yield
+    yield issues
 
-def check_hungarian_notation(lines, filename):
-    """Check that variable names use Hungarian notation (Rule DV3)
+def operand_mask(text):
+    """Get the operand characters a token holds an odd number of times (Rule CL5)
     Args:
-        lines: List of source code lines
-        filename: Name of current file
+        text: Text of an operator or punctuation token
     Returns:
-        List of violation messages
+        Bit mask, bit i is set for OPERAND_CHARS[i]
     """
-    if not (filename.endswith('.c') or filename.endswith('.h') or filename.endswith('.cpp')):
-        return []
+    mask = 0
+    for bit, char in enumerate(OPERAND_CHARS):
+        if text.count(char) % 2:
+            mask |= 1 << bit
+    _operand_masks[text] = mask
+    return mask
 
+def check_hungarian_notation(filename):
+    """Check that variable names use Hungarian notation (Rule DV3)
+    Args:
+        filename: Name of current file
+    Receives:
+        Lexed source lines (c_lexer.Line), None after the last line
+    Yields:
+        List of Issue
+    """
     issues = []
 
-    # Define Hungarian notation prefixes
-    type_prefixes = {
-        'int': 'i',
-        'float': 'f',
-        'double': 'd',
-        '_Bool': 'b',
-        'short': 'si',
-        'signed char': 'c',
-        'char': 'c',
-        'short int': 'si',
-        'long int': 'li',
-        'long long int': 'lli',
-        'long double': 'ld',
-        'unsigned short int': 'usi',
-        'unsigned char': 'uc',
-        'unsigned int': 'ui',
-        'unsigned long int': 'uli',
-        'unsigned long long int': 'ulli',
-    }
-
-    # Regex to detect variable declarations
-    sorted_types = sorted(type_prefixes.keys(), key=lambda x: len(x), reverse=True)
-    var_decl_pattern = re.compile(r'(\b(?:' + '|'.join(sorted_types) + r')\s*\**?\s+)(\w+)(\[\d*\])?')
-
-    for i, line in enumerate(lines, 1):
-        line = line.strip()
+    line = yield
+    while line is not None:
+        code = line.code
         # Skip empty lines, comments, and preprocessor directives
-        if not line or line.startswith('//') or line.startswith('#') or line.startswith('/*') or line.startswith('*') or '=' not in line:
+        if not code or code.startswith('#') or '=' not in code:
+            line = yield
             continue
 
         # Check for variable declarations
-        match = var_decl_pattern.search(line)
+        match = VAR_DECL_PATTERN.search(code)
         if match:
             var_type = match.group(1).strip()
             var_name = match.group(2).strip()
             is_array = match.group(3) is not None
 
-            # Determine the expected prefix
-            expected_prefix = type_prefixes.get(var_type.replace('*', ''), '')
-            if is_array:
-                expected_prefix = 'a' + expected_prefix
-            if '*' in var_type:
-                expected_prefix = 'p' + expected_prefix
-
             # Check if the variable name starts with the expected prefix
-            if not var_name.startswith(expected_prefix):
-                issues.append(
-                    f"Line {i}: Variable '{var_name}' does not follow Hungarian notation for type '{var_type}' (violates DV3)"
-                )
+            if not var_name.startswith(expected_prefix(var_type, is_array)):
+                issues.append(Issue('DV3', line.number, None,
+                                    f"Variable '{var_name}' does not follow Hungarian notation for type '{var_type}' (violates DV3)"))
+        line = yield
 
-    return issues
-    
-    
+    yield issues
+
+def expected_prefix(var_type, is_array):
+    """Get the Hungarian notation prefix of a variable type (Rule DV3)
+    Args:
+        var_type: Type as declared, pointers include the '*'
+        is_array: Whether the variable is an array
+    Returns:
+        Expected prefix of the variable name
+    """
+    prefix = TYPE_PREFIXES.get(var_type.replace('*', ''), '')
+    if is_array:
+        prefix = 'a' + prefix
+    if '*' in var_type:
+        prefix = 'p' + prefix
+    return prefix
 
+def check_external_symbols(file_path, index, declarations):
+    """Check the header variables used by a file against Hungarian notation (Rule DV3)
+    Works on the symbol index only, the file is not read again.
+    Args:
+        file_path: Path to source file
+        index: Symbol index (see symbol_index)
+        declarations: Header declarations from symbol_index.header_declarations()
+    Returns:
+        List of Issue, one per wrongly named variable
+    """
+    from symbol_index import external_uses
+    issues = []
+    for name, line, header, header_line, var_type, is_array in external_uses(index, file_path, declarations):
+        if not name.startswith(expected_prefix(var_type, is_array)):
+            issues.append(Issue('DV3', line, None,
+                                f"Variable '{name}' (declared in {os.path.relpath(header)} line {header_line}) does not follow Hungarian notation for type '{var_type}' (violates DV3)"))
     return issues
 
-def check_hungarian_notation_deprecated(lines, filename):
+def check_hungarian_notation_deprecated(filename):
     """Check that variable names use Hungarian notation (Rule DV3 II)
     Args:
-        lines: List of source code lines
         filename: Name of current file
-    Returns:
-        List of violation messages
+    Receives:
+        Lexed source lines (c_lexer.Line), None after the last line
+    Yields:
+        List of Issue
     """
-    if not (filename.endswith('.c') or filename.endswith('.h') or filename.endswith('.cpp')):
-        return []
-        
     issues = []
-    
-    # Define Hungarian notation prefixes
-    type_prefixes = {
-        'int': 'i',
-        'float': 'f',
-        'double': 'd',
-        '_Bool': 'b',
-        'short': 'si',
-        'signed char': 'c',
-        'char': 'c',
-        'short int': 'si',
-        'long int': 'li',
-        'long long int': 'lli',
-        'long double': 'ld',
-        'unsigned short int': 'usi',
-        'unsigned char': 'uc',
-        'unsigned int': 'ui',
-        'unsigned long int': 'uli',
-        'unsigned long long int': 'ulli',
-    }
+    type_prefixes = TYPE_PREFIXES
     
     # Check for prefix in variable name and then checks if it is declared 
     # if variable is declared without the prefix in its name than it is a violation
-    for i, line in enumerate(lines, 1):
-        line = line.strip()
-        # Skip empty lines and comments
-        if not line or line.startswith('//') or line.startswith('#') or line.startswith('/*') or line.startswith('*'):
+    line = yield
+    while line is not None:
+        code = line.code
+        line_number = line.number
+        line = yield
+        # Skip empty lines, comments, and preprocessor directives
+        if not code or code.startswith('#'):
             continue
         # Skip lines that are not variable declarations
-        if not '=' in line:
+        if not '=' in code:
             continue
         # Check if the line contains a variable declaration
-        if any(line.startswith(prefix) for prefix in type_prefixes.keys()):
+        if any(code.startswith(prefix) for prefix in type_prefixes.keys()):
             # Split the line to get the variable declaration part
-            declaration = line.split('=')[0]
+            declaration = code.split('=')[0]
             declaration = re.sub(r'\s+', ' ', declaration)
             declaration = declaration.strip()
             parts = declaration.split(' ')
@@ -381,11 +460,12 @@ def check_hungarian_notation_deprecated(lines, filename):
                 prefix = type_prefixes[var_type]
                 # Check if the variable name starts with the prefix
                 if not var_name.startswith(prefix):
-                    issues.append(f"Line {i}: Variable '{var_name}' does not follow Hungarian notation for '{var_type}' (violates DV3 II)")
+                    issues.append(Issue('DV3', line_number, None,
+                                        f"Variable '{var_name}' does not follow Hungarian notation for '{var_type}' (violates DV3 II)"))
             else:
-                issues.append(f"Line {i}: Unknown type '{var_type}' (violates DV3 II)")
+                issues.append(Issue('DV3', line_number, None, f"Unknown type '{var_type}' (violates DV3 II)"))
 
-    return issues
+    yield issues
 
 
 # --------------------------
@@ -404,60 +484,736 @@ CHECKS = {
     'DV3': check_hungarian_notation
 }
 
+# File extensions each check applies to (None: all files)
+CHECK_EXTENSIONS = {
+    'A4': None,
+    'A5': ('.c', '.h'),
+    'A6': ('.c', '.cpp'),
+    'A7': ('.c',),
+    'A8': ('.c',),
+    'CL1': None,
+    'CL5': None,
+    'DV3': ('.c', '.h', '.cpp')
+}
+
+# Checks that receive outlined lines (c_outline.OutlineLine) instead of plain lexed lines
+OUTLINE_CHECKS = frozenset(('A6', 'A8', 'CL1'))
+
+# Checks whose result depends on the path of a file instead of its content
+PATH_CHECKS = frozenset(('A5',))
+
+# Checks that do not look at the content of the lines (A7 only counts them)
+UNLEXED_CHECKS = frozenset(('A5', 'A7'))
+
+# Checks whose issues each depend on a single (outlined) line only
+LINE_CHECKS = frozenset(('A4', 'CL1', 'CL5', 'DV3'))
+
+# Rule plans built in this process, keyed by the requested check IDs
+_rule_plans = {}
+
+
+def get_rule_plan(enabled_checks):
+    """Get the rule plan of the requested checks, built once per run (and worker)
+    Args:
+        enabled_checks: List of check IDs to execute
+    Returns:
+        Dict mapping file extensions to lists of (check ID, check function)
+    """
+    key = tuple(enabled_checks)
+    if key not in _rule_plans:
+        _rule_plans[key] = {extension: rules_for_extension(key, extension) for extension in SOURCE_EXTENSIONS}
+    return _rule_plans[key]
+
+def rules_for_extension(enabled_checks, extension):
+    """Select the checks that apply to files with a given extension
+    Args:
+        enabled_checks: List of check IDs to execute
+        extension: File extension including the dot
+    Returns:
+        List of (check ID, check function) in the requested order
+    """
+    rules = []
+    for check_id in enabled_checks:
+        if check_id in CHECKS:
+            extensions = CHECK_EXTENSIONS[check_id]
+            if extensions is None or extension in extensions:
+                rules.append((check_id, CHECKS[check_id]))
+    return rules
+
+
+def split_lines(text):
+    """Split file content into lines like readlines() in text mode
+    Args:
+        text: Decoded file content
+    Returns:
+        List of lines without line breaks
+    """
+    lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    if lines[-1] == '':
+        lines.pop()
+    return lines
+
+def check_content(content, filename, enabled_checks):
+    """Run enabled style checks on the raw content of a file
+    Args:
+        content: Raw file content (bytes)
+        filename: Name of the file
+        enabled_checks: List of check IDs to execute
+    Returns:
+        List of all detected issues (Issue)
+    """
+    try:
+        lines = split_lines(content.decode('utf-8'))
+    except UnicodeDecodeError:
+        return [Issue(None, None, None, ENCODING_ERROR)]
+    return run_checks(lines, filename, enabled_checks)
+
+def check_stream(file_path, enabled_checks, timings=None):
+    """Run enabled style checks on a file while reading it line by line
+    Args:
+        file_path: Path to source file
+        enabled_checks: List of check IDs to execute
+        timings: Dict receiving [seconds, calls] per rule, None to disable profiling
+    Returns:
+        List of all detected issues (Issue)
+    """
+    filename = os.path.basename(file_path)
+    try:
+        with open(file_path, 'r', encoding='utf-8', buffering=STREAM_BUFFER) as f:
+            return run_checks((line.rstrip('\n') for line in f), filename, enabled_checks, timings)
+    except UnicodeDecodeError:
+        return [Issue(None, None, None, ENCODING_ERROR)]
+
+def run_checks(lines, filename, enabled_checks, timings=None):
+    """Lex source lines once and feed every line through all applicable checks
+    Args:
+        lines: Iterable of source lines without line breaks
+        filename: Name of the file
+        enabled_checks: List of check IDs to execute
+        timings: Dict receiving [seconds, calls] per rule, None to disable profiling
+    Returns:
+        List of all detected issues (Issue)
+    """
+    if timings is not None:
+        return run_checks_profiled(lines, filename, enabled_checks, timings)
+    plan = get_rule_plan(enabled_checks)
+    extension = os.path.splitext(filename)[1]
+    if extension not in plan:
+        plan[extension] = rules_for_extension(enabled_checks, extension)
+
+    # Start the checks, they wait for the first line
+    machines = []
+    for check_id, check in plan[extension]:
+        if(DEBUG):print(f"Running check {check_id} on {filename}")
+        machine = check(filename)
+        next(machine)
+        machines.append(machine)
+    feeds = [machine.send for machine in machines]
+
+    # Lex the file once, all checks work on the same token stream
+    for line in source_lines(lines, plan[extension]):
+        for feed in feeds:
+            feed(line)
+
+    issues = []
+    for machine in machines:
+        issues += machine.send(None)
+    return issues
+
+def source_lines(lines, rules):
+    """Lex source lines, and outline them if one of the rules needs the outline
+    Args:
+        lines: Iterable of source lines without line breaks
+        rules: List of (check ID, check function) from the rule plan
+    Returns:
+        Generator of c_lexer.Line or c_outline.OutlineLine, the unchanged
+        lines if no rule looks at their content
+    """
+    if all(check_id in UNLEXED_CHECKS for check_id, _ in rules):
+        return lines
+    lexed = iter_lines(lines)
+    if any(check_id in OUTLINE_CHECKS for check_id, _ in rules):
+        return iter_outline(lexed)
+    return lexed
+
+def run_checks_profiled(lines, filename, enabled_checks, timings):
+    """Same as run_checks, but measures the time spent in every check
+    Kept separate, so run_checks does not pay for the clock calls.
+    Args:
+        lines: Iterable of source lines without line breaks
+        filename: Name of the file
+        enabled_checks: List of check IDs to execute
+        timings: Dict receiving [seconds, calls] per rule and for the lexer
+    Returns:
+        List of all detected issues (Issue)
+    """
+    clock = time.perf_counter
+    file_start = clock()
+    plan = get_rule_plan(enabled_checks)
+    extension = os.path.splitext(filename)[1]
+    if extension not in plan:
+        plan[extension] = rules_for_extension(enabled_checks, extension)
+
+    machines = []
+    for check_id, check in plan[extension]:
+        start = clock()
+        machine = check(filename)
+        next(machine)
+        machines.append((check_id, machine.send, [clock() - start]))
+
+    line_count = 0
+    for line in source_lines(lines, plan[extension]):
+        line_count += 1
+        for check_id, feed, elapsed in machines:
+            start = clock()
+            feed(line)
+            elapsed[0] += clock() - start
+
+    issues = []
+    for check_id, feed, elapsed in machines:
+        start = clock()
+        issues += feed(None)
+        elapsed[0] += clock() - start
+        add_time(timings, check_id, elapsed[0], line_count + 1)
+    # Whatever was not spent in a check went to reading and lexing
+    rules_time = sum(elapsed[0] for _, _, elapsed in machines)
+    add_time(timings, 'lexer', clock() - file_start - rules_time, line_count)
+    return issues
+
+def check_file(file_path, enabled_checks, cache_dir=None, profile=None, fix=False):
+    """Run enabled style checks on a single file without printing anything
+    Args:
+        file_path: Path to source file
+        enabled_checks: List of check IDs to execute
+        cache_dir: Result cache directory, None to disable the cache
+        profile: Profile (see style_profile) to record timings in, None to disable profiling
+        fix: Fix the file first (see fix_file)
+    Returns:
+        List of all detected issues (Issue)
+    """
+    timings = None if profile is None else profile.setdefault(file_path, {})
+    if fix:
+        return fix_file(file_path, enabled_checks, cache_dir, timings)
+    if cache_dir is None:
+        return check_stream(file_path, enabled_checks, timings)
+
+    # The file name is part of the key because A5 depends on it
+    start = time.perf_counter()
+    filename = os.path.basename(file_path)
+    key = cache_key(file_digest(file_path), filename, enabled_checks, source_fingerprint(CHECKER_SOURCES))
+    cached = load_result(cache_dir, key)
+    if cached is None:
+        if(DEBUG):print(f"Cache miss for {file_path}")
+        issues = check_stream(file_path, enabled_checks, timings)
+        store_result(cache_dir, key, [issue.to_json() for issue in issues])
+        return issues
+    if timings is not None:
+        add_time(timings, '(cache)', time.perf_counter() - start)
+    return [Issue.from_json(value) for value in cached]
+
+def fix_file(file_path, enabled_checks, cache_dir=None, timings=None):
+    """Apply the converter fixes of the enabled checks to a file and check the result
+    The file is read once and written at most once (only if a fix changed it), the
+    remaining issues are found in the fixed code held in memory. A fix that would
+    change more than comments, layout and names is not written (see
+    style_converter.same_code). Written files are named on stderr.
+    Args:
+        file_path: Path to source file
+        enabled_checks: List of check IDs to execute, those in style_converter.CHECKS are fixed
+        cache_dir: Result cache directory, None to disable the cache
+        timings: Dict receiving [seconds, calls] per rule, None to disable profiling
+    Returns:
+        List of Issue left after fixing
+    """
+    import style_converter
+    with open(file_path, 'rb') as f:
+        content = f.read()
+    try:
+        text = content.decode('utf-8')
+    except UnicodeDecodeError:
+        return [Issue(None, None, None, ENCODING_ERROR)]
+    filename = os.path.basename(file_path)
+
+    fixes = [check_id for check_id in enabled_checks if check_id in style_converter.CHECKS]
+    if fixes:
+        fixed = fix_text(text, filename, fixes, timings)
+        # Never write a conversion that changed more than comments, layout and names
+        if fixed != text and not style_converter.same_code(split_lines(text), split_lines(fixed)):
+            print(f"Warning: not fixing {file_path}, the conversion would change its code", file=sys.stderr)
+        elif fixed != text:
+            text = fixed
+            content = text.encode('utf-8')
+            mode = stat.S_IMODE(os.stat(file_path).st_mode)
+            style_converter.write_atomic(file_path, content, mode)
+            print(f"Fixed {file_path}", file=sys.stderr)
+
+    if cache_dir is None:
+        return run_checks(split_lines(text), filename, enabled_checks, timings)
+    # Same key as a later check of the written file
+    import hashlib
+    key = cache_key(hashlib.sha256(content).hexdigest(), filename, enabled_checks, source_fingerprint(CHECKER_SOURCES))
+    cached = load_result(cache_dir, key)
+    if cached is None:
+        issues = run_checks(split_lines(text), filename, enabled_checks, timings)
+        store_result(cache_dir, key, [issue.to_json() for issue in issues])
+        return issues
+    return [Issue.from_json(value) for value in cached]
+
+def fix_text(text, filename, fixes, timings=None):
+    """Run converter functions on source code
+    Args:
+        text: Source code
+        filename: Name of the file
+        fixes: Check IDs of the converter functions to run, in order
+        timings: Dict receiving [seconds, calls] per rule, None to disable profiling
+    Returns:
+        Fixed source code, the unchanged text if no line changed
+    """
+    import style_converter
+    lines, newline, final = style_converter.split_text(text)
+    fix_timings = None if timings is None else {}
+    # The converters report every step on stdout
+    with contextlib.redirect_stdout(io.StringIO()):
+        fixed = style_converter.convert_lines(list(lines), filename, fixes, fix_timings)
+    if fix_timings:
+        for check_id, (seconds, calls) in fix_timings.items():
+            add_time(timings, f"{check_id} (fix)", seconds, calls)
+    if fixed == lines:
+        # Line endings and the final newline stay untouched
+        return text
+    return style_converter.join_text(fixed, newline, final)
 
-def process_file(file_path, enabled_checks):
+def process_file(file_path, enabled_checks, cache_dir=None, profile=None, symbols=None, fix=False):
     """Run enabled style checks on a single file
     Args:
         file_path: Path to source file
         enabled_checks: List of check IDs to execute
+        cache_dir: Result cache directory, None to disable the cache
+        profile: Profile (see style_profile) to record timings in, None to disable profiling
+        symbols: (index, header declarations) from load_symbols for cross-file DV3 checks, or None
+        fix: Fix the file first (see fix_file)
     Returns:
-        List of all detected issues
+        List of Issue
     """
-    print(f"\nProcessing file: {file_path}")
     # Validate file path
     if not os.path.isfile(file_path):
         print(f"Error: {file_path} is not a valid file.")
         return []
-    
-    # Process file
-    issues = []
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            lines = [line.rstrip('\n') for line in f.readlines()]
-            filename = os.path.basename(file_path)
-            
-            for check_id in enabled_checks:
-                if check_id in CHECKS:
-                    if(DEBUG):print(f"Running check {check_id} on {filename}")
-                    issues += CHECKS[check_id](lines, filename)
-    except UnicodeDecodeError:
-        issues.append("File encoding error - unable to process")
-    return issues
+    for _, issues in check_paths([file_path], enabled_checks, 1, cache_dir, profile, symbols, fix=fix):
+        return issues
+
+def check_chunk(chunk, enabled_checks, cache_dir=None, profile=None, fix=False):
+    """Run enabled style checks on a chunk of files (executed in a worker process)
+    Args:
+        chunk: List of file paths
+        enabled_checks: List of check IDs to execute
+        cache_dir: Result cache directory, None to disable the cache
+        profile: Profile (see style_profile) to record timings in, None to disable profiling
+        fix: Fix the files first (see fix_file)
+    Returns:
+        List of (file path, issues) tuples in the order of the chunk
+    """
+    return [(file_path, check_file(file_path, enabled_checks, cache_dir, profile, fix)) for file_path in chunk]
+
+def find_source_files(target_dir, walk=None, directories=None):
+    """Collect all C/C++ files below a directory in a deterministic order
+    Args:
+        target_dir: Directory to search
+        walk: file_walker.WalkOptions (excludes, .gitignore, size limit), None for the defaults
+        directories: Dict receiving the visited directories (see file_walker.walk_files), or None
+    Returns:
+        Sorted list of file paths
+    """
+    too_large = []
+    file_paths = walk_files(target_dir, SOURCE_EXTENSIONS, walk, too_large, directories)
+    for file_path in too_large:
+        print(f"Warning: skipping {file_path}, it is larger than the size limit (--max-size)", file=sys.stderr)
+    return file_paths
+
+def make_chunks(file_paths, chunk_bytes=CHUNK_BYTES):
+    """Group files into chunks of roughly equal size to keep IPC overhead low
+    Args:
+        file_paths: List of file paths
+        chunk_bytes: Target amount of source bytes per chunk
+    Returns:
+        List of chunks (lists of file paths), in the order of file_paths
+    """
+    chunks = []
+    chunk = []
+    size = 0
+    for file_path in file_paths:
+        try:
+            size += os.path.getsize(file_path)
+        except OSError:
+            pass
+        chunk.append(file_path)
+        if size >= chunk_bytes:
+            chunks.append(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        chunks.append(chunk)
+    return chunks
 
-def process_directory(target_dir, requested_checks):
+def iter_results(file_paths, requested_checks, jobs, cache_dir=None, profile=None, symbols=None, fix=False):
+    """Check files, in parallel if requested, and yield results in path order
+    Args:
+        file_paths: List of file paths
+        requested_checks: List of check IDs to execute
+        jobs: Number of worker processes
+        cache_dir: Result cache directory, None to disable the cache
+        profile: Profile (see style_profile) to record timings in, None to disable profiling
+        symbols: (index, header declarations) from load_symbols for cross-file DV3 checks, or None
+        fix: Fix the files first (see fix_file)
+    Returns:
+        Generator of (file path, issues) tuples
+    """
+    results = iter_file_results(file_paths, requested_checks, jobs, cache_dir, profile, fix)
+    if symbols is None:
+        yield from results
+        return
+    for file_path, issues in results:
+        yield file_path, issues + check_external_symbols(file_path, *symbols)
+
+def iter_file_results(file_paths, requested_checks, jobs, cache_dir=None, profile=None, fix=False):
+    """Run the checks of iter_results on every file, byte-identical files only once"""
+    # Every copy has to be fixed on its own
+    duplicates = {} if fix else find_duplicates(file_paths)
+    if(DEBUG):print(f"{len(duplicates)} of {len(file_paths)} files are duplicates")
+    results = iter_unique_results([path for path in file_paths if path not in duplicates],
+                                  requested_checks, jobs, cache_dir, profile, fix)
+    originals = set(duplicates.values())
+    shared = {}
+    for file_path in file_paths:
+        original = duplicates.get(file_path)
+        if original is None:
+            file_path, issues = next(results)
+            if file_path in originals:
+                shared[file_path] = issues
+            yield file_path, issues
+        else:
+            yield file_path, copy_result(shared[original], file_path, requested_checks)
+
+def copy_result(issues, file_path, requested_checks):
+    """Adapt the issues of a file to a byte-identical file at another path
+    Only the path checks (A5) are run again, the other issues are taken over.
+    Args:
+        issues: Issues of the original file
+        file_path: Path of the duplicate
+        requested_checks: List of check IDs to execute
+    Returns:
+        List of issues of the duplicate
+    """
+    path_checks = [check_id for check_id in requested_checks if check_id in PATH_CHECKS]
+    # Files that could not be checked (encoding errors) have no rule issues at all
+    if not path_checks or any(issue.rule is None for issue in issues):
+        return list(issues)
+    filename = os.path.basename(file_path)
+    kept = [issue for issue in issues if issue.rule not in PATH_CHECKS]
+    own = run_checks((), filename, path_checks)
+    # Issues are ordered like the rule plan, the sort is stable within a rule
+    plan = rules_for_extension(requested_checks, os.path.splitext(filename)[1])
+    order = {check_id: position for position, (check_id, _) in enumerate(plan)}
+    return sorted(kept + own, key=lambda issue: order[issue.rule])
+
+def iter_unique_results(file_paths, requested_checks, jobs, cache_dir=None, profile=None, fix=False):
+    """Run the checks on every file, in parallel if requested"""
+    # A pool only pays off with more than one chunk of work
+    chunks = make_chunks(file_paths)
+    if jobs <= 1 or len(chunks) <= 1:
+        for file_path in file_paths:
+            yield file_path, check_file(file_path, requested_checks, cache_dir, profile, fix)
+        return
+    import multiprocessing
+    with multiprocessing.Pool(min(jobs, len(chunks))) as pool:
+        tasks = [(chunk, requested_checks, cache_dir, profile is not None, fix) for chunk in chunks]
+        # imap keeps the chunk order, so output is deterministic
+        for results, chunk_profile in pool.imap(_check_chunk_task, tasks):
+            if chunk_profile:
+                merge_profile(profile, chunk_profile)
+            yield from results
+
+def _check_chunk_task(task):
+    """Unpack a pool task for check_chunk and return the worker's profile with the results"""
+    chunk, enabled_checks, cache_dir, profiling, fix = task
+    profile = {} if profiling else None
+    return check_chunk(chunk, enabled_checks, cache_dir, profile, fix), profile
+
+def print_file_results(file_path, issues):
+    """Print the header and the issues of a checked file right away
+    Args:
+        file_path: Path to source file
+        issues: List of detected issues
+    """
+    print(format_text(file_path, issues), end='', flush=True)
+
+# --------------------------
+# Library API
+# --------------------------
+
+
+def resolve_rules(rules):
+    """Validate the rule IDs passed to the library API
+    Args:
+        rules: Iterable of check IDs, None for all checks
+    Returns:
+        List of check IDs
+    Raises:
+        ValueError: If a check ID is unknown
+    """
+    if rules is None:
+        return list(CHECKS)
+    rules = list(rules)
+    invalid = [rule for rule in rules if rule not in CHECKS]
+    if invalid:
+        raise ValueError(f"Invalid check IDs: {', '.join(invalid)}")
+    return rules
+
+def check_source(text, filename, rules=None):
+    """Check source code held in memory, e.g. an unsaved editor buffer
+    Args:
+        text: Source code, bytes are decoded as UTF-8
+        filename: Name (or path) of the file, selects the rules and is checked by A5
+        rules: List of check IDs, None for all checks
+    Returns:
+        List of Issue
+    Raises:
+        ValueError: If a check ID is unknown
+    """
+    enabled = resolve_rules(rules)
+    filename = os.path.basename(filename)
+    if isinstance(text, bytes):
+        return check_content(text, filename, enabled)
+    return run_checks(split_lines(text), filename, enabled)
+
+def check_paths(paths, rules=None, jobs=1, cache_dir=None, profile=None, symbols=None, walk=None, fix=False):
+    """Check files and directories
+    Args:
+        paths: File and directory paths, directories are searched for source files
+        rules: List of check IDs, None for all checks
+        jobs: Number of worker processes
+        cache_dir: Result cache directory, None to disable the cache
+        profile: Profile (see style_profile) to record timings in, None to disable profiling
+        symbols: (index, header declarations) from load_symbols for cross-file DV3 checks, or None
+        walk: file_walker.WalkOptions for searching directories, None for the defaults
+        fix: Fix the files with the converter functions of the rules first (see fix_file)
+    Returns:
+        Generator of (file path, list of Issue) tuples in path order
+    Raises:
+        ValueError: If a check ID is unknown
+        FileNotFoundError: If a path is neither a file nor a directory
+    """
+    enabled = resolve_rules(rules)
+    file_paths = []
+    for path in paths:
+        if os.path.isdir(path):
+            file_paths += find_source_files(path, walk)
+        elif os.path.isfile(path):
+            file_paths.append(path)
+        else:
+            raise FileNotFoundError(f"{path} is not a valid file or directory")
+    return iter_results(file_paths, enabled, jobs, cache_dir, profile, symbols, fix)
+
+def process_directory(target_dir, requested_checks, report, jobs=1, cache_dir=None, profile=None, symbols=None, walk=None,
+                      max_issues=None, failures=None, fix=False):
     """Process all files in the target directory
     Args:
         target_dir: Directory to process
         requested_checks: List of check IDs to execute
+        report: Started report_writer receiving the results
+        jobs: Number of worker processes
+        cache_dir: Result cache directory, None to disable the cache
+        profile: Profile (see style_profile) to record timings in, None to disable profiling
+        symbols: (index, header declarations) from load_symbols for cross-file DV3 checks, or None
+        walk: file_walker.WalkOptions for searching the directory, None for the defaults
+        max_issues: Stop checking further files after this many issues, None for no limit
+        failures: Previously failing files (see load_failures) to check first and to update, or None
+        fix: Fix the files first (see fix_file)
     """
-    print(f"\nProcessing directory: {target_dir}")
+    report.send(f"\nProcessing directory: {target_dir}")
     # Validate target directory
     if not os.path.isdir(target_dir):
         print(f"Error: {target_dir} is not a valid directory.")
         sys.exit(1)
 
+    file_paths = find_source_files(target_dir, walk)
+    if failures is not None:
+        file_paths = prioritize_files(file_paths, failures)
     # Process each file in the directory
-    for root, _, files in os.walk(target_dir):
-        for file in files:
-            if file.endswith(('.c', '.cpp', '.h')):
-                file_path = os.path.join(root, file)
-                issues = process_file(file_path, requested_checks)
-                if issues:
-                    print(f"Issues in {file_path}:")
-                    for issue in issues:
-                        print(f"  - {issue}")
-                else:
-                    print(f"No issues found in {file_path}")
+    results = check_paths(file_paths, requested_checks, jobs, cache_dir, profile, symbols, fix=fix)
+    for file_path, issues in limit_results(results, max_issues, failures):
+        report.send((file_path, issues))
+
+def process_watch(target_dir, requested_checks, jobs=1, cache_dir=None, walk=None):
+    """Process all files in the target directory, then re-check files as they change
+    Args:
+        target_dir: Directory to watch
+        requested_checks: List of check IDs to execute
+        jobs: Number of worker processes
+        cache_dir: Result cache directory, None to disable the cache
+        walk: file_walker.WalkOptions for searching the directory, None for the defaults
+    """
+    from style_watch import watch
+    print(f"\nWatching directory: {target_dir}")
+    check_files = functools.partial(check_paths, rules=list(requested_checks), jobs=jobs, cache_dir=cache_dir)
+    find_files = functools.partial(find_source_files, walk=walk)
+    watch(target_dir, SOURCE_EXTENSIONS, walk, find_files, check_files, print_file_results)
+
+def filter_changed_issues(issues, ranges):
+    """Keep only the issues that are located in changed lines
+    Args:
+        issues: List of Issue
+        ranges: Sorted list of (first, last) changed lines
+    Returns:
+        List of issues in changed lines plus all file-level issues
+    """
+    from git_changes import in_changed_lines
+    kept = []
+    for issue in issues:
+        # File-level rules (A5, A6, A7, A8) have no line and always apply
+        if issue.line is None or in_changed_lines(issue.line, ranges):
+            kept.append(issue)
+    return kept
+
+def process_diff(target, rev, requested_checks, report, jobs=1, cache_dir=None, profile=None, symbols=None,
+                 max_issues=None, failures=None):
+    """Process only the files and lines changed since a git revision
+    Args:
+        target: Directory (or single file) inside a git work tree
+        rev: Revision to compare the work tree against
+        requested_checks: List of check IDs to execute
+        report: Started report_writer receiving the results
+        jobs: Number of worker processes
+        cache_dir: Result cache directory, None to disable the cache
+        profile: Profile (see style_profile) to record timings in, None to disable profiling
+        symbols: (index, header declarations) from load_symbols for cross-file DV3 checks, or None
+        max_issues: Stop checking further files after this many issues, None for no limit
+        failures: Previously failing files (see load_failures) to check first and to update, or None
+    """
+    from git_changes import changed_lines
+    report.send(f"\nProcessing changes since {rev} in: {target}")
+    is_file = os.path.isfile(target)
+    directory = (os.path.dirname(target) or '.') if is_file else target
+    try:
+        changes = changed_lines(directory, rev, SOURCE_EXTENSIONS)
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if is_file:
+        file_path = os.path.normpath(target)
+        changes = {file_path: changes[file_path]} if file_path in changes else {}
+
+    # A path that does not exist (e.g. misread from the diff) is reported, not checked
+    file_paths = []
+    for file_path in sorted(changes):
+        if os.path.isfile(file_path):
+            file_paths.append(file_path)
+        else:
+            print(f"Warning: skipping {file_path}, the changed file does not exist", file=sys.stderr)
+    if not file_paths:
+        report.send("No changed files found")
+    if failures is not None:
+        file_paths = prioritize_files(file_paths, failures)
+    results = ((file_path, filter_changed_issues(issues, changes[file_path]))
+               for file_path, issues in check_paths(file_paths, requested_checks, jobs, cache_dir, profile, symbols))
+    for file_path, issues in limit_results(results, max_issues, failures):
+        report.send((file_path, issues))
+
+def limit_results(results, max_issues, failures=None):
+    """Pass on results until the issue limit is reached
+    Args:
+        results: Generator of (file path, issues) tuples
+        max_issues: Stop after this many issues, None for no limit
+        failures: Previously failing files (see load_failures) to update, or None
+    Returns:
+        Generator of (file path, issues) tuples
+    """
+    count = 0
+    for file_path, issues in results:
+        if failures is not None:
+            if issues:
+                failures[os.path.abspath(file_path)] = len(issues)
+            else:
+                failures.pop(os.path.abspath(file_path), None)
+        yield file_path, issues
+        count += len(issues)
+        if max_issues is not None and count >= max_issues:
+            # No further files are scheduled, running worker processes are terminated
+            results.close()
+            return
+
+def prioritize_files(file_paths, failures):
+    """Order files so the ones most likely to fail are checked first
+    Files that failed last time come first, then the most recently modified ones.
+    Args:
+        file_paths: List of file paths
+        failures: Previously failing files (see load_failures)
+    Returns:
+        Reordered list of file paths
+    """
+    def priority(file_path):
+        try:
+            modified = os.stat(file_path).st_mtime_ns
+        except OSError:
+            modified = 0
+        return (os.path.abspath(file_path) not in failures, -modified)
+    return sorted(file_paths, key=priority)
+
+def load_failures(path):
+    """Load the files that failed in earlier runs
+    Args:
+        path: Failures file
+    Returns:
+        Dict mapping absolute file paths to their number of issues, empty if the file is missing or damaged
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            failures = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return failures if isinstance(failures, dict) else {}
+
+def save_failures(failures, path):
+    """Save the failing files for the next run, atomically replacing the previous ones
+    Args:
+        failures: Dict from load_failures, updated by limit_results
+        path: Failures file
+    """
+    import tempfile
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(failures, f)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+    except OSError as e:
+        # Only the order of the next run depends on it
+        print(f"Warning: unable to save {path}: {e}", file=sys.stderr)
+
+def load_symbols(target, index_file, walk=None):
+    """Update the symbol index of the checked tree and collect the header declarations
+    Args:
+        target: Directory (or single file) to check, its whole tree is indexed
+        index_file: Path of the index file
+        walk: file_walker.WalkOptions for searching the tree, None for the defaults
+    Returns:
+        Tuple of (index, header declarations)
+    """
+    from symbol_index import declaration_pattern, load_index, save_index, update_index, header_declarations
+    root = target if os.path.isdir(target) else os.path.dirname(target) or '.'
+    index = load_index(index_file)
+    parsed = update_index(index, find_source_files(root, walk), declaration_pattern(TYPE_PREFIXES))
+    if(DEBUG):print(f"Symbol index: {parsed} files parsed")
+    try:
+        save_index(index, index_file)
+    except OSError as e:
+        # Without a stored index the next run parses all files again
+        print(f"Warning: unable to save the symbol index {index_file}: {e}", file=sys.stderr)
+    return index, header_declarations(index)
 
 def print_checks(requested_checks=None):
     """Print available checks and their descriptions"""
@@ -473,10 +1229,11 @@ def print_checks(requested_checks=None):
         else:
             print(f"  - {check_id}: Not a valid check ID")
 
-def validate_checks(checks):
+def validate_checks(checks, quiet=False):
     """Validate requested checks against available checks and print them
     Args:
         checks: List of check IDs to validate
+        quiet: Do not print the valid checks
     Returns:
         List of invalid check IDs
     """
@@ -485,41 +1242,202 @@ def validate_checks(checks):
         print(f"Invalid check IDs: {', '.join(invalid)}")
         print(f"Available checks: {', '.join(CHECKS.keys())}")
         sys.exit(1)
-    else :
+    elif not quiet:
         print_checks(checks)
     return checks
 
+def parse_arguments(args):
+    """Split command line arguments into target, checks and options
+    Args:
+        args: Command line arguments without the program name
+    Returns:
+        Tuple of (target, list of check IDs, dict of options)
+    """
+    options = {'jobs': os.cpu_count() or 1, 'cache_dir': None, 'cache_size': DEFAULT_CACHE_SIZE,
+               'diff': None, 'watch': False, 'format': 'text', 'quiet': False,
+               'profile': False, 'profile_output': None, 'index_file': None,
+               'excludes': [], 'gitignore': True, 'max_size': DEFAULT_MAX_SIZE, 'max_issues': None,
+               'fix': False, 'summary': False}
+    positional = []
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in ('--jobs', '-j'):
+            i += 1
+            if i >= len(args) or not args[i].isdigit() or int(args[i]) < 1:
+                print(f"Error: {arg} requires a positive number of jobs.")
+                sys.exit(1)
+            options['jobs'] = int(args[i])
+        elif arg == '--cache':
+            options['cache_dir'] = DEFAULT_CACHE_DIR
+        elif arg == '--cache-dir':
+            i += 1
+            if i >= len(args):
+                print(f"Error: {arg} requires a directory.")
+                sys.exit(1)
+            options['cache_dir'] = args[i]
+        elif arg == '--cache-size':
+            i += 1
+            if i >= len(args) or not args[i].isdigit():
+                print(f"Error: {arg} requires a size in MB.")
+                sys.exit(1)
+            options['cache_size'] = int(args[i]) * 1024 * 1024
+        elif arg == '--diff':
+            i += 1
+            if i >= len(args):
+                print(f"Error: {arg} requires a git revision.")
+                sys.exit(1)
+            options['diff'] = args[i]
+        elif arg == '--watch':
+            options['watch'] = True
+        elif arg == '--format':
+            i += 1
+            if i >= len(args) or args[i] not in FORMATS:
+                print(f"Error: {arg} requires one of: {', '.join(FORMATS)}.")
+                sys.exit(1)
+            options['format'] = args[i]
+        elif arg in ('--quiet', '-q'):
+            options['quiet'] = True
+        elif arg == '--index':
+            from symbol_index import DEFAULT_INDEX_FILE
+            options['index_file'] = DEFAULT_INDEX_FILE
+        elif arg == '--index-file':
+            i += 1
+            if i >= len(args):
+                print(f"Error: {arg} requires a file name.")
+                sys.exit(1)
+            options['index_file'] = args[i]
+        elif arg == '--profile':
+            options['profile'] = True
+        elif arg == '--exclude':
+            i += 1
+            if i >= len(args):
+                print(f"Error: {arg} requires a pattern.")
+                sys.exit(1)
+            options['excludes'].append(args[i])
+        elif arg == '--no-ignore':
+            options['gitignore'] = False
+        elif arg == '--fix':
+            options['fix'] = True
+        elif arg == '--summary':
+            options['summary'] = True
+        elif arg == '--fail-fast':
+            options['max_issues'] = 1
+        elif arg == '--max-issues':
+            i += 1
+            if i >= len(args) or not args[i].isdigit() or int(args[i]) < 1:
+                print(f"Error: {arg} requires a positive number of issues.")
+                sys.exit(1)
+            options['max_issues'] = int(args[i])
+        elif arg == '--max-size':
+            i += 1
+            if i >= len(args) or not args[i].isdigit():
+                print(f"Error: {arg} requires a size in KB.")
+                sys.exit(1)
+            # 0 disables the limit
+            options['max_size'] = int(args[i]) * 1024 or None
+        elif arg == '--profile-output':
+            i += 1
+            if i >= len(args):
+                print(f"Error: {arg} requires a file name.")
+                sys.exit(1)
+            options['profile'] = True
+            options['profile_output'] = args[i]
+        else:
+            positional.append(arg)
+        i += 1
+    options['walk'] = WalkOptions(tuple(options['excludes']), options['gitignore'], options['max_size'])
+    if not positional:
+        # Diff mode checks the current work tree by default
+        if options['diff'] is not None:
+            return '.', list(CHECKS.keys()), options
+        return None, [], options
+    return positional[0], positional[1:] or list(CHECKS.keys()), options
+
 def main():
     """Main entry point for style checker"""
+    target_dir, requested_checks, options = parse_arguments(sys.argv[1:])
     # Check if enough arguments are provided
-    if len(sys.argv) < 2:
-        print("Usage: python style_checker.py <directory> [CHECKS...]")
+    if target_dir is None:
+        import style_converter
+        from symbol_index import DEFAULT_INDEX_FILE
+        print("Usage: python style_checker.py <directory> [CHECKS...] [--jobs N] [--cache] [--cache-dir DIR] [--cache-size MB] [--diff REV] [--watch] [--format FORMAT] [--quiet] [--index] [--index-file FILE] [--profile] [--profile-output FILE] [--exclude PATTERN] [--no-ignore] [--max-size KB] [--fail-fast] [--max-issues N] [--fix] [--summary]")
         print_checks()
         print("If no checks are specified, all checks will be run.")
+        print("--jobs N checks files in N processes (default: number of CPUs).")
+        print(f"--cache reuses results of unchanged files from {DEFAULT_CACHE_DIR} (or --cache-dir DIR),")
+        print(f"  limited to --cache-size MB (default: {DEFAULT_CACHE_SIZE // (1024 * 1024)}).")
+        print("--diff REV checks only files and lines changed since the git revision REV.")
+        print("--watch keeps running and reports how the issues change whenever a file changes.")
+        print(f"--format FORMAT writes the issues as {', '.join(FORMATS)} (default: text).")
+        print("--quiet only reports files with issues.")
+        print(f"--index keeps a symbol index in {DEFAULT_INDEX_FILE} (or --index-file FILE) and reports uses of")
+        print("  wrongly named variables declared in headers (DV3).")
+        print("--profile reports the slowest rules and files, --profile-output FILE also saves the profile as JSON.")
+        print("--exclude PATTERN skips files and directories matching PATTERN (.gitignore syntax, repeatable).")
+        print("--no-ignore also searches files excluded by .gitignore and the converter's output folders.")
+        print(f"--max-size KB skips larger files (default: {DEFAULT_MAX_SIZE // 1024}, 0 for no limit).")
+        print("--max-issues N stops after N issues (--fail-fast: after the first), files that failed last time")
+        print(f"  (stored in {DEFAULT_FAILURES_FILE}) and recently modified files are checked first.")
+        print(f"--fix first applies the conversions of {', '.join(style_converter.CHECKS)} to the files and reports")
+        print("  the issues that are left (files are only written if they change).")
+        print("--summary only reports the number of issues per rule, directory and file.")
+        print("The exit status is 1 if any issue was found.")
+        sys.exit(1)
+    # Machine readable output contains nothing but the issues
+    quiet = options['quiet'] or options['format'] != 'text'
+    if options['fix'] and (options['diff'] is not None or options['watch']):
+        print("Error: --fix cannot be combined with --diff or --watch.")
+        sys.exit(1)
+    if options['summary'] and (options['watch'] or options['format'] == 'sarif'):
+        print("Error: --summary cannot be combined with --watch or --format sarif.")
         sys.exit(1)
-    # Get target directory and requested checks from command line arguments
-    target_dir = sys.argv[1]
-    requested_checks = sys.argv[2:] if len(sys.argv) > 2 else CHECKS.keys()
     # Validate requested checks and print them
-    validate_checks(requested_checks)
+    validate_checks(requested_checks, quiet)
+    descriptions = {check_id: CHECKS[check_id].__doc__.strip().splitlines()[0] for check_id in requested_checks}
+    report = report_writer(options['format'], quiet, descriptions, summary=options['summary'])
+    next(report)
+    profile = {} if options['profile'] else None
+    symbols = None
+    if options['index_file'] is not None and 'DV3' in requested_checks and not options['watch']:
+        symbols = load_symbols(target_dir, options['index_file'], options['walk'])
+    max_issues = options['max_issues']
+    # Runs with an issue limit remember their failures to check those files first next time
+    failures = load_failures(DEFAULT_FAILURES_FILE) if max_issues is not None else None
     # Check if the target is a file or directory and process accordingly
     is_file = os.path.isfile(target_dir)
-    if not is_file:
+    if options['diff'] is not None and (is_file or os.path.isdir(target_dir)):
+        process_diff(target_dir, options['diff'], requested_checks, report, options['jobs'], options['cache_dir'], profile, symbols,
+                     max_issues, failures)
+    elif options['watch'] and os.path.isdir(target_dir):
+        process_watch(target_dir, requested_checks, options['jobs'], options['cache_dir'], options['walk'])
+    elif not is_file:
         if os.path.isdir(target_dir):
-            process_directory(target_dir, requested_checks)
+            process_directory(target_dir, requested_checks, report, options['jobs'], options['cache_dir'], profile, symbols,
+                              options['walk'], max_issues, failures, options['fix'])
         else:
             print(f"Error: {target_dir} is not a valid file or directory.")
             sys.exit(1)
     else:
         # Process files
-        issues = process_file(target_dir, requested_checks)
-        if issues:
-            print(f"Issues in {target_dir}:")
-            for issue in issues:
-                print(f"  - {issue}")
-        else:
-            print(f"No issues found in {target_dir}")
-    print("\nStyle check completed.")
+        issues = process_file(target_dir, requested_checks, options['cache_dir'], profile, symbols, options['fix'])
+        report.send((target_dir, issues))
+    if options['cache_dir'] is not None:
+        prune_cache(options['cache_dir'], options['cache_size'])
+    report.send("\nStyle check completed.")
+    issue_count = report.send(None)
+    if failures is not None:
+        save_failures(failures, DEFAULT_FAILURES_FILE)
+    if profile is not None:
+        # Keep machine readable output on stdout clean
+        print_profile(profile, stream=sys.stdout if options['format'] == 'text' else sys.stderr)
+        if options['profile_output']:
+            write_profile(profile, options['profile_output'])
+    if max_issues is not None and issue_count >= max_issues:
+        print(f"Issue limit reached (--max-issues {max_issues}), further files were not checked.", file=sys.stderr)
+    # CI can tell a clean tree from a failing one without parsing the output
+    if issue_count:
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -1,10 +1,56 @@
 import re
 import os
+import bisect
+import io
 import sys
+import stat
+import time
+import difflib
+import tempfile
+import contextlib
+import multiprocessing
+from style_profile import add_time, merge_profile, print_profile, write_profile
+from text_edits import apply_edits, replace_text, replace_line, insert_line, delete_line
+from c_lexer import iter_lines, tokenize_line, BLOCK_COMMENT, COMMENT, IDENTIFIER, PREPROCESSOR
+from c_outline import iter_outline
+from file_walker import walk_files, find_duplicates, WalkOptions, DEFAULT_MAX_SIZE
+from symbol_index import (declaration_pattern, load_index, save_index, update_index,
+                          header_declarations, file_symbols, DEFAULT_INDEX_FILE)
 
 # Verbose mode for debugging
 DEBUG = True
 
+# Where converted files go
+OUTPUT_FOLDER = 'folder'      # output/ folder next to the source file
+OUTPUT_IN_PLACE = 'in-place'  # replace the source file
+OUTPUT_DIFF = 'diff'          # unified diff on stdout, nothing is written
+
+# Names in preprocessor directives, which DV3 may rename
+NAME_PATTERN = re.compile(r'\b[A-Za-z_]\w*')
+
+# Directives naming a header, their arguments are never renamed (Rule DV3)
+INCLUDE_DIRECTIVES = ('include', 'include_next', 'import')
+
+# Hungarian notation prefixes (Rule DV3)
+TYPE_PREFIXES = {
+    'int': 'i',
+    'float': 'f',
+    'double': 'd',
+    '_Bool': 'b',
+    'short': 'si',
+    'signed char': 'c',
+    'char': 'c',
+    'short int': 'si',
+    'long int': 'li',
+    'long long int': 'lli',
+    'long double': 'ld',
+    'unsigned short int': 'usi',
+    'unsigned char': 'uc',
+    'unsigned int': 'ui',
+    'unsigned long int': 'uli',
+    'unsigned long long int': 'ulli',
+}
+
 def convert_filename_to_uppercase(filename):
     """Convert first letter of filename to uppercase (Rule A5)
     Args:
@@ -23,16 +69,65 @@ def convert_block_comments_to_single_line(lines):
     Returns:
         lines: All lines including conrrected lines
     """
-    for i, line in enumerate(lines):
-        if line.strip().startswith("/*"):
-            if(DEBUG):print(f"Converting block comment to single-line comment at line {i + 1}")
-            lines[i] = line.replace("/*", "//")
-            while i + 1 < len(lines) and not lines[i + 1].strip().endswith("*/"):
-                lines[i + 1] = lines[i + 1].replace("*", "").strip()
-                lines[i] = lines[i] + " " + lines[i + 1]
-                lines.pop(i + 1)
-            lines[i+1] = lines[i+1].replace("*/", "").strip()    
-    return lines
+    return apply_edits(lines, block_comment_edits(lines))
+
+def block_comment_edits(lines):
+    """Edits converting block comments to single-line comments (Rule A4)
+    Only comments that start a line are converted. A comment within one line is
+    rewritten in that line if nothing follows it. A comment over several lines is
+    joined into its first line, the code behind the closing */ is kept in the
+    closing line. Where a comment ends comes from the lexer, so strings and code
+    are never joined into a comment; an unterminated comment is left as it is.
+    Args:
+        lines: List of source code lines
+    Returns:
+        List of edits (see text_edits)
+    """
+    edits = []
+    # First line and parts of the comment being joined, and the lines it deletes
+    first = None
+    parts = []
+    deleted = []
+    # Messages count lines of the converted file, joined lines are gone
+    joined = 0
+    for i, line in enumerate(iter_lines(lines)):
+        tokens = line.tokens
+        if first is not None:
+            # Inside the comment the first token is its next segment (none for blank lines)
+            if not tokens or not tokens[0].text.endswith("*/"):
+                text = line.text.replace("*", "").strip()
+                if text:
+                    parts.append(text)
+                deleted.append(i)
+                continue
+            comment = tokens[0]
+            # Closing line: the rest of the comment is joined, the code behind it stays
+            text = comment.text[:-2].replace("*", "").strip()
+            if text:
+                parts.append(text)
+            edits.append(replace_line(first, " ".join(parts)))
+            edits += [delete_line(index) for index in deleted]
+            edits.append(replace_line(i, line.text[comment.column + len(comment.text):].strip()))
+            joined += len(deleted)
+            first = None
+            continue
+        if not tokens or tokens[0].kind != BLOCK_COMMENT or not tokens[0].text.startswith("/*"):
+            continue
+        comment = tokens[0]
+        indentation = line.text[:comment.column]
+        if len(comment.text) >= 4 and comment.text.endswith("*/"):
+            # Closed in the same line, converted only if no code or comment follows
+            if len(tokens) == 1 and not line.text[comment.column + len(comment.text):].strip():
+                if(DEBUG):print(f"Converting block comment to single-line comment at line {i - joined + 1}")
+                edits.append(replace_line(i, indentation + "//" + comment.text[2:-2].rstrip()))
+            continue
+        if(DEBUG):print(f"Converting block comment to single-line comment at line {i - joined + 1}")
+        first = i
+        parts = [indentation + "//" + comment.text[2:]]
+        deleted = []
+    if first is not None:
+        if(DEBUG):print(f"Block comment at line {first - joined + 1} is not terminated, it is not converted")
+    return edits
 
 def place_braces_on_new_lines(lines):
     """Place braces on new lines (Rule CL1)
@@ -41,61 +136,49 @@ def place_braces_on_new_lines(lines):
     Returns:
         lines: All lines including conrrected lines
     """
-    for i, line in enumerate(lines):
-        # ToDo: Does not check if it contains { with text after it
-        if ('{' in line.strip() and len(line.strip()) > 1) and not '}' in line.strip():
-            # Check if there is there is text after the brace
-            print(f"Checking line {i + 1}: {line} = {line.endswith('{')}")
-            if line.endswith("{"):
-                if(DEBUG):print(f"Removing brace from line {i}, and placing it on line {i + 1}")
-                # Remove the brace from the current line
-                lines[i] = line.replace("{", "")
-                # get the indentation of the current line
-                indentation = re.match(r"^\s*", line).group(0)
-                # Place the brace on the next line with indentation
-                lines.insert(i+1, indentation + "{")
-            else:
-                continue
-                # Remove the brace from the current line
-                temp = line.split("{")
-                if(DEBUG):
-                    print(f"Splitting line {i} into:")
-                    for t in temp: print(f"  - {t}")
-                indentation = re.match(r"^\s*", lines[i]).group(0)
-                lines[i] = indentation+temp[0].strip()
-                indentation = re.match(r"^\s*", lines[i+1]).group(0)
-                next_line = indentation+"{"+temp[1]
-                lines.insert(i+1, next_line)
-                i += 1
-    return lines
+    return apply_edits(lines, brace_edits(lines))
 
-def convert_variable_names_to_hungarian_notation(lines):
+def brace_edits(lines):
+    """Edits placing opening braces at the end of a line on a new line (Rule CL1)
+    Args:
+        lines: List of source code lines
+    Returns:
+        List of edits (see text_edits)
+    """
+    edits = []
+    # Messages count lines of the converted file, moved braces shift the following lines
+    moved = 0
+    for i, line in enumerate(iter_outline(iter_lines(lines))):
+        # Only braces opening a block are moved, braces of initializer lists stay in place
+        if not line.blocks or '}' in line.code:
+            continue
+        brace = line.blocks[-1]
+        code_tokens = [token for token in line.tokens if token.kind not in (COMMENT, BLOCK_COMMENT)]
+        if code_tokens[0] is brace:
+            continue
+        print(f"Checking line {i + moved + 1}: {line.text} = {line.text.endswith('{')}")
+        if line.text.endswith("{") and code_tokens[-1] is brace:
+            if(DEBUG):print(f"Removing brace from line {i + moved}, and placing it on line {i + moved + 1}")
+            # Remove the brace from the current line
+            edits.append(replace_text(i, brace.column, brace.column + 1, ""))
+            # get the indentation of the current line
+            indentation = re.match(r"^\s*", line.text).group(0)
+            # Place the brace on the next line with indentation
+            edits.append(insert_line(i, indentation + "{"))
+            moved += 1
+    return edits
+
+def convert_variable_names_to_hungarian_notation(lines, renames=None):
     """Convert variable names to Hungarian notation (Rule DV3)
     Args:
         lines: List of source code lines
+        renames: Dict of further names to rename, e.g. header variables from the symbol index
     Returns:
         lines: All lines including conrrected lines
     """
 
     # Define Hungarian notation prefixes
-    type_prefixes = {
-        'int': 'i',
-        'float': 'f',
-        'double': 'd',
-        '_Bool': 'b',
-        'short': 'si',
-        'signed char': 'c',
-        'char': 'c',
-        'short int': 'si',
-        'long int': 'li',
-        'long long int': 'lli',
-        'long double': 'ld',
-        'unsigned short int': 'usi',
-        'unsigned char': 'uc',
-        'unsigned int': 'ui',
-        'unsigned long int': 'uli',
-        'unsigned long long int': 'ulli',
-    }
+    type_prefixes = TYPE_PREFIXES
 
     sorted_types = sorted(type_prefixes.keys(), key=lambda x: len(x), reverse=True)
     # Define regex pattern for variable declarations
@@ -105,16 +188,25 @@ def convert_variable_names_to_hungarian_notation(lines):
     pointer_decl_pattern = re.compile(r'(\b(?:' + '|'.join(type_prefixes.keys()) + r')\*+)')
     # Define regex pattern for array declarations
     array_decl_pattern = re.compile(r'(\b(?:' + '|'.join(type_prefixes.keys()) + r')\s+\w+\s*\[\s*\d+\s*\])')
-    # if wrongly declared variable is found, it will be added to this dict with the correct name to find all occurrences of them later to replace with correct names
-    wrong_var_names = {}
-    for i, line in enumerate(lines):
+    # Functions by first line, a variable declared in a function body is renamed in that function only
+    functions = [function for line in iter_outline(iter_lines(lines)) for function in line.ended]
+    starts = [function.start for function in functions]
+    # Correct names of the declared variables per scope (index in functions, None for the file level),
+    # correctly named variables map to themselves so they hide renames of the file level
+    declared = {}
+    for line in iter_lines(lines):
+        i = line.number - 1
+        # Declarations are searched in the code without comments, like the checker does
+        code = line.code
+        if not code or code.startswith('#') or '=' not in code:
+            continue
         # Check for variable declarations
-        match = var_decl_pattern.search(line)
+        match = var_decl_pattern.search(code)
         if match:
-            if(DEBUG):print(f"Checking line {i + 1}: {line.strip()}\tMatch: {match}")
+            if(DEBUG):print(f"Checking line {i + 1}: {code}\tMatch: {match}")
             # Check for pointer or array declarations
-            pointer_match = pointer_decl_pattern.search(line)
-            array_match = array_decl_pattern.search(line)
+            pointer_match = pointer_decl_pattern.search(code)
+            array_match = array_decl_pattern.search(code)
             # Extract the variable type and name
             var_type = match.group(1).strip()
             var_name = match.group(2).strip()
@@ -127,6 +219,7 @@ def convert_variable_names_to_hungarian_notation(lines):
             if pointer_match:
                 # If it's a pointer, add 'p' prefix
                 expected_prefix = 'p' + expected_prefix
+            new_var_name = var_name
             # Check if the variable name is already in Hungarian notation
             if not var_name.startswith(expected_prefix):
                 # Convert to Hungarian notation
@@ -135,17 +228,108 @@ def convert_variable_names_to_hungarian_notation(lines):
                     new_var_name = 'a' + new_var_name
                 if pointer_match:
                     new_var_name = 'p' + new_var_name
-                wrong_var_names[var_name] = new_var_name
-                lines[i] = line.replace(var_name, new_var_name)
+            index = bisect.bisect_right(starts, i + 1) - 1
+            scope = declared.setdefault(index if index >= 0 and functions[index].end >= i + 1 else None, {})
+            if scope.get(var_name, new_var_name) != new_var_name:
+                # Declared with different types in the same scope (e.g. in two blocks), the name is kept
+                if(DEBUG):print(f"Variable '{var_name}' is declared with different types, it is not renamed")
+                new_var_name = var_name
+            elif new_var_name != var_name:
                 if(DEBUG):print(f"Converting variable name '{var_name}' to '{new_var_name}' at line {i + 1}")
-    # Replace all occurrences of the wrong variable names with the correct ones
-    for i, line in enumerate(lines):
-        for wrong_name, correct_name in wrong_var_names.items():
-            if wrong_name in line:
-                lines[i] = line.replace(wrong_name, correct_name)
-                if(DEBUG):print(f"Replacing '{wrong_name}' with '{correct_name}' at line {i + 1}")
+            scope[var_name] = new_var_name
+    # Variables declared in this file win over variables of other files with the same name
+    file_names = {**(renames or {}), **declared.pop(None, {})}
+    scopes = [(functions[index].start, functions[index].end, {**file_names, **names})
+              for index, names in sorted(declared.items())]
+    # Replace all occurrences of the wrong variable names (declarations included) with the correct ones
+    return apply_edits(lines, rename_edits(lines, file_names, scopes))
 
-    return lines
+def rename_edits(lines, renames, scopes=()):
+    """Edits renaming identifiers in a single scan of the file
+    Only whole identifiers are renamed, strings, characters and comments stay
+    untouched. Preprocessor directives are lexed as one token, their bodies are
+    lexed again to find the identifiers in them (see directive_identifiers).
+    Args:
+        lines: List of source code lines
+        renames: Dict mapping old names to new names
+        scopes: Sorted list of (first line, last line, renames) of line ranges with their
+                own renames, e.g. function bodies (1-based, not overlapping)
+    Returns:
+        List of edits (see text_edits)
+    """
+    if not renames and not scopes:
+        return []
+    edits = []
+    scopes = iter(scopes)
+    scope = next(scopes, None)
+    for line in iter_lines(lines):
+        i = line.number - 1
+        while scope is not None and scope[1] < line.number:
+            scope = next(scopes, None)
+        active = scope[2] if scope is not None and scope[0] <= line.number else renames
+        for token in line.tokens:
+            if token.kind == PREPROCESSOR:
+                identifiers = directive_identifiers(token)
+            elif token.kind == IDENTIFIER:
+                identifiers = (token,)
+            else:
+                continue
+            for identifier in identifiers:
+                new_name = active.get(identifier.text, identifier.text)
+                if new_name != identifier.text:
+                    edits.append(replace_text(i, identifier.column, identifier.column + len(identifier.text), new_name))
+                    if(DEBUG):print(f"Replacing '{identifier.text}' with '{new_name}' at line {i + 1}")
+    return edits
+
+def directive_identifiers(token):
+    """Find the identifiers in a preprocessor directive
+    String literals and the header names of #include directives are left out.
+    Args:
+        token: Preprocessor token (see c_lexer)
+    Returns:
+        List of identifier tokens with their columns in the source line
+    """
+    text = token.text
+    offset = token.column
+    if text.startswith('#'):
+        text = text[1:]
+        offset += 1
+    tokens, _ = tokenize_line(text, token.line)
+    if tokens and tokens[0].kind == IDENTIFIER and tokens[0].text in INCLUDE_DIRECTIVES:
+        return []
+    return [identifier._replace(column=identifier.column + offset) for identifier in tokens if identifier.kind == IDENTIFIER]
+
+def same_code(lines, converted):
+    """Check that a conversion changed nothing but comments, layout and names
+    The conversions rewrite comments (A4), move braces (CL1) and rename identifiers
+    (DV3), everything else of the code has to stay as it is before a file is replaced.
+    Args:
+        lines: List of original source code lines
+        converted: List of converted lines
+    Returns:
+        True if both have the same code tokens (identifiers compared by kind only)
+    """
+    return code_tokens(lines) == code_tokens(converted)
+
+def code_tokens(lines):
+    """Get the code tokens of source lines without comments and identifier names
+    Args:
+        lines: List of source code lines
+    Returns:
+        List of (kind, text) tuples
+    """
+    tokens = []
+    for line in iter_lines(lines):
+        for token in line.tokens:
+            if token.kind == COMMENT or token.kind == BLOCK_COMMENT:
+                continue
+            if token.kind == IDENTIFIER:
+                tokens.append((IDENTIFIER, None))
+            elif token.kind == PREPROCESSOR:
+                tokens.append((PREPROCESSOR, NAME_PATTERN.sub('', token.text)))
+            else:
+                tokens.append((token.kind, token.text))
+    return tokens
 
 # --------------------------
 # Main Program Logic
@@ -173,44 +357,429 @@ def print_checks(requested_checks=None):
         else:
             print(f"  - {check_id}: Not a valid check ID")
 
-def convert_file(file_path, filename, checks):
-    """Convert a file based on the specified checks"""
+def convert_file(file_path, filename, checks, profile=None, renames=None):
+    """Convert a file based on the specified checks
+    Args:
+        file_path: Directory of the file
+        filename: Name of the file
+        checks: List of check IDs to convert
+        profile: Profile (see style_profile) to record timings in, None to disable profiling
+        renames: Dict of header variables to rename in this file (DV3), see load_renames
+    Returns:
+        Converted source code
+    """
     print(f"\nConverting file {filename} in directory: {file_path}")
-    with open(os.path.join(file_path, filename), 'r') as file:
+    with open(os.path.join(file_path, filename), 'r', newline='') as file:
         content = file.read()
-    lines = content.splitlines()
+    lines, newline, final = split_text(content)
+    timings = None if profile is None else profile.setdefault(os.path.join(file_path, filename), {})
+    converted = convert_lines(list(lines), filename, checks, timings, renames)
+    if converted == lines:
+        # Line endings and the final newline stay untouched
+        return content
+    return join_text(converted, newline, final)
+
+def split_text(text):
+    """Split source code into lines at line feeds only
+    Unlike str.splitlines, form feeds, vertical tabs and the Unicode line separators
+    stay in their line.
+    Args:
+        text: Source code
+    Returns:
+        Tuple of (list of lines without line breaks, line break of the file (CRLF if
+        the file has one, else LF), True if the last line ends with a line break)
+    """
+    newline = '\r\n' if '\r\n' in text else '\n'
+    lines = text.split('\n')
+    final = lines[-1] == ''
+    if final:
+        lines.pop()
+    if newline == '\r\n':
+        lines = [line[:-1] if line.endswith('\r') else line for line in lines]
+    return lines, newline, final
+
+def join_text(lines, newline='\n', final=True):
+    """Join lines split by split_text into source code
+    Args:
+        lines: List of lines without line breaks
+        newline: Line break of the file
+        final: End the last line with a line break
+    Returns:
+        Source code
+    """
+    text = newline.join(lines)
+    if final and lines:
+        text += newline
+    return text
+
+def save_output(file_path, filename, text, output=OUTPUT_FOLDER, stream=None):
+    """Save a converted file, unless it is the same as what is already on disk
+    Args:
+        file_path: Directory of the file
+        filename: Name of the source file
+        text: Converted source code (see convert_file)
+        output: OUTPUT_FOLDER, OUTPUT_IN_PLACE or OUTPUT_DIFF
+        stream: Stream receiving the diffs of OUTPUT_DIFF, sys.stdout by default
+    Returns:
+        True if the file was written (OUTPUT_DIFF: differs), False if it was skipped
+        (OUTPUT_IN_PLACE: also if the conversion changed the code, see same_code)
+    """
+    source = os.path.join(file_path, filename)
+    mode = stat.S_IMODE(os.stat(source).st_mode)
+    if output == OUTPUT_FOLDER:
+        out = os.path.join(file_path, "output")
+        # Parallel workers may create the same folder at the same time
+        os.makedirs(out, exist_ok=True)
+        # Convert filename (Rule A5)
+        out = os.path.join(out, convert_filename_to_uppercase(filename))
+        # Rewriting an identical file would only touch its modification time
+        if read_text(out) == text:
+            print(f"Converted file unchanged: {out}")
+            return False
+        write_atomic(out, text, mode)
+        print(f"Converted file saved as {out}")
+        return True
+
+    original = read_text(source)
+    if text == original:
+        print(f"File unchanged: {source}")
+        return False
+    if output == OUTPUT_DIFF:
+        write_diff(original, text, source, stream or sys.stdout)
+        return True
+    # A source file is only replaced if nothing but comments, layout and names changed
+    if not same_code(split_text(original)[0], split_text(text)[0]):
+        print(f"Warning: not replacing {source}, the conversion would change its code")
+        return False
+    # Source files keep their name, only the output folder gets uppercase names (Rule A5)
+    write_atomic(source, text, mode)
+    print(f"Converted file saved as {source}")
+    return True
+
+def read_text(path):
+    """Read a text file, None if it does not exist"""
+    try:
+        # Line breaks are compared as they are on disk
+        with open(path, 'r', newline='') as file:
+            return file.read()
+    except FileNotFoundError:
+        return None
+
+def write_diff(original, text, path, stream):
+    """Write the changes of a file as unified diff
+    Args:
+        original: Original source code
+        text: Converted source code
+        path: Path of the file
+        stream: Output stream
+    """
+    # Unlike str.splitlines, StringIO only splits at newlines (form feeds stay in their line)
+    old_lines = io.StringIO(original).readlines()
+    new_lines = io.StringIO(text).readlines()
+    for line in difflib.unified_diff(old_lines, new_lines, path, path):
+        if not line.endswith("\n"):
+            line += "\n\\ No newline at end of file\n"
+        stream.write(line)
+    stream.flush()
+
+def convert_lines(lines, filename, checks, timings=None, renames=None):
+    """Run the conversions of the specified checks on the lines of a file
+    Args:
+        lines: List of source code lines
+        filename: Name of the file
+        checks: List of check IDs to convert
+        timings: Dict receiving [seconds, calls] per check, None to disable profiling
+        renames: Dict of header variables to rename in this file (DV3), see load_renames
+    Returns:
+        List of converted lines
+    """
     for check in checks:
         if check in CHECKS:
             print(f"Running check {check} on file {filename}")
-            lines = CHECKS[check](lines)
-    
-    out = os.path.join(file_path, "output")
-    if not os.path.exists(out):
-        os.makedirs(out)
-    # Convert filename (Rule A5)
-    filename = convert_filename_to_uppercase(filename)
-    out = os.path.join(out, filename)
-    with open(out, 'w') as file:
-        file.write("\n".join(lines))
-    print(f"Converted file saved as {out}")
-
-def convert_directory(directory, checks):
-    """Convert all files in a directory based on the specified checks"""
+            # Only the DV3 conversion takes the renames of other files
+            args = (lines, renames) if check == 'DV3' and renames else (lines,)
+            if timings is None:
+                lines = CHECKS[check](*args)
+            else:
+                start = time.perf_counter()
+                lines = CHECKS[check](*args)
+                add_time(timings, check, time.perf_counter() - start)
+    return lines
+
+def convert_source(text, filename, checks=None):
+    """Convert source code held in memory, e.g. an unsaved editor buffer
+    Args:
+        text: Source code
+        filename: Name of the file
+        checks: List of check IDs to convert, None for all checks
+    Returns:
+        Tuple of (converted file name (Rule A5), converted source code)
+    Raises:
+        ValueError: If a check ID is unknown
+    """
+    checks = list(CHECKS) if checks is None else list(checks)
+    invalid = [check for check in checks if check not in CHECKS]
+    if invalid:
+        raise ValueError(f"Invalid check IDs: {', '.join(invalid)}")
+    lines, newline, final = split_text(text)
+    converted = convert_lines(list(lines), filename, checks)
+    if converted == lines:
+        return convert_filename_to_uppercase(filename), text
+    return convert_filename_to_uppercase(filename), join_text(converted, newline, final)
+
+def write_atomic(path, text, mode):
+    """Write a file through a temporary file that is renamed when complete
+    An interrupted run never leaves a half-written file behind.
+    Args:
+        path: Output file
+        text: File content (str, or bytes written unchanged)
+        mode: Permission bits of the output file
+    """
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.', suffix='.tmp')
+    try:
+        # Line breaks are written as they are in the text
+        file = os.fdopen(fd, 'wb') if isinstance(text, bytes) else os.fdopen(fd, 'w', newline='')
+        with file:
+            file.write(text)
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+def find_source_files(directory, walk=None):
+    """Find all .c and .h files below a directory in sorted order
+    The output folders written by earlier runs are skipped unless .gitignore handling is off.
+    Args:
+        directory: Directory to search
+        walk: file_walker.WalkOptions (excludes, .gitignore, size limit), None for the defaults
+    Returns:
+        List of (directory, filename) tuples
+    """
+    too_large = []
+    files = [os.path.split(path) for path in walk_files(directory, ('.c', '.h'), walk, too_large)]
+    for path in too_large:
+        print(f"Skipping {path}, it is larger than the size limit (--max-size)")
+    return files
+
+def convert_directory(directory, checks, jobs=1, profile=None, renames=None, walk=None, output=OUTPUT_FOLDER, stream=None):
+    """Convert all files in a directory based on the specified checks
+    Args:
+        directory: Directory to convert
+        checks: List of check IDs to convert
+        jobs: Number of worker processes
+        profile: Profile (see style_profile) to record timings in, None to disable profiling
+        renames: Dict mapping absolute file paths to their header variable renames, see load_renames
+        walk: file_walker.WalkOptions for searching the directory, None for the defaults
+        output: Where converted files go (see save_output)
+        stream: Stream receiving the diffs of OUTPUT_DIFF, sys.stdout by default
+    Returns:
+        Tuple of (number of written files, number of skipped files)
+    """
     print(f"Converting files in directory: {directory}")
-    for root, _, files in os.walk(directory):
-        for file in files:
-            if file.endswith('.c') or file.endswith('.h'):
-                convert_file(root, file, checks)
+    files = find_source_files(directory, walk)
+    renames = renames or {}
+    paths = [os.path.join(root, file) for root, file in files]
+    # Byte-identical files are converted once, unless the symbol index renames different variables in them
+    duplicates = {path: original for path, original in find_duplicates(paths).items()
+                  if renames.get(os.path.abspath(path)) == renames.get(os.path.abspath(original))}
+    unique = [(root, file) for (root, file), path in zip(files, paths) if path not in duplicates]
+    results = iter_conversions(unique, checks, jobs, profile, renames)
+    originals = set(duplicates.values())
+    texts = {}
+    written = 0
+    for (root, file), path in zip(files, paths):
+        original = duplicates.get(path)
+        if original is None:
+            text = next(results)
+            if path in originals:
+                texts[path] = text
+        else:
+            text = texts[original]
+            print(f"\nConverting file {file} in directory: {root}")
+            print(f"Same content as {original}, reusing its conversion")
+        written += save_output(root, file, text, output, stream)
+    return written, len(files) - written
 
-def main():
-    if len(sys.argv) < 2:
-        print("Usage: python style_converter.py <directory> [CHECKS...]")
+def iter_conversions(files, checks, jobs=1, profile=None, renames=None):
+    """Convert files, in parallel if requested, and yield the converted code in file order
+    Args:
+        files: List of (directory, filename) tuples
+        checks: List of check IDs to convert
+        jobs: Number of worker processes
+        profile: Profile (see style_profile) to record timings in, None to disable profiling
+        renames: Dict mapping absolute file paths to their header variable renames, see load_renames
+    Returns:
+        Generator of converted source code
+    """
+    if jobs <= 1 or len(files) <= 1:
+        for root, file in files:
+            yield convert_file(root, file, checks, profile, renames.get(os.path.abspath(os.path.join(root, file))))
+        return
+
+    tasks = [(root, file, list(checks), profile is not None, renames.get(os.path.abspath(os.path.join(root, file))))
+             for root, file in files]
+    with multiprocessing.Pool(min(jobs, len(files))) as pool:
+        # imap keeps the file order, so the printed log is the same as in a serial run
+        for log, file_profile, error, text in pool.imap(_convert_task, tasks, chunksize=max(1, len(tasks) // (jobs * 4))):
+            sys.stdout.write(log)
+            if file_profile:
+                merge_profile(profile, file_profile)
+            if error:
+                print(f"Error: {error}")
+                sys.exit(1)
+            yield text
+
+def _convert_task(task):
+    """Convert one file in a worker process
+    Args:
+        task: Tuple of (directory, filename, checks, profiling enabled, renames)
+    Returns:
+        Tuple of (printed log, profile or None, error message or None, converted code or None)
+    """
+    root, file, checks, profiling, renames = task
+    profile = {} if profiling else None
+    error = text = None
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        try:
+            text = convert_file(root, file, checks, profile, renames)
+        except Exception as e:
+            error = f"Converting {os.path.join(root, file)} failed: {type(e).__name__}: {e}"
+    return log.getvalue(), profile, error, text
+
+def load_renames(target, index_file, walk=None):
+    """Update the symbol index and find the header variables every file has to rename
+    Args:
+        target: Directory (or single file) to convert, its whole tree is indexed
+        index_file: Path of the index file
+        walk: file_walker.WalkOptions for searching the tree, None for the defaults
+    Returns:
+        Dict mapping absolute file paths to dicts of old and new variable names
+    """
+    root = target if os.path.isdir(target) else os.path.dirname(target) or '.'
+    file_paths = [os.path.join(directory, name) for directory, name in find_source_files(root, walk)]
+    index = load_index(index_file)
+    parsed = update_index(index, file_paths, declaration_pattern(TYPE_PREFIXES))
+    if(DEBUG):print(f"Symbol index: {parsed} files parsed")
+    try:
+        save_index(index, index_file)
+    except OSError as e:
+        print(f"Warning: unable to save the symbol index {index_file}: {e}")
+
+    declarations = header_declarations(index)
+    wrong_names = {}
+    for name, (header, line, var_type, is_array) in declarations.items():
+        prefix = TYPE_PREFIXES.get(var_type.replace('*', ''))
+        if prefix is None:
+            continue
+        if is_array:
+            prefix = 'a' + prefix
+        if '*' in var_type:
+            prefix = 'p' + prefix
+        if not name.startswith(prefix):
+            wrong_names[name] = prefix + name[0].upper() + name[1:]
+            if(DEBUG):print(f"Header variable '{name}' ({header} line {line}) will be renamed to '{wrong_names[name]}'")
+
+    renames = {}
+    if wrong_names:
+        for file_path in file_paths:
+            used = {name: wrong_names[name] for name in file_symbols(index, file_path, declarations) if name in wrong_names}
+            if used:
+                renames[os.path.abspath(file_path)] = used
+    return renames
+
+def parse_arguments(args):
+    """Split command line arguments into target, checks and options
+    Args:
+        args: Command line arguments without the program name
+    Returns:
+        Tuple of (target, list of check IDs, dict of options)
+    """
+    options = {'jobs': 1, 'profile': False, 'profile_output': None, 'index_file': None, 'output': OUTPUT_FOLDER,
+               'excludes': [], 'gitignore': True, 'max_size': DEFAULT_MAX_SIZE}
+    positional = []
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in ('--jobs', '-j'):
+            i += 1
+            if i >= len(args) or not args[i].isdigit() or int(args[i]) < 1:
+                print(f"Error: {arg} requires a positive number of jobs.")
+                sys.exit(1)
+            options['jobs'] = int(args[i])
+        elif arg == '--index':
+            options['index_file'] = DEFAULT_INDEX_FILE
+        elif arg == '--index-file':
+            i += 1
+            if i >= len(args):
+                print(f"Error: {arg} requires a file name.")
+                sys.exit(1)
+            options['index_file'] = args[i]
+        elif arg == '--profile':
+            options['profile'] = True
+        elif arg == '--exclude':
+            i += 1
+            if i >= len(args):
+                print(f"Error: {arg} requires a pattern.")
+                sys.exit(1)
+            options['excludes'].append(args[i])
+        elif arg == '--no-ignore':
+            options['gitignore'] = False
+        elif arg == '--diff':
+            options['output'] = OUTPUT_DIFF
+        elif arg == '--in-place':
+            options['output'] = OUTPUT_IN_PLACE
+        elif arg == '--max-size':
+            i += 1
+            if i >= len(args) or not args[i].isdigit():
+                print(f"Error: {arg} requires a size in KB.")
+                sys.exit(1)
+            # 0 disables the limit
+            options['max_size'] = int(args[i]) * 1024 or None
+        elif arg == '--profile-output':
+            i += 1
+            if i >= len(args):
+                print(f"Error: {arg} requires a file name.")
+                sys.exit(1)
+            options['profile'] = True
+            options['profile_output'] = args[i]
+        else:
+            positional.append(arg)
+        i += 1
+    options['walk'] = WalkOptions(tuple(options['excludes']), options['gitignore'], options['max_size'])
+
+    if not positional:
+        print("Usage: python style_converter.py <directory> [CHECKS...] [--jobs N] [--index] [--index-file FILE] [--profile] [--profile-output FILE] [--exclude PATTERN] [--no-ignore] [--max-size KB] [--diff | --in-place]")
         print_checks()
         print("If no checks are specified, all checks will be run.")
+        print("--jobs N converts files in N processes (default: 1).")
+        print(f"--index keeps a symbol index in {DEFAULT_INDEX_FILE} (or --index-file FILE), so variables declared")
+        print("  in headers are renamed in every file that uses them (DV3).")
+        print("--profile reports the slowest rules and files, --profile-output FILE also saves the profile as JSON.")
+        print("--exclude PATTERN skips files and directories matching PATTERN (.gitignore syntax, repeatable).")
+        print("--no-ignore also converts files excluded by .gitignore and the output folders of earlier runs.")
+        print(f"--max-size KB skips larger files (default: {DEFAULT_MAX_SIZE // 1024}, 0 for no limit).")
+        print("--diff prints the changes as unified diff (the log goes to stderr) instead of writing files.")
+        print("--in-place replaces the source files, files without changes are not written.")
+        print("Without --diff or --in-place converted files are saved in an output folder next to the source files.")
         sys.exit(1)
+    return positional[0], positional[1:] or list(CHECKS.keys()), options
+
+def finish(profile, options, written, skipped):
+    """Report the written files and the profile (if enabled) and exit"""
+    if options['output'] == OUTPUT_DIFF:
+        print(f"\n{written} files would change, {skipped} files unchanged")
+    else:
+        print(f"\n{written} files written, {skipped} unchanged files skipped")
+    if profile is not None:
+        print_profile(profile)
+        if options['profile_output']:
+            write_profile(profile, options['profile_output'])
+    sys.exit(0)
 
-    directory = sys.argv[1]
-    checks = sys.argv[2:] if len(sys.argv) > 2 else CHECKS.keys()
+def main():
+    directory, checks, options = parse_arguments(sys.argv[1:])
     
     # Validate requested checks
     invalid = [c for c in checks if c not in CHECKS]
@@ -228,23 +797,33 @@ def main():
             sys.exit(1)
         else:
             isFile = True;
-    if not os.access(directory, os.W_OK):
+    if options['output'] != OUTPUT_DIFF and not os.access(directory, os.W_OK):
         print(f"Error: {directory} is not writable.")
         sys.exit(1)
     if not os.access(directory, os.R_OK):
         print(f"Error: {directory} is not readable.")
         sys.exit(1)
 
-    if isFile:
-        # Convert a single file
-        dir = os.path.dirname(directory)
-        file = os.path.basename(directory)
-        convert_file(dir, file, checks)
-        sys.exit(0)
-    else:
-        # Convert all files in the directory
-        convert_directory(directory, checks)
-        sys.exit(0)
+    profile = {} if options['profile'] else None
+    renames = None
+    if options['index_file'] is not None and 'DV3' in checks:
+        renames = load_renames(directory, options['index_file'], options['walk'])
+    stream = sys.stdout
+    # In diff mode stdout carries nothing but the diff, the log goes to stderr
+    log = contextlib.redirect_stdout(sys.stderr) if options['output'] == OUTPUT_DIFF else contextlib.nullcontext()
+    with log:
+        if isFile:
+            # Convert a single file
+            dir = os.path.dirname(directory)
+            file = os.path.basename(directory)
+            text = convert_file(dir, file, checks, profile, (renames or {}).get(os.path.abspath(directory)))
+            written = save_output(dir, file, text, options['output'], stream)
+            finish(profile, options, int(written), int(not written))
+        else:
+            # Convert all files in the directory
+            written, skipped = convert_directory(directory, checks, options['jobs'], profile, renames, options['walk'],
+                                                 options['output'], stream)
+            finish(profile, options, written, skipped)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
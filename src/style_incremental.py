@@ -0,0 +1,325 @@
+import os
+from collections import namedtuple
+
+from c_lexer import Line, INITIAL_STATE, tokenize_line, code_text
+from c_outline import iter_outline, INITIAL_OUTLINE
+from style_checker import (OUTLINE_CHECKS, PATH_CHECKS, LINE_CHECKS, get_rule_plan, rules_for_extension,
+                           resolve_rules, split_lines, function_length_issue, file_length_issues,
+                           file_structure_issues)
+from style_output import Issue
+
+# --------------------------
+# Incremental Analysis
+# --------------------------
+# An editor sends the lines it changed instead of the whole buffer. Only those
+# lines are lexed again, and the lines behind them only as long as the lexer
+# (or outline) state they leave behind differs from before, e.g. after opening
+# a block comment. The line based rules (LINE_CHECKS) run on these lines only,
+# function lengths (A6) are recomputed for the functions ending in them and for
+# the function enclosing the edit, the file structure (A8) only if a section or
+# function name changed. Nothing is stored by absolute line number except the
+# function spans, so lines behind an edit are moved, not renumbered.
+
+# Everything known about a line of the buffer
+#   text, tokens, code: See c_lexer.Line (token line numbers are not updated when lines move)
+#   lexer:   Lexer state after the line
+#   outline: Outline state after the line with line numbers stored as distance from
+#            this line (see relative_state), None if no rule needs the outline
+#   section: File section of the line (see c_outline.OutlineLine)
+#   issues:  Tuple of (check ID, rule, column, message) of the line based rules
+LineState = namedtuple('LineState', ['text', 'tokens', 'code', 'lexer', 'outline', 'section', 'issues'])
+
+
+def relative_state(state, number):
+    """Convert the line numbers of an outline state between absolute numbers and
+    distances from a line (the conversion is its own inverse)
+    Args:
+        state: c_outline.OutlineState
+        number: 1-based number of the line the state belongs to
+    Returns:
+        Converted OutlineState
+    """
+    if state.function is None and state.start is None:
+        return state
+    function = state.function
+    if function is not None:
+        function = (function[0], number - function[1])
+    start = state.start
+    if start is not None:
+        start = number - start
+    return state._replace(function=function, start=start)
+
+
+def same_state(new, old, number, first, last, delta):
+    """Check whether the outline continues behind an edit as it did before
+    Args:
+        new: Outline state after the edit (absolute line numbers)
+        old: Stored outline state of the old line 'number' (relative line numbers)
+        number: 1-based number of the old line
+        first, last: Replaced old lines (1-based, inclusive)
+        delta: Number of added lines (negative if lines were removed)
+    Returns:
+        True if both states continue the same way
+    """
+    if (new.stack != old.stack or new.name != old.name or new.assign != old.assign
+            or new.count != old.count or new.scope != old.scope):
+        return False
+    if new.previous is None or old.previous is None:
+        if new.previous is not old.previous:
+            return False
+    elif new.previous.kind != old.previous.kind or new.previous.text != old.previous.text:
+        return False
+
+    def moved(line):
+        # Where an old line number ends up after the edit, None for replaced lines
+        if line < first:
+            return line
+        if line > last:
+            return line + delta
+        return None
+
+    if (new.function is None) != (old.function is None):
+        return False
+    if new.function is not None:
+        if new.function[0] != old.function[0] or new.function[1] != moved(number - old.function[1]):
+            return False
+    if (new.start is None) != (old.start is None):
+        return False
+    return new.start is None or new.start == moved(number - old.start)
+
+
+def line_issues(rules, filename, lines):
+    """Run line based checks on some lines of a file
+    Args:
+        rules: List of (check ID, check function), all in LINE_CHECKS
+        filename: Name of the file
+        lines: List of c_lexer.Line or c_outline.OutlineLine
+    Returns:
+        Dict mapping line numbers to lists of (check ID, rule, column, message)
+    """
+    machines = []
+    for check_id, check in rules:
+        machine = check(filename)
+        next(machine)
+        machines.append((check_id, machine))
+    for line in lines:
+        for _, machine in machines:
+            machine.send(line)
+    found = {}
+    for check_id, machine in machines:
+        for issue in machine.send(None):
+            found.setdefault(issue.line, []).append((check_id, issue.rule, issue.column, issue.message))
+    return found
+
+
+class Analysis:
+    """Check results of a buffer, kept up to date line range by line range
+    The issues always equal those of style_checker.check_source on the same text.
+    Attributes:
+        filename: Name of the file, selects the rules and is checked by A5
+        rules: List of (check ID, check function) that apply to the file
+        lines: List of LineState, one per line of the buffer
+        functions: List of (c_outline.Function, A6 Issue or None) in the
+                   order the functions end
+    """
+
+    def __init__(self, text, filename, rules=None):
+        """Check a buffer completely
+        Args:
+            text: Source code
+            filename: Name (or path) of the file
+            rules: List of check IDs, None for all checks
+        Raises:
+            ValueError: If a check ID is unknown
+        """
+        enabled = resolve_rules(rules)
+        self.filename = os.path.basename(filename)
+        extension = os.path.splitext(self.filename)[1]
+        plan = get_rule_plan(enabled)
+        self.rules = plan[extension] if extension in plan else rules_for_extension(enabled, extension)
+        self.outlined = any(check_id in OUTLINE_CHECKS for check_id, _ in self.rules)
+        # Line based rules working on the tokens, and those that need the outline
+        self.lexed_rules = [(check_id, check) for check_id, check in self.rules
+                            if check_id in LINE_CHECKS and check_id not in OUTLINE_CHECKS]
+        self.outline_rules = [(check_id, check) for check_id, check in self.rules
+                              if check_id in LINE_CHECKS and check_id in OUTLINE_CHECKS]
+        # Path rules do not look at the content, they are checked once
+        self.path_issues = {}
+        for check_id, check in self.rules:
+            if check_id in PATH_CHECKS:
+                machine = check(self.filename)
+                next(machine)
+                self.path_issues[check_id] = machine.send(None)
+        self.lines = []
+        self.functions = []
+        self.structure = None
+        self.edit(1, 0, text)
+
+    def text(self):
+        """Get the current content of the buffer"""
+        return ''.join(line.text + '\n' for line in self.lines)
+
+    def edit(self, first, last, text):
+        """Replace a range of lines and update the issues
+        Args:
+            first: 1-based number of the first replaced line
+            last: 1-based number of the last replaced line, first - 1 to insert in front of first
+            text: New content of the lines (empty to delete them)
+        Raises:
+            ValueError: If the range is outside of the buffer
+        """
+        old = self.lines
+        if not (1 <= first <= len(old) + 1 and first - 1 <= last <= len(old)):
+            raise ValueError(f"Invalid line range {first}-{last}, the buffer has {len(old)} lines")
+        texts = split_lines(text)
+        delta = len(texts) - (last - first + 1)
+
+        # Lex the new lines, then the following ones until the lexer state is the same as before
+        state = old[first - 2].lexer if first > 1 else INITIAL_STATE
+        lexed = []
+        lexer_states = []
+        for number, line in enumerate(texts, first):
+            tokens, state = tokenize_line(line, number, state)
+            lexed.append(Line(number, line, tokens, code_text(line, tokens) if tokens else ''))
+            lexer_states.append(state)
+        end = last
+        while end < len(old) and state != (old[end - 1].lexer if end else INITIAL_STATE):
+            line = old[end].text
+            tokens, state = tokenize_line(line, end + delta + 1, state)
+            lexed.append(Line(end + delta + 1, line, tokens, code_text(line, tokens) if tokens else ''))
+            lexer_states.append(state)
+            end += 1
+
+        found = line_issues(self.lexed_rules, self.filename, lexed)
+        new = [LineState(line.text, line.tokens, line.code, lexer_state, None, None, tuple(found.get(line.number, ())))
+               for line, lexer_state in zip(lexed, lexer_states)]
+        if self.outlined:
+            end = self.update_outline(new, lexed, first, last, delta, end)
+        old[first - 1:end] = new
+
+    def update_outline(self, new, lexed, first, last, delta, end):
+        """Outline the lexed lines of an edit, and the following ones until the outline is the same as before
+        Args:
+            new: List of LineState of the lexed lines, receives the outlined lines behind them
+            lexed: List of c_lexer.Line of the lexed lines
+            first, last: Replaced old lines (1-based, inclusive)
+            delta: Number of added lines (negative if lines were removed)
+            end: Index of the first old line that was not lexed again
+        Returns:
+            Index of the first old line that was not outlined again
+        """
+        old = self.lines
+        state = relative_state(old[first - 2].outline, first - 1) if first > 1 else INITIAL_OUTLINE
+        states = []
+        moved = []
+
+        def source():
+            yield from lexed
+            index = end
+            while index < len(old):
+                previous = old[index - 1].outline if index else INITIAL_OUTLINE
+                if same_state(states[-1] if states else state, previous, index, first, last, delta):
+                    break
+                line = old[index]
+                moved.append(line)
+                yield Line(index + delta + 1, line.text, line.tokens, line.code)
+                index += 1
+
+        outlined = list(iter_outline(source(), state, states))
+        new += moved
+        outline_ids = {check_id for check_id, _ in self.outline_rules}
+        found = line_issues(self.outline_rules, self.filename, outlined)
+        added = []
+        for i, line in enumerate(outlined):
+            issues = tuple(issue for issue in new[i].issues if issue[0] not in outline_ids)
+            new[i] = new[i]._replace(outline=relative_state(states[i], line.number), section=line.section,
+                                     issues=issues + tuple(found.get(line.number, ())))
+            for function in line.ended:
+                added.append((function, function_length_issue(function)))
+        replaced = old[first - 1:end + len(moved)]
+        end += len(moved)
+
+        # States behind the outlined lines that refer to lines in front of the edit
+        # (inside the enclosing function or statement) keep their absolute number
+        if delta:
+            for index in range(end, len(old)):
+                line = old[index]
+                current = line.outline
+                function = current.function
+                start = current.start
+                crossing = False
+                if function is not None and index + 1 - function[1] < first:
+                    function = (function[0], function[1] + delta)
+                    crossing = True
+                if start is not None and index + 1 - start < first:
+                    start += delta
+                    crossing = True
+                if not crossing:
+                    break
+                old[index] = line._replace(outline=current._replace(function=function, start=start))
+
+        # Functions ending in the outlined lines are replaced, the ones behind are moved
+        kept = []
+        removed = []
+        behind = []
+        for function, issue in self.functions:
+            if function.end < first:
+                kept.append((function, issue))
+            elif function.end <= end:
+                removed.append(function)
+            elif not delta:
+                behind.append((function, issue))
+            elif function.start < first:
+                # The function enclosing the edit changed its length
+                function = function._replace(end=function.end + delta)
+                behind.append((function, function_length_issue(function)))
+            else:
+                behind.append((function._replace(start=function.start + delta, end=function.end + delta), issue))
+        self.functions = kept + added + behind
+
+        # The file structure only changes with the sections and the implemented functions
+        if ([line.section for line in replaced if line.section is not None]
+                != [line.section for line in new if line.section is not None]
+                or [function.name for function in removed] != [function.name for function, _ in added]):
+            self.structure = None
+        return end
+
+    def issues(self):
+        """Get the issues of the buffer
+        Returns:
+            List of Issue, in the same order as style_checker.check_source
+        """
+        by_check = {}
+        for number, line in enumerate(self.lines, 1):
+            if line.issues:
+                for check_id, rule, column, message in line.issues:
+                    by_check.setdefault(check_id, []).append(Issue(rule, number, column, message))
+        issues = []
+        for check_id, _ in self.rules:
+            if check_id in PATH_CHECKS:
+                issues += self.path_issues[check_id]
+            elif check_id in LINE_CHECKS:
+                issues += by_check.get(check_id, [])
+            elif check_id == 'A6':
+                issues += [issue for _, issue in self.functions if issue is not None]
+            elif check_id == 'A7':
+                issues += file_length_issues(len(self.lines))
+            elif check_id == 'A8':
+                if self.structure is None:
+                    self.structure = self.check_structure()
+                issues += self.structure
+        return issues
+
+    def check_structure(self):
+        """Check the section order and the position of main (Rule A8)
+        Returns:
+            List of Issue
+        """
+        section_order = []
+        for line in self.lines:
+            section = line.section
+            if section is not None and section not in section_order:
+                section_order.append(section)
+        first_func = self.functions[0][0].name if self.functions else None
+        main_found = any(function.name == 'main' for function, _ in self.functions)
+        return file_structure_issues(self.filename, section_order, first_func, main_found)
@@ -0,0 +1,375 @@
+import os
+import sys
+import json
+import heapq
+from array import array
+
+# Supported output formats
+FORMATS = ('text', 'ndjson', 'sarif')
+
+# Output is collected and written once the buffer holds this many characters
+OUTPUT_BUFFER = 64 * 1024
+
+SARIF_SCHEMA = 'https://json.schemastore.org/sarif-2.1.0.json'
+
+# Number of files listed by the text summary, those with the most issues first
+SUMMARY_FILES = 20
+
+
+class Issue:
+    """A single detected issue, as the checks report it
+    Attributes:
+        rule: Rule ID (e.g. 'CL5'), None for problems like encoding errors
+        line: 1-based line number, None for issues of the whole file
+        column: 0-based column, None if the check does not report one
+        message: Message without the line prefix
+    """
+    __slots__ = ('rule', 'line', 'column', 'message')
+
+    def __init__(self, rule, line, column, message):
+        self.rule = rule
+        self.line = line
+        self.column = column
+        self.message = message
+
+    @classmethod
+    def from_json(cls, value):
+        """Create an issue from the list written by to_json"""
+        rule, line, column, message = value
+        return cls(rule, line, column, message)
+
+    def to_json(self):
+        """Convert the issue into a JSON serializable list, e.g. for the result cache"""
+        return [self.rule, self.line, self.column, self.message]
+
+    def _key(self):
+        return (self.rule, self.line, self.column, self.message)
+
+    def __eq__(self, other):
+        return isinstance(other, Issue) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return f"Issue(rule={self.rule!r}, line={self.line!r}, column={self.column!r}, message={self.message!r})"
+
+    def __str__(self):
+        """Format the issue for the text output"""
+        return self.message if self.line is None else f"Line {self.line}: {self.message}"
+
+
+class IssueStore:
+    """Compact storage of the issues of many files
+    Rule IDs and messages are interned, the issues of a file are packed into one
+    array of integers (line, column + 1, rule index, message index per issue; 0 for
+    None) instead of being kept as Issue objects.
+    """
+
+    def __init__(self):
+        self.rules = [None]
+        self.rule_index = {None: 0}
+        self.messages = []
+        self.message_index = {}
+        self.files = {}
+
+    def set(self, file_path, issues):
+        """Store the issues of a file, replacing those stored before
+        Args:
+            file_path: Path to source file
+            issues: List of Issue
+        """
+        if not issues:
+            self.files.pop(file_path, None)
+            return
+        rule_index = self.rule_index
+        message_index = self.message_index
+        packed = array('I')
+        for issue in issues:
+            rule = rule_index.get(issue.rule)
+            if rule is None:
+                rule = rule_index[issue.rule] = len(self.rules)
+                self.rules.append(issue.rule)
+            message = message_index.get(issue.message)
+            if message is None:
+                message = message_index[issue.message] = len(self.messages)
+                self.messages.append(issue.message)
+            packed.extend((issue.line or 0, 0 if issue.column is None else issue.column + 1, rule, message))
+        self.files[file_path] = packed
+
+    def get(self, file_path):
+        """Get the issues of a file
+        Args:
+            file_path: Path to source file
+        Returns:
+            List of Issue, empty if none are stored
+        """
+        packed = self.files.get(file_path)
+        if packed is None:
+            return []
+        rules = self.rules
+        messages = self.messages
+        return [Issue(rules[packed[i + 2]], packed[i] or None, packed[i + 1] - 1 if packed[i + 1] else None,
+                      messages[packed[i + 3]]) for i in range(0, len(packed), 4)]
+
+    def remove(self, file_path):
+        """Forget the issues of a file"""
+        self.files.pop(file_path, None)
+
+    def __contains__(self, file_path):
+        return file_path in self.files
+
+    def __len__(self):
+        """Total number of stored issues"""
+        return sum(len(packed) for packed in self.files.values()) // 4
+
+
+class IssueSummary:
+    """Issue counts per rule, directory and file, updated file by file
+    Only counts are kept, so the memory grows with the number of files and
+    directories with issues, not with the number of issues.
+    """
+
+    def __init__(self):
+        self.files = 0
+        self.issues = 0
+        self.rules = {}
+        self.directories = {}
+        self.paths = []
+        self.counts = array('I')
+
+    def add(self, file_path, issues):
+        """Count the issues of a checked file
+        Args:
+            file_path: Path to source file
+            issues: List of Issue
+        """
+        self.files += 1
+        if not issues:
+            return
+        self.issues += len(issues)
+        rules = self.rules
+        for issue in issues:
+            rules[issue.rule] = rules.get(issue.rule, 0) + 1
+        directory = os.path.dirname(file_path) or '.'
+        self.directories[directory] = self.directories.get(directory, 0) + len(issues)
+        self.paths.append(file_path)
+        self.counts.append(len(issues))
+
+    def rule_counts(self, rules=None):
+        """Get the issue count of every rule
+        Args:
+            rules: Rule IDs that are listed even without issues, in this order
+        Returns:
+            List of (rule ID, count), issues without rule (e.g. encoding errors) last with rule None
+        """
+        listed = list(rules or [])
+        listed += sorted(rule for rule in self.rules if rule is not None and rule not in listed)
+        counts = [(rule, self.rules.get(rule, 0)) for rule in listed]
+        if None in self.rules:
+            counts.append((None, self.rules[None]))
+        return counts
+
+    def directory_counts(self):
+        """Get the directories with issues, most issues first
+        Returns:
+            List of (directory, count)
+        """
+        return sorted(self.directories.items(), key=lambda item: (-item[1], item[0]))
+
+    def file_counts(self, limit=None):
+        """Get the files with issues, most issues first
+        Args:
+            limit: Maximum number of files, None for all
+        Returns:
+            List of (file path, count)
+        """
+        order = range(len(self.paths))
+        key = lambda i: (-self.counts[i], self.paths[i])
+        order = sorted(order, key=key) if limit is None else heapq.nsmallest(limit, order, key=key)
+        return [(self.paths[i], self.counts[i]) for i in order]
+
+
+def format_summary_text(summary, rules=None):
+    """Format a summary as human readable tables
+    Args:
+        summary: IssueSummary
+        rules: Rule IDs that are listed even without issues
+    Returns:
+        Formatted text
+    """
+    parts = [f"\nSummary: {summary.issues} issues in {len(summary.paths)} of {summary.files} files\n"]
+    parts.append("\nIssues per rule:\n")
+    for rule, count in summary.rule_counts(rules):
+        parts.append(f"  {rule or 'other':<8}{count:>10}\n")
+    if summary.directories:
+        parts.append("\nIssues per directory:\n")
+        for directory, count in summary.directory_counts():
+            parts.append(f"  {count:>10}  {directory}\n")
+        files = summary.file_counts(SUMMARY_FILES)
+        parts.append("\nFiles with the most issues:\n")
+        for file_path, count in files:
+            parts.append(f"  {count:>10}  {file_path}\n")
+        if len(summary.paths) > len(files):
+            parts.append(f"  ... and {len(summary.paths) - len(files)} more files with issues\n")
+    return ''.join(parts)
+
+
+def iter_summary_ndjson(summary, rules=None):
+    """Format a summary as JSON records, one per line
+    Args:
+        summary: IssueSummary
+        rules: Rule IDs that are listed even without issues
+    Returns:
+        Generator of records: the totals, then one per rule, directory and file
+    """
+    yield json.dumps({'summary': 'total', 'files': summary.files, 'files_with_issues': len(summary.paths),
+                      'issues': summary.issues}) + '\n'
+    for rule, count in summary.rule_counts(rules):
+        yield json.dumps({'summary': 'rule', 'rule': rule, 'issues': count}) + '\n'
+    for directory, count in summary.directory_counts():
+        yield json.dumps({'summary': 'directory', 'path': directory, 'issues': count}) + '\n'
+    for file_path, count in summary.file_counts():
+        yield json.dumps({'summary': 'file', 'path': file_path, 'issues': count}) + '\n'
+
+
+def format_text(file_path, issues, quiet=False):
+    """Format the result of a file as human readable text
+    Args:
+        file_path: Path to source file
+        issues: List of Issue
+        quiet: Leave out files without issues and the per-file header
+    Returns:
+        Formatted text (may be empty)
+    """
+    if not issues:
+        return '' if quiet else f"\nProcessing file: {file_path}\nNo issues found in {file_path}\n"
+    parts = [] if quiet else [f"\nProcessing file: {file_path}\n"]
+    parts.append(f"Issues in {file_path}:\n")
+    for issue in issues:
+        parts.append(f"  - {issue}\n")
+    return ''.join(parts)
+
+
+def format_ndjson(file_path, issues):
+    """Format the issues of a file as one JSON record per line
+    Args:
+        file_path: Path to source file
+        issues: List of Issue
+    Returns:
+        Formatted records
+    """
+    records = []
+    for issue in issues:
+        records.append(json.dumps({'path': file_path, 'line': issue.line, 'column': issue.column, 'rule': issue.rule,
+                                   'message': issue.message}) + '\n')
+    return ''.join(records)
+
+
+def format_sarif_results(file_path, issues):
+    """Format the issues of a file as SARIF result objects
+    Args:
+        file_path: Path to source file
+        issues: List of Issue
+    Returns:
+        List of JSON encoded result objects
+    """
+    uri = file_path.replace('\\', '/')
+    results = []
+    for issue in issues:
+        location = {'artifactLocation': {'uri': uri}}
+        if issue.line is not None:
+            location['region'] = {'startLine': issue.line}
+            if issue.column is not None:
+                location['region']['startColumn'] = issue.column + 1
+        result = {'level': 'warning', 'message': {'text': issue.message},
+                  'locations': [{'physicalLocation': location}]}
+        if issue.rule is not None:
+            result['ruleId'] = issue.rule
+        results.append(json.dumps(result))
+    return results
+
+
+def sarif_header(rules):
+    """Start of a SARIF log, the results are written in between header and footer
+    Args:
+        rules: Dict mapping rule IDs to their descriptions
+    Returns:
+        JSON text up to the opening bracket of the result list
+    """
+    driver = {'name': 'C-Style-Check',
+              'rules': [{'id': rule, 'shortDescription': {'text': text}} for rule, text in rules.items()]}
+    log = {'$schema': SARIF_SCHEMA, 'version': '2.1.0', 'runs': [{'tool': {'driver': driver}, 'results': []}]}
+    text = json.dumps(log)
+    # Cut the document open at the empty result list
+    return text[:text.rindex('[]') + 1] + '\n'
+
+
+def report_writer(output_format='text', quiet=False, rules=None, stream=None, summary=False):
+    """Write check results in the requested format through a large output buffer
+    Args:
+        output_format: One of FORMATS ('text' or 'ndjson' with summary)
+        quiet: Suppress per-file and progress messages
+        rules: Dict mapping rule IDs to descriptions (used by SARIF and the summary)
+        stream: Output stream, sys.stdout by default
+        summary: Only count the issues and write an IssueSummary at the end
+    Receives:
+        Progress messages (str, text format only), (file path, list of Issue)
+        tuples and None at the end
+    Yields:
+        Total number of reported issues after the end
+    """
+    stream = stream or sys.stdout
+    buffer = []
+    size = 0
+    issue_count = 0
+    first_result = True
+
+    def write(text):
+        nonlocal size
+        buffer.append(text)
+        size += len(text)
+        if size >= OUTPUT_BUFFER:
+            flush()
+
+    def flush():
+        nonlocal buffer, size
+        stream.write(''.join(buffer))
+        stream.flush()
+        buffer = []
+        size = 0
+
+    counts = IssueSummary() if summary else None
+    if output_format == 'sarif' and not summary:
+        write(sarif_header(rules or {}))
+
+    record = yield
+    while record is not None:
+        if isinstance(record, str):
+            if output_format == 'text' and not quiet:
+                write(record + '\n')
+        else:
+            file_path, issues = record
+            issue_count += len(issues)
+            if counts is not None:
+                counts.add(file_path, issues)
+            elif output_format == 'text':
+                write(format_text(file_path, issues, quiet))
+            elif output_format == 'ndjson':
+                write(format_ndjson(file_path, issues))
+            else:
+                for result in format_sarif_results(file_path, issues):
+                    write(('' if first_result else ',\n') + result)
+                    first_result = False
+        record = yield
+
+    if counts is not None:
+        if output_format == 'text':
+            write(format_summary_text(counts, rules))
+        else:
+            for text in iter_summary_ndjson(counts, rules):
+                write(text)
+    elif output_format == 'sarif':
+        write('\n]}]}\n')
+    flush()
+    yield issue_count
@@ -0,0 +1,94 @@
+import sys
+import json
+
+# Number of rules and files shown in the profile report
+PROFILE_TOP = 10
+
+# --------------------------
+# Profiling Data
+# --------------------------
+# A profile maps file paths to {rule ID: [seconds, calls]}. Besides the rules,
+# 'lexer' holds the time spent lexing and '(cache)' the time of cache hits.
+
+
+def add_time(timings, rule, seconds, calls=1):
+    """Add a measurement to the timings of a file
+    Args:
+        timings: Dict mapping rule IDs to [seconds, calls]
+        rule: Rule ID
+        seconds: Measured wall time
+        calls: Number of calls measured
+    """
+    entry = timings.get(rule)
+    if entry is None:
+        timings[rule] = [seconds, calls]
+    else:
+        entry[0] += seconds
+        entry[1] += calls
+
+
+def merge_profile(profile, other):
+    """Merge the profile of a worker process into a profile
+    Args:
+        profile: Profile to update
+        other: Profile to add
+    """
+    for file_path, timings in other.items():
+        target = profile.setdefault(file_path, {})
+        for rule, (seconds, calls) in timings.items():
+            add_time(target, rule, seconds, calls)
+
+
+def summarize_profile(profile):
+    """Sum up a profile per rule and per file
+    Args:
+        profile: Profile to summarize
+    Returns:
+        Tuple of (dict rule -> [seconds, calls], dict file path -> seconds)
+    """
+    rules = {}
+    files = {}
+    for file_path, timings in profile.items():
+        files[file_path] = sum(seconds for seconds, _ in timings.values())
+        for rule, (seconds, calls) in timings.items():
+            add_time(rules, rule, seconds, calls)
+    return rules, files
+
+
+def print_profile(profile, top=PROFILE_TOP, stream=None):
+    """Print the slowest rules and files of a profile
+    Args:
+        profile: Profile to report
+        top: Number of rules and files to show
+        stream: Output stream, sys.stdout by default
+    """
+    stream = stream or sys.stdout
+    rules, files = summarize_profile(profile)
+    total = sum(files.values())
+    print(f"\nProfile: {len(files)} files, {total:.3f}s", file=stream)
+    print("Slowest rules:", file=stream)
+    for rule, (seconds, calls) in sorted(rules.items(), key=lambda item: -item[1][0])[:top]:
+        share = seconds / total * 100 if total else 0
+        print(f"  - {rule}: {seconds:.3f}s ({share:.1f}%), {calls} calls", file=stream)
+    print("Slowest files:", file=stream)
+    for file_path, seconds in sorted(files.items(), key=lambda item: -item[1])[:top]:
+        slowest = max(profile[file_path].items(), key=lambda item: item[1][0])[0] if profile[file_path] else '-'
+        print(f"  - {file_path}: {seconds:.3f}s (slowest rule: {slowest})", file=stream)
+
+
+def write_profile(profile, path):
+    """Save a profile as JSON
+    Args:
+        profile: Profile to save
+        path: Output file
+    """
+    rules, files = summarize_profile(profile)
+    data = {
+        'rules': {rule: {'seconds': seconds, 'calls': calls} for rule, (seconds, calls) in rules.items()},
+        'files': {file_path: {'seconds': files[file_path],
+                              'rules': {rule: {'seconds': seconds, 'calls': calls}
+                                        for rule, (seconds, calls) in timings.items()}}
+                  for file_path, timings in profile.items()},
+    }
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
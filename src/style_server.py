@@ -0,0 +1,338 @@
+import io
+import os
+import sys
+import json
+import hashlib
+import threading
+import contextlib
+import socketserver
+from collections import OrderedDict
+
+import style_checker
+import style_converter
+from style_incremental import Analysis
+
+# Number of check results kept in memory (least recently used are dropped)
+SERVER_CACHE_ENTRIES = 4096
+
+# JSON-RPC 2.0 error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+SERVER_ERROR = -32000
+
+# --------------------------
+# Protocol
+# --------------------------
+# Requests and responses are JSON-RPC 2.0 objects, one per line, e.g.
+#   {"jsonrpc": "2.0", "id": 1, "method": "check", "params": {"path": "src/Main.c"}}
+#   {"jsonrpc": "2.0", "id": 1, "result": {"issues": [{"rule": "CL1", "line": 3, ...}]}}
+# Methods:
+#   check:    {path} or {text, filename}, optional rules -> {issues}
+#   convert:  {path} or {text, filename}, optional rules -> {filename, text} (nothing is written)
+#   open:     {document, text}, optional filename and rules -> {issues}, keeps the analysis of the buffer
+#   edit:     {document, first, last, text} -> {issues}, lines first..last of the buffer are replaced
+#   close:    {document} -> null, drops the analysis
+#   stats:    {} -> {requests, cache_hits, cache_entries}
+#   shutdown: {} -> null, the server stops after the response
+
+
+class RequestError(Exception):
+    """Error that is returned to the client as JSON-RPC error object"""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+class ServerState:
+    """Results and counters shared by all requests of a server"""
+
+    def __init__(self, max_entries=SERVER_CACHE_ENTRIES):
+        self.results = OrderedDict()
+        self.max_entries = max_entries
+        self.requests = 0
+        self.cache_hits = 0
+        self.running = True
+        # Analyses of the buffers opened by editors, by document ID
+        self.documents = {}
+        # Checks and conversions run one at a time (converters print to stdout)
+        self.lock = threading.Lock()
+
+    def cached(self, key, compute):
+        """Look up a result, computing and storing it on a miss"""
+        if key in self.results:
+            self.results.move_to_end(key)
+            self.cache_hits += 1
+            return self.results[key]
+        value = compute()
+        self.results[key] = value
+        if len(self.results) > self.max_entries:
+            self.results.popitem(last=False)
+        return value
+
+
+def issue_to_json(issue):
+    """Convert an Issue into a JSON object"""
+    return {'rule': issue.rule, 'line': issue.line, 'column': issue.column, 'message': issue.message}
+
+
+def source_params(params):
+    """Get the source of a check or convert request
+    Args:
+        params: Request parameters
+    Returns:
+        Tuple of (path or None, text or None, file name, list of rules or None)
+    """
+    path = params.get('path')
+    text = params.get('text')
+    rules = params.get('rules')
+    if text is None and path is None:
+        raise RequestError(INVALID_PARAMS, "Either 'path' or 'text' is required")
+    if text is not None and not isinstance(text, str):
+        raise RequestError(INVALID_PARAMS, "'text' must be a string")
+    if rules is not None and not (isinstance(rules, list) and all(isinstance(rule, str) for rule in rules)):
+        raise RequestError(INVALID_PARAMS, "'rules' must be a list of check IDs")
+    filename = params.get('filename') or (os.path.basename(path) if path else None)
+    if not filename:
+        raise RequestError(INVALID_PARAMS, "'filename' is required for unsaved buffers")
+    if text is None and not os.path.isfile(path):
+        raise RequestError(INVALID_PARAMS, f"{path} is not a valid file")
+    return path, text, filename, rules
+
+
+# --------------------------
+# Methods
+# --------------------------
+
+
+def rpc_check(state, params):
+    """Check a file or an unsaved buffer"""
+    path, text, filename, rules = source_params(params)
+    try:
+        rules = style_checker.resolve_rules(rules)
+    except ValueError as e:
+        raise RequestError(INVALID_PARAMS, str(e))
+    if text is not None:
+        digest = hashlib.sha256(text.encode('utf-8', 'surrogateescape')).hexdigest()
+        key = ('text', digest, filename, tuple(rules))
+        issues = state.cached(key, lambda: style_checker.check_source(text, filename, rules))
+    else:
+        # Unchanged files are recognized by their stat, they are not even read
+        stat = os.stat(path)
+        key = ('path', os.path.abspath(path), stat.st_mtime_ns, stat.st_size, tuple(rules))
+        issues = state.cached(key, lambda: style_checker.check_stream(path, rules))
+    return {'issues': [issue_to_json(issue) for issue in issues]}
+
+
+def rpc_convert(state, params):
+    """Convert a file or an unsaved buffer without writing anything"""
+    path, text, filename, rules = source_params(params)
+    if text is None:
+        # Line endings are kept as they are, like convert_file does
+        with open(path, 'r', encoding='utf-8', newline='') as file:
+            text = file.read()
+    # The converters report their progress on stdout, which may be the RPC channel
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            filename, text = style_converter.convert_source(text, filename, rules)
+        except ValueError as e:
+            raise RequestError(INVALID_PARAMS, str(e))
+    return {'filename': filename, 'text': text}
+
+
+def rpc_open(state, params):
+    """Check an editor buffer and keep its analysis for later edits"""
+    document = params.get('document')
+    text = params.get('text')
+    if not isinstance(document, str) or not document:
+        raise RequestError(INVALID_PARAMS, "'document' is required")
+    if not isinstance(text, str):
+        raise RequestError(INVALID_PARAMS, "'text' must be a string")
+    filename = params.get('filename') or os.path.basename(document)
+    try:
+        analysis = Analysis(text, filename, params.get('rules'))
+    except ValueError as e:
+        raise RequestError(INVALID_PARAMS, str(e))
+    state.documents[document] = analysis
+    return {'issues': [issue_to_json(issue) for issue in analysis.issues()]}
+
+
+def rpc_edit(state, params):
+    """Replace lines of an opened buffer, only the affected lines are checked again"""
+    analysis = state.documents.get(params.get('document'))
+    if analysis is None:
+        raise RequestError(INVALID_PARAMS, "Unknown document, 'open' it first")
+    first = params.get('first')
+    last = params.get('last')
+    text = params.get('text', '')
+    if not isinstance(first, int) or not isinstance(last, int):
+        raise RequestError(INVALID_PARAMS, "'first' and 'last' must be line numbers")
+    if not isinstance(text, str):
+        raise RequestError(INVALID_PARAMS, "'text' must be a string")
+    try:
+        analysis.edit(first, last, text)
+    except ValueError as e:
+        raise RequestError(INVALID_PARAMS, str(e))
+    return {'issues': [issue_to_json(issue) for issue in analysis.issues()]}
+
+
+def rpc_close(state, params):
+    """Drop the analysis of a buffer"""
+    state.documents.pop(params.get('document'), None)
+    return None
+
+
+def rpc_stats(state, params):
+    """Report how many requests were answered and how many came from memory"""
+    return {'requests': state.requests, 'cache_hits': state.cache_hits, 'cache_entries': len(state.results)}
+
+
+def rpc_shutdown(state, params):
+    """Stop the server after answering"""
+    state.running = False
+    return None
+
+
+METHODS = {
+    'check': rpc_check,
+    'convert': rpc_convert,
+    'open': rpc_open,
+    'edit': rpc_edit,
+    'close': rpc_close,
+    'stats': rpc_stats,
+    'shutdown': rpc_shutdown,
+}
+
+
+def handle_request(state, line):
+    """Answer a single JSON-RPC request
+    Args:
+        state: ServerState
+        line: Request as JSON text
+    Returns:
+        Response as JSON text, None for notifications (requests without id),
+        even if they fail
+    """
+    request_id = None
+    notification = False
+    try:
+        try:
+            request = json.loads(line)
+        except ValueError:
+            raise RequestError(PARSE_ERROR, "Invalid JSON")
+        if isinstance(request, dict):
+            notification = 'id' not in request
+        if not isinstance(request, dict) or not isinstance(request.get('method'), str):
+            raise RequestError(INVALID_REQUEST, "Invalid request")
+        request_id = request.get('id')
+        method = METHODS.get(request['method'])
+        if method is None:
+            raise RequestError(METHOD_NOT_FOUND, f"Unknown method {request['method']}")
+        params = request.get('params') or {}
+        if not isinstance(params, dict):
+            raise RequestError(INVALID_PARAMS, "'params' must be an object")
+        with state.lock:
+            state.requests += 1
+            result = method(state, params)
+        response = {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+    except RequestError as e:
+        response = {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': e.code, 'message': str(e)}}
+    except Exception as e:
+        # A failing check or conversion must not bring the server down
+        response = {'jsonrpc': '2.0', 'id': request_id,
+                    'error': {'code': SERVER_ERROR, 'message': f"{type(e).__name__}: {e}"}}
+    if notification:
+        return None
+    return json.dumps(response)
+
+
+# --------------------------
+# Transports
+# --------------------------
+
+
+def warm_up():
+    """Build the rule plans of all checks before the first request arrives"""
+    for extension in style_checker.SOURCE_EXTENSIONS:
+        style_checker.check_source('', 'Warmup' + extension)
+
+
+def serve_stdio(state, stdin=None, stdout=None):
+    """Answer requests from stdin on stdout until shutdown or end of input"""
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    for line in stdin:
+        if not line.strip():
+            continue
+        response = handle_request(state, line)
+        if response is not None:
+            stdout.write(response + '\n')
+            stdout.flush()
+        if not state.running:
+            break
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Answer the requests of one socket connection"""
+
+    def handle(self):
+        state = self.server.state
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            response = handle_request(state, line.decode('utf-8', 'replace'))
+            if response is not None:
+                self.wfile.write(response.encode('utf-8') + b'\n')
+                self.wfile.flush()
+            if not state.running:
+                # shutdown() waits for serve_forever, so it must run in another thread
+                threading.Thread(target=self.server.shutdown).start()
+                break
+
+
+class _SocketServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve_socket(state, socket_path):
+    """Answer requests of any number of clients on a Unix socket until shutdown"""
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    with _SocketServer(socket_path, _RequestHandler) as server:
+        server.state = state
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(socket_path)
+
+
+def main():
+    """Main entry point for the style server"""
+    args = sys.argv[1:]
+    socket_path = None
+    if args[:1] == ['--socket'] and len(args) == 2:
+        socket_path = args[1]
+    elif args:
+        print("Usage: python style_server.py [--socket PATH]")
+        print("Answers JSON-RPC requests (one per line) on stdin/stdout, or on the Unix socket PATH.")
+        print(f"Methods: {', '.join(METHODS)}")
+        sys.exit(1)
+
+    state = ServerState()
+    warm_up()
+    if socket_path is None:
+        serve_stdio(state)
+    else:
+        if not hasattr(socketserver, 'UnixStreamServer'):
+            print("Error: Unix sockets are not supported on this platform.")
+            sys.exit(1)
+        print(f"Listening on {socket_path}, press Ctrl+C to stop.", file=sys.stderr)
+        serve_socket(state, socket_path)
+
+
+if __name__ == "__main__":
+    main()
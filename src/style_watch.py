@@ -0,0 +1,226 @@
+import os
+import time
+from collections import Counter
+from style_output import IssueStore
+from file_walker import walk_directory, is_ignored, DEFAULT_WALK, PRUNED_DIRECTORIES
+
+# inotify is optional, without it the watched files are polled
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+# Seconds between two polls (or the inotify read timeout)
+WATCH_INTERVAL = 1.0
+
+
+def snapshot(file_paths, max_size=None):
+    """Record modification time and size of files
+    Args:
+        file_paths: Iterable of file paths
+        max_size: Files larger than this are left out (bytes, None for no limit)
+    Returns:
+        Dict mapping file paths to (mtime, size), missing files are left out
+    """
+    state = {}
+    for file_path in file_paths:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            continue
+        if max_size is not None and stat.st_size > max_size:
+            continue
+        state[file_path] = (stat.st_mtime_ns, stat.st_size)
+    return state
+
+
+def issue_delta(old_issues, new_issues):
+    """Compare the issues of two runs on the same file
+    Args:
+        old_issues: Issues of the previous run
+        new_issues: Issues of the current run
+    Returns:
+        Tuple of (list of new issues, list of fixed issues)
+    """
+    old = Counter(old_issues)
+    new = Counter(new_issues)
+    return list((new - old).elements()), list((old - new).elements())
+
+
+def print_delta(file_path, added, fixed):
+    """Print the issue changes of a file
+    Args:
+        file_path: Path to source file
+        added: Issues that appeared
+        fixed: Issues that disappeared
+    """
+    if not added and not fixed:
+        return
+    print(f"Changes in {file_path}:")
+    for issue in added:
+        print(f"  new:   {issue}")
+    for issue in fixed:
+        print(f"  fixed: {issue}")
+
+
+# --------------------------
+# Change Detection
+# --------------------------
+
+
+def add_watches(inotify, watches, directories):
+    """Watch directories with inotify
+    Args:
+        inotify: INotify instance
+        watches: Dict mapping watch descriptors to directories (updated)
+        directories: Iterable of directory paths
+    """
+    mask = flags.CLOSE_WRITE | flags.MOVED_TO | flags.MOVED_FROM | flags.CREATE | flags.DELETE
+    for directory in directories:
+        try:
+            watches[inotify.add_watch(directory, mask)] = directory
+        except OSError:
+            # Directory vanished or watch limit reached, polling still covers known files
+            pass
+
+
+def forget_directory(directories, path):
+    """Remove a directory and its subdirectories from the walked directories
+    Args:
+        directories: Dict mapping directory paths to file_walker.WalkedDirectory (updated)
+        path: Directory path
+    """
+    prefix = path + os.sep
+    for directory in [directory for directory in directories if directory == path or directory.startswith(prefix)]:
+        del directories[directory]
+
+
+def poll_changes(state, directories, extensions, walk):
+    """Detect changed files by comparing modification times
+    Only the known files and directories are looked at. A directory whose modification
+    time changed (entries were added, removed or renamed) is searched again with the
+    ignore rules it had in the first walk.
+    Args:
+        state: Snapshot of the previous poll
+        directories: Dict mapping directory paths to file_walker.WalkedDirectory (updated)
+        extensions: File extensions to watch
+        walk: file_walker.WalkOptions of the first walk
+    Returns:
+        Snapshot of the current state
+    """
+    time.sleep(WATCH_INTERVAL)
+    changed = set()
+    for directory, walked in directories.items():
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime != walked.mtime:
+            changed.add(directory)
+    file_paths = set(state)
+    for directory in changed:
+        walked = directories.pop(directory)
+        # The files directly in the directory are found again, subdirectories that are still known
+        # keep theirs (a removed subdirectory has changed as well), new ones are searched completely
+        prefix = directory if directory.endswith(os.sep) else directory + os.sep
+        file_paths = {path for path in file_paths if not path.startswith(prefix) or os.sep in path[len(prefix):]}
+        file_paths.update(walk_directory(directory, walked.relative, walked.inherited, extensions, walk,
+                                         directories=directories))
+    return snapshot(file_paths, walk.max_size)
+
+
+def inotify_changes(inotify, watches, state, directories, extensions, walk):
+    """Detect changed files from inotify events
+    Events are filtered with the ignore rules of the walked directories, like the files
+    found by file_walker.walk_files.
+    Args:
+        inotify: INotify instance
+        watches: Dict mapping watch descriptors to directories (updated)
+        state: Snapshot of the previous poll
+        directories: Dict mapping directory paths to file_walker.WalkedDirectory (updated)
+        extensions: File extensions to watch
+        walk: file_walker.WalkOptions of the first walk
+    Returns:
+        Snapshot of the current state
+    """
+    candidates = set()
+    removed = []
+    for event in inotify.read(timeout=int(WATCH_INTERVAL * 1000)):
+        directory = watches.get(event.wd)
+        walked = directories.get(directory)
+        if walked is None:
+            # Removed or moved away in the meantime
+            continue
+        path = os.path.join(directory, event.name)
+        relative = walked.relative + event.name
+        if event.mask & flags.ISDIR:
+            if event.mask & (flags.DELETE | flags.MOVED_FROM):
+                forget_directory(directories, path)
+                removed.append(path + os.sep)
+            elif event.name not in PRUNED_DIRECTORIES and not is_ignored(walked.rules, relative, True):
+                # Files moved in with a directory are new as well
+                added = {}
+                candidates.update(walk_directory(path, relative + '/', walked.rules, extensions, walk,
+                                                 directories=added))
+                add_watches(inotify, watches, added)
+                directories.update(added)
+        elif event.name.endswith(extensions) and not is_ignored(walked.rules, relative, False):
+            candidates.add(path)
+    current = {path: value for path, value in state.items() if path not in candidates}
+    if removed:
+        prefixes = tuple(removed)
+        current = {path: value for path, value in current.items() if not path.startswith(prefixes)}
+    current.update(snapshot(candidates, walk.max_size))
+    return current
+
+
+def watch(target_dir, extensions, walk, find_files, check_files, print_results):
+    """Check a directory once, then re-check changed files until interrupted
+    Args:
+        target_dir: Directory to watch
+        extensions: File extensions to watch
+        walk: file_walker.WalkOptions for searching the directory, None for the defaults
+        find_files: Function returning the files to check below a directory, filling the
+                    dict passed as 'directories' (see file_walker.walk_files)
+        check_files: Function yielding (file path, list of style_output.Issue) for a list of paths
+        print_results: Function printing the full result of a file
+    """
+    walk = walk or DEFAULT_WALK
+    directories = {}
+    file_paths = find_files(target_dir, directories=directories)
+    # The issues of the whole tree stay in memory between the runs, packed
+    results = IssueStore()
+    for file_path, issues in check_files(file_paths):
+        print_results(file_path, issues)
+        results.set(file_path, issues)
+
+    state = snapshot(file_paths, walk.max_size)
+    inotify = None
+    watches = {}
+    if INotify is not None:
+        inotify = INotify()
+        add_watches(inotify, watches, list(directories))
+    mode = "inotify" if inotify is not None else f"polling every {WATCH_INTERVAL}s"
+    print(f"\nWatching {target_dir} for changes ({mode}), press Ctrl+C to stop.")
+    try:
+        while True:
+            if inotify is not None:
+                current = inotify_changes(inotify, watches, state, directories, extensions, walk)
+            else:
+                current = poll_changes(state, directories, extensions, walk)
+            changed = sorted(path for path in set(current) | set(state) if current.get(path) != state.get(path))
+            state = current
+            # Only changed files are read and checked again
+            new_results = dict(check_files([path for path in changed if path in state]))
+            for file_path in changed:
+                added, fixed = issue_delta(results.get(file_path), new_results.get(file_path, []))
+                print_delta(file_path, added, fixed)
+                if file_path in new_results:
+                    results.set(file_path, new_results[file_path])
+                else:
+                    results.remove(file_path)
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+    finally:
+        if inotify is not None:
+            inotify.close()
@@ -0,0 +1,212 @@
+import os
+import re
+import json
+import tempfile
+from c_lexer import iter_lines, IDENTIFIER
+from style_cache import file_digest
+
+# Default location of the symbol index (relative to the working directory)
+DEFAULT_INDEX_FILE = '.styleindex.json'
+
+# Stored indexes with another version are rebuilt
+INDEX_VERSION = 1
+
+# Extensions of files whose declarations are visible in other files
+HEADER_EXTENSIONS = ('.h',)
+
+# --------------------------
+# Index Layout
+# --------------------------
+# {'version': INDEX_VERSION,
+#  'files': {absolute path: {'stat': [mtime_ns, size], 'digest': sha256,
+#                            'declarations': [[name, type, is_array, line], ...],
+#                            'uses': {identifier: first line}}}}
+# The type is written as in the source, pointers keep their '*' (e.g. 'int*').
+
+
+def declaration_pattern(type_names):
+    """Build the pattern for variable declarations at the start of a statement
+    Function prototypes and parameters do not match, so the index only holds variables.
+    Args:
+        type_names: C type names that can be declared
+    Returns:
+        Compiled regex with the groups (type, name, array)
+    """
+    types = '|'.join(sorted(type_names, key=len, reverse=True))
+    return re.compile(r'^(?:(?:extern|static|const|volatile|register)\s+)*'
+                      r'((?:' + types + r')\s*\**?\s+)(\w+)(\[\w*\])?\s*[=;,]')
+
+
+def new_index():
+    """Create an empty index"""
+    return {'version': INDEX_VERSION, 'files': {}}
+
+
+def load_index(path):
+    """Load the index from disk
+    Args:
+        path: Index file
+    Returns:
+        Stored index, an empty index if it is missing, damaged or outdated
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return new_index()
+    if not isinstance(index, dict) or index.get('version') != INDEX_VERSION:
+        return new_index()
+    return index
+
+
+def save_index(index, path):
+    """Save the index to disk, atomically replacing the previous one
+    Args:
+        index: Index to save
+        path: Index file
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+# --------------------------
+# Building the Index
+# --------------------------
+
+
+def scan_file(file_path, pattern):
+    """Collect the variable declarations and identifier uses of a file
+    Args:
+        file_path: Path to source file
+        pattern: Declaration pattern from declaration_pattern()
+    Returns:
+        Dict with 'declarations' and 'uses' (see Index Layout)
+    """
+    declarations = []
+    uses = {}
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for line in iter_lines(line.rstrip('\n') for line in f):
+                for token in line.tokens:
+                    if token.kind == IDENTIFIER and token.text not in uses:
+                        uses[token.text] = line.number
+                code = line.code
+                if not code or code.startswith('#'):
+                    continue
+                match = pattern.match(code)
+                if match:
+                    declarations.append([match.group(2), match.group(1).strip(), match.group(3) is not None, line.number])
+    except UnicodeDecodeError:
+        # The checker reports the encoding error, the file just has no symbols
+        return {'declarations': [], 'uses': {}}
+    return {'declarations': declarations, 'uses': uses}
+
+
+def update_index(index, file_paths, pattern):
+    """Bring the index up to date for a set of files
+    Files with unchanged size and modification time are skipped, the others are
+    hashed and only parsed again if their content changed. Entries of deleted
+    files are removed.
+    Args:
+        index: Index to update
+        file_paths: Paths of all files of the project
+        pattern: Declaration pattern from declaration_pattern()
+    Returns:
+        Number of parsed files
+    """
+    files = index['files']
+    parsed = 0
+    for file_path in file_paths:
+        key = os.path.abspath(file_path)
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            continue
+        current = [stat.st_mtime_ns, stat.st_size]
+        entry = files.get(key)
+        if entry is not None and entry['stat'] == current:
+            continue
+        digest = file_digest(file_path)
+        if entry is None or entry['digest'] != digest:
+            entry = scan_file(file_path, pattern)
+            entry['digest'] = digest
+            files[key] = entry
+            parsed += 1
+        entry['stat'] = current
+    for key in [key for key in files if not os.path.exists(key)]:
+        del files[key]
+    return parsed
+
+
+# --------------------------
+# Queries
+# --------------------------
+
+
+def header_declarations(index):
+    """Collect the variables declared in header files
+    Names declared with different types in different headers are ambiguous and left out.
+    Args:
+        index: Symbol index
+    Returns:
+        Dict mapping names to (header path, line, type, is_array)
+    """
+    declarations = {}
+    ambiguous = set()
+    for file_path, entry in index['files'].items():
+        if not file_path.endswith(HEADER_EXTENSIONS):
+            continue
+        for name, var_type, is_array, line in entry['declarations']:
+            known = declarations.get(name)
+            if known is None:
+                declarations[name] = (file_path, line, var_type, is_array)
+            elif known[2:] != (var_type, is_array):
+                ambiguous.add(name)
+    for name in ambiguous:
+        del declarations[name]
+    return declarations
+
+
+def external_uses(index, file_path, declarations):
+    """Find the header variables a file uses without declaring them itself
+    Args:
+        index: Symbol index
+        file_path: Path to source file
+        declarations: Header declarations from header_declarations()
+    Returns:
+        List of (name, line of the first use, header path, header line, type, is_array)
+        sorted by line
+    """
+    key = os.path.abspath(file_path)
+    entry = index['files'].get(key)
+    if entry is None:
+        return []
+    local = {declaration[0] for declaration in entry['declarations']}
+    found = []
+    for name, line in entry['uses'].items():
+        declaration = declarations.get(name)
+        if declaration is not None and name not in local and declaration[0] != key:
+            found.append((name, line) + declaration)
+    return sorted(found, key=lambda use: use[1])
+
+
+def file_symbols(index, file_path, declarations):
+    """Find the header variables a file declares or uses
+    Args:
+        index: Symbol index
+        file_path: Path to source file
+        declarations: Header declarations from header_declarations()
+    Returns:
+        Dict mapping names to (header path, line, type, is_array)
+    """
+    entry = index['files'].get(os.path.abspath(file_path))
+    if entry is None:
+        return {}
+    return {name: declarations[name] for name in entry['uses'] if name in declarations}
@@ -0,0 +1,108 @@
+from collections import namedtuple
+
+# Edit operations
+REPLACE = 'REPLACE'
+INSERT = 'INSERT'
+DELETE = 'DELETE'
+
+# --------------------------
+# Edit Records
+# --------------------------
+# All positions refer to the original lines (0-based line index and column),
+# so edits of different rules computed on the same lines can be combined.
+#   REPLACE: replace line[column:end] with text (end None: up to the end of the line)
+#   INSERT:  add text as a new line after the line
+#   DELETE:  remove the line
+Edit = namedtuple('Edit', ['op', 'line', 'column', 'end', 'text'])
+
+
+def replace_text(line, column, end, text):
+    """Edit replacing a span of a line"""
+    return Edit(REPLACE, line, column, end, text)
+
+
+def replace_line(line, text):
+    """Edit replacing a whole line"""
+    return Edit(REPLACE, line, 0, None, text)
+
+
+def insert_line(line, text):
+    """Edit adding a new line after a line"""
+    return Edit(INSERT, line, None, None, text)
+
+
+def delete_line(line):
+    """Edit removing a line"""
+    return Edit(DELETE, line, None, None, None)
+
+
+# --------------------------
+# Applying Edits
+# --------------------------
+
+
+def apply_line_edits(index, line, edits):
+    """Apply the edits of a single line
+    Args:
+        index: Line index (for error messages)
+        line: Original line
+        edits: Edits of this line in the order they were emitted
+    Returns:
+        List of resulting lines (empty if the line is deleted)
+    """
+    spans = []
+    inserts = []
+    deleted = False
+    for edit in edits:
+        if edit.op == DELETE:
+            deleted = True
+        elif edit.op == INSERT:
+            inserts.append(edit.text)
+        else:
+            spans.append((edit.column, len(line) if edit.end is None else edit.end, edit.text))
+    if deleted and spans:
+        raise ValueError(f"Line {index + 1} is replaced and deleted by different edits")
+
+    result = []
+    if not deleted:
+        pieces = []
+        position = 0
+        for start, end, text in sorted(spans, key=lambda span: span[:2]):
+            if start < position:
+                raise ValueError(f"Overlapping edits in line {index + 1}")
+            pieces.append(line[position:start])
+            pieces.append(text)
+            position = end
+        pieces.append(line[position:])
+        result.append(''.join(pieces))
+    return result + inserts
+
+
+def apply_edits(lines, *edit_lists):
+    """Apply edits to lines in a single pass into a new list
+    Edits of several rules can be passed at once, as long as they do not overlap.
+    Args:
+        lines: List of original source lines
+        edit_lists: Lists of edits referring to the original lines
+    Returns:
+        New list of lines
+    Raises:
+        ValueError: If edits overlap or refer to lines that do not exist
+    """
+    by_line = {}
+    for edits in edit_lists:
+        for edit in edits:
+            if not 0 <= edit.line < len(lines):
+                raise ValueError(f"Edit refers to line {edit.line + 1}, the file has {len(lines)} lines")
+            by_line.setdefault(edit.line, []).append(edit)
+    if not by_line:
+        return list(lines)
+
+    result = []
+    for index, line in enumerate(lines):
+        edits = by_line.get(index)
+        if edits is None:
+            result.append(line)
+        else:
+            result += apply_line_edits(index, line, edits)
+    return result
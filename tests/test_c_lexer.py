@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from c_lexer import tokenize_line, PREPROCESSOR, COMMENT, BLOCK_COMMENT
+
+
+@pytest.mark.parametrize('line, directive, comment', [
+    ('#define URL "http://x" + count // c', '#define URL "http://x" + count', '// c'),
+    ("#define SLASH '/' /* c */", "#define SLASH '/'", '/* c */'),
+    ('#define S "a\\"//" x', '#define S "a\\"//" x', None),
+    ('#include <a.h> // c', '#include <a.h>', '// c'),
+])
+def test_comment_behind_directive(line, directive, comment):
+    tokens, _ = tokenize_line(line, 1)
+    assert (tokens[0].kind, tokens[0].text) == (PREPROCESSOR, directive)
+    assert [token.text for token in tokens[1:] if token.kind in (COMMENT, BLOCK_COMMENT)] == ([comment] if comment else [])
@@ -0,0 +1,46 @@
+import os
+import sys
+import shutil
+import subprocess
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from git_changes import changed_lines, in_changed_lines
+
+pytestmark = pytest.mark.skipif(shutil.which('git') is None, reason="git is not installed")
+
+
+def git(directory, *args):
+    subprocess.run(['git', '-C', str(directory), '-c', 'user.name=Test', '-c', 'user.email=test@example.com', *args],
+                   check=True, capture_output=True)
+
+
+@pytest.fixture
+def repository(tmp_path):
+    """Work tree with a committed file at top level and one in a directory named b"""
+    (tmp_path / 'b').mkdir()
+    for path in ('Main.c', os.path.join('b', 'Util.c'), 'My File.c'):
+        (tmp_path / path).write_text('int main(void)\n{\n    return 0;\n}\n')
+    git(tmp_path, 'init', '-q')
+    git(tmp_path, 'add', '.')
+    git(tmp_path, 'commit', '-q', '-m', 'initial')
+    for path in ('Main.c', os.path.join('b', 'Util.c'), 'My File.c'):
+        (tmp_path / path).write_text('int main(void)\n{\n    int x=1;\n    return 0;\n}\n')
+    return tmp_path
+
+
+@pytest.mark.parametrize('config', [None, 'diff.mnemonicPrefix', 'diff.noprefix'])
+def test_paths_ignore_prefix_settings(repository, config):
+    if config is not None:
+        git(repository, 'config', config, 'true')
+    changes = changed_lines(str(repository), 'HEAD', ('.c',))
+    assert changes == {os.path.join(str(repository), 'Main.c'): [(3, 3)],
+                       os.path.join(str(repository), 'b', 'Util.c'): [(3, 3)],
+                       os.path.join(str(repository), 'My File.c'): [(3, 3)]}
+
+
+def test_in_changed_lines():
+    ranges = [(3, 5), (9, 9)]
+    assert [line for line in range(1, 11) if in_changed_lines(line, ranges)] == [3, 4, 5, 9]
@@ -0,0 +1,118 @@
+import os
+import sys
+import random
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks'))
+
+from style_checker import check_source, split_lines
+from style_incremental import Analysis
+from corpus import generate_corpus
+
+# --------------------------
+# Test Inputs
+# --------------------------
+
+# Hand written file with block comments, preprocessor continuations, strings and initializers
+SAMPLE = '''#include <stdio.h>
+#include "Sample.h"
+
+#define MAX(a, b) \\
+    ((a) > (b) ? (a) : (b))
+
+/* file
+ * comment */
+int count = 3;
+int aiTable[] =
+{
+    1, 2, 3
+};
+
+int helper(int iValue);
+
+int main(void) {
+    char *pcText = "/* not a comment */";
+    int iResult=count+1; // trailing
+    if (iResult > 2)
+    {
+        iResult = MAX(iResult, 4);
+    }
+    return iResult;
+}
+'''
+
+# Pieces inserted into lines or added as lines, chosen to open and close comments,
+# braces, statements and directives
+SNIPPETS = ['{', '}', '/*', '*/', ' x=1;', 'int main(void)', 'int f(int a)', '#include <a.h>', '#define X \\',
+            'int count = 3;', '};', 'struct s {', ';', '"/*"', 'a+b', '// c', '(', ')', 'int arr[] =',
+            'namespace app {', 'extern "C" {', 'extern']
+
+# Edits applied to every file per seed
+EDITS = 40
+
+
+def buffers():
+    """Get the files the edits start from
+    Returns:
+        List of (file name, lines) tuples
+    """
+    files = [('Sample.c', split_lines(SAMPLE)), ('sample.h', split_lines(SAMPLE))]
+    files += generate_corpus(files=2, lines=150, density=0.3, seed=7, long_line_operators=0)
+    return files
+
+
+def join_lines(lines):
+    """Build the text of a buffer from its lines"""
+    return ''.join(line + '\n' for line in lines)
+
+
+def random_edit(rng, lines):
+    """Pick a random line range and its new lines
+    Args:
+        rng: random.Random
+        lines: Current lines of the buffer
+    Returns:
+        Tuple of (first, last, new lines) as taken by Analysis.edit
+    """
+    first = rng.randint(1, len(lines) + 1)
+    last = rng.randint(first - 1, min(len(lines), first + rng.choice([0, 0, 1, 3])))
+    new = []
+    for _ in range(rng.choice([0, 1, 1, 2, 3])):
+        if lines and rng.random() < 0.5:
+            line = rng.choice(lines)
+            if line and rng.random() < 0.7:
+                position = rng.randint(0, len(line))
+                line = line[:position] + rng.choice(SNIPPETS) + line[position:]
+            new.append(line)
+        else:
+            new.append(rng.choice(SNIPPETS))
+    return first, last, new
+
+
+# --------------------------
+# Tests
+# --------------------------
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3, 4])
+def test_random_edits_match_full_check(seed):
+    rng = random.Random(seed)
+    for filename, lines in buffers():
+        lines = list(lines)
+        analysis = Analysis(join_lines(lines), filename)
+        assert analysis.issues() == check_source(join_lines(lines), filename)
+        for step in range(EDITS):
+            first, last, new = random_edit(rng, lines)
+            analysis.edit(first, last, join_lines(new))
+            lines[first - 1:last] = new
+            text = join_lines(lines)
+            assert analysis.text() == text, (filename, step)
+            assert analysis.issues() == check_source(text, filename), (filename, step, first, last, new)
+
+
+def test_edit_outside_buffer():
+    analysis = Analysis(SAMPLE, 'Sample.c')
+    with pytest.raises(ValueError):
+        analysis.edit(len(split_lines(SAMPLE)) + 2, len(split_lines(SAMPLE)) + 1, 'int x;\n')
@@ -0,0 +1,91 @@
+import os
+import re
+import sys
+import random
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from c_lexer import iter_lines, COMMENT, BLOCK_COMMENT, OPERATOR, PUNCTUATION
+from style_checker import check_operator_spacing, SPACED_OPERATORS
+
+# --------------------------
+# Reference Implementation
+# --------------------------
+
+# Gate of the reference, any operator character in the code
+OPERATOR_CHARS_PATTERN = re.compile(r'[=+\-/&|]')
+
+# Tokens random lines are built from, including strings, chars, comments and directives
+PIECES = ['a', 'b1', '(', ')', '*', '&', '!', '&&', '||', '=', '==', '!=', '+', '-', '/', '<=', '>=', ' ', ' ',
+          '"s+t"', "'c'", '/*x*/', '//c', '*=', '&=', ',', ';', '->', '++', '--', '#', '\\', '\t', '/*', '*/']
+
+# Random lines per seed
+LINES = 20000
+
+
+def reference_issues(lines):
+    """Check operator spacing with the index-based CL5 scan the one-pass check replaced
+    The counts of pointers, parentheses, negations and ampersands in front of the
+    left operand are recounted from the token list.
+    Args:
+        lines: List of source lines without line breaks
+    Returns:
+        List of (line, column, message)
+    """
+    issues = []
+    for line in iter_lines(lines):
+        if (not OPERATOR_CHARS_PATTERN.search(line.code)
+                or not any(t.kind == OPERATOR and t.text in SPACED_OPERATORS for t in line.tokens)):
+            continue
+        text = line.text
+        tokens = [t for t in line.tokens if t.kind not in (COMMENT, BLOCK_COMMENT)]
+        pointers = parens_open = parens_close = negations = ampersands = 0
+        for k, token in enumerate(tokens):
+            if 0 < k < len(tokens) - 1 and token.kind == OPERATOR and token.text in SPACED_OPERATORS:
+                before = tokens[k - 1]
+                after = tokens[k + 1]
+                start = token.column
+                end = start + len(token.text)
+                if before.column + len(before.text) == start and after.column == end:
+                    left_space = start - 1 > 0 and text[start - 2] != ' '
+                    right_space = end + 1 < len(text) and text[end + 1] != ' '
+                    if ((left_space or right_space) and pointers % 2 == 0
+                            and parens_open % 2 == 0 and parens_close % 2 == 0
+                            and negations % 2 == 0 and ampersands % 2 == 0):
+                        issues.append((line.number, start, f"Missing spaces around operator '{token.text}' (violates CL5)"))
+            if k > 0 and tokens[k - 1].kind in (OPERATOR, PUNCTUATION):
+                previous = tokens[k - 1].text
+                pointers += previous.count('*')
+                parens_open += previous.count('(')
+                parens_close += previous.count(')')
+                negations += previous.count('!')
+                ampersands += previous.count('&')
+    return issues
+
+
+def check_issues(lines):
+    """Run the CL5 check on lines
+    Returns:
+        List of (line, column, message)
+    """
+    machine = check_operator_spacing('Test.c')
+    next(machine)
+    for line in iter_lines(lines):
+        machine.send(line)
+    return [(issue.line, issue.column, issue.message) for issue in machine.send(None)]
+
+
+# --------------------------
+# Tests
+# --------------------------
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_random_token_lines_match_reference(seed):
+    rng = random.Random(seed)
+    lines = [''.join(rng.choice(PIECES) for _ in range(rng.randrange(1, 30))) for _ in range(LINES)]
+    expected = reference_issues(lines)
+    assert expected
+    assert check_issues(lines) == expected
@@ -0,0 +1,69 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+import style_converter
+from style_checker import fix_file, check_source
+
+# A one-line block comment in front of code, which the A4 fix once joined with all following lines
+COMMENTED = '/* one */\nint main(void)\n{\n    return 0;\n}\n'
+
+
+def write(path, text):
+    with open(path, 'w', newline='') as f:
+        f.write(text)
+
+
+def read(path):
+    with open(path, newline='') as f:
+        return f.read()
+
+
+def test_fix_keeps_code_behind_one_line_comment(tmp_path, capsys):
+    path = str(tmp_path / 'Fix.c')
+    write(path, COMMENTED)
+    assert fix_file(path, ['A4']) == []
+    assert read(path) == '// one\nint main(void)\n{\n    return 0;\n}\n'
+    assert f"Fixed {path}" in capsys.readouterr().err
+
+
+def test_fix_is_not_written_if_it_changes_code(tmp_path, monkeypatch, capsys):
+    path = str(tmp_path / 'Fix.c')
+    write(path, COMMENTED)
+    # A conversion losing code, the file has to stay as it is
+    monkeypatch.setitem(style_converter.CHECKS, 'A4', lambda lines: ['// one int main(void) { return 0; }'])
+    issues = fix_file(path, ['A4'])
+    assert read(path) == COMMENTED
+    assert [issue.rule for issue in issues] == ['A4']
+    assert 'not fixing' in capsys.readouterr().err
+
+
+def test_unchanged_file_is_not_written(tmp_path, capsys):
+    path = str(tmp_path / 'Fix.c')
+    write(path, 'int main(void)\r\n{\r\n    return 0;\r\n}\r\n')
+    before = os.stat(path).st_mtime_ns
+    assert fix_file(path, ['A4', 'CL1']) == []
+    assert os.stat(path).st_mtime_ns == before
+    assert capsys.readouterr().err == ''
+
+
+def long_function(name):
+    """Source of a function with 50 lines"""
+    return f"int {name}(int x)\n{{\n" + ''.join(f"    x = x + {i};\n" for i in range(46)) + "    return x;\n}\n"
+
+
+def test_functions_in_namespaces_are_measured():
+    text = ('namespace app {\n' + long_function('run') + '}\n'
+            'extern "C" {\n' + long_function('go') + '}\n'
+            'namespace {\n' + long_function('hidden') + '}\n')
+    assert [str(issue) for issue in check_source(text, 'App.cpp', ['A6'])] == [
+        "Function 'run' has 50 lines (violates A6: 4-40 lines)",
+        "Function 'go' has 50 lines (violates A6: 4-40 lines)",
+        "Function 'hidden' has 50 lines (violates A6: 4-40 lines)",
+    ]
+
+
+def test_blocks_inside_functions_are_no_functions():
+    text = 'int main(void)\n{\n    if (x)\n    {\n        y();\n    }\n    return 0;\n}\n'
+    assert check_source(text, 'Main.c', ['A6']) == []
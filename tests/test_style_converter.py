@@ -0,0 +1,152 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from text_edits import apply_edits, replace_line, replace_text, insert_line
+import style_converter
+from style_converter import block_comment_edits, brace_edits, convert_directory, OUTPUT_IN_PLACE
+from style_converter import convert_variable_names_to_hungarian_notation
+
+
+def convert_a4(text):
+    """Apply the A4 edits to a text of lines"""
+    lines = text.split('\n')
+    return '\n'.join(apply_edits(lines, block_comment_edits(lines)))
+
+
+# --------------------------
+# A4: Block Comments
+# --------------------------
+
+
+def test_single_line_comment_is_rewritten_in_its_line():
+    assert convert_a4('/* one */\nint main(void)\n{\n    return 0;\n}') == \
+        '// one\nint main(void)\n{\n    return 0;\n}'
+
+
+def test_single_line_comment_keeps_its_indentation():
+    assert convert_a4('    /* one */\n    x = 1;') == '    // one\n    x = 1;'
+
+
+def test_single_line_comment_followed_by_code_is_kept():
+    text = '/* one */ int x;\n/* a */ /* b */\nint y;'
+    assert convert_a4(text) == text
+
+
+def test_multi_line_comment_is_joined():
+    assert convert_a4('/*\n * text\n */\nint x;') == '// text\n\nint x;'
+
+
+def test_code_behind_the_closing_line_is_kept():
+    assert convert_a4('/* a\n\n b */ int y;\nint z;') == '// a b\nint y;\nint z;'
+
+
+def test_comment_ending_in_a_later_line_swallows_no_code():
+    text = '/* one */\nint x;\nint y; /* two */'
+    assert convert_a4(text) == '// one\nint x;\nint y; /* two */'
+
+
+def test_unterminated_comment_is_kept():
+    text = '/* open\nint main(void)\n{\n}'
+    assert block_comment_edits(text.split('\n')) == []
+
+
+def test_comment_in_string_is_ignored():
+    text = 'char *s = "/*";\nint x;\n/* k */'
+    assert convert_a4(text) == 'char *s = "/*";\nint x;\n// k'
+
+
+def test_comment_after_code_is_ignored():
+    text = 'int a; /* b\n c */\nint d;'
+    assert block_comment_edits(text.split('\n')) == []
+
+
+def test_edits_refer_to_original_lines():
+    lines = ['/*', ' * a', ' */', '/* b */']
+    edits = block_comment_edits(lines)
+    assert replace_line(0, '// a') in edits
+    assert replace_line(3, '// b') in edits
+
+
+# --------------------------
+# CL1: Braces
+# --------------------------
+
+
+def test_brace_at_end_of_signature_moves_to_new_line():
+    lines = ['int main(void) {', '    return 0;', '}']
+    assert brace_edits(lines) == [replace_text(0, 15, 16, ''), insert_line(0, '{')]
+
+
+def test_brace_keeps_indentation():
+    lines = ['void f(void)', '{', '    if (x) {', '        y();', '    }', '}']
+    assert apply_edits(lines, brace_edits(lines))[2:4] == ['    if (x) ', '    {']
+
+
+@pytest.mark.parametrize('text', [
+    'int a[] = {1, 2};',
+    'if (x) { y(); }',
+    'void f(void) { // c\n}',
+    'char *s = "{";',
+    'int f(void)\n{\n}',
+])
+def test_braces_that_stay(text):
+    assert brace_edits(text.split('\n')) == []
+
+
+# --------------------------
+# DV3: Hungarian Notation
+# --------------------------
+
+
+def test_declaration_is_renamed():
+    lines = ['int count = 0;', 'count = count + 1;']
+    assert convert_variable_names_to_hungarian_notation(lines) == ['int iCount = 0;', 'iCount = iCount + 1;']
+
+
+@pytest.mark.parametrize('comment', ['// int count = 0; is the old default', '/* int count = 0; */'])
+def test_declaration_in_comment_is_ignored(comment):
+    lines = [comment, 'count = count + 1;']
+    assert convert_variable_names_to_hungarian_notation(lines) == lines
+
+
+def test_names_behind_strings_in_directives_are_renamed():
+    lines = ['int count = 0;', '#define URL "http://x" + count']
+    assert convert_variable_names_to_hungarian_notation(lines) == ['int iCount = 0;', '#define URL "http://x" + iCount']
+
+
+# --------------------------
+# In-Place Conversion
+# --------------------------
+
+
+def write(path, text):
+    with open(path, 'w', newline='') as f:
+        f.write(text)
+
+
+def read(path):
+    with open(path, newline='') as f:
+        return f.read()
+
+
+def test_in_place_round_trip(tmp_path):
+    write(tmp_path / 'Main.c', '/* one */\r\nint main(void) {\r\n    int count = 0;\r\n    return count;\r\n}\r\n')
+    write(tmp_path / 'Clean.c', 'int main(void)\n{\n    return 0;\n}')
+    assert convert_directory(str(tmp_path), ['A4', 'CL1', 'DV3'], output=OUTPUT_IN_PLACE) == (1, 1)
+    assert read(tmp_path / 'Main.c') == \
+        '// one\r\nint main(void) \r\n{\r\n    int iCount = 0;\r\n    return iCount;\r\n}\r\n'
+    assert read(tmp_path / 'Clean.c') == 'int main(void)\n{\n    return 0;\n}'
+    # A second run finds nothing left to convert
+    assert convert_directory(str(tmp_path), ['A4', 'CL1', 'DV3'], output=OUTPUT_IN_PLACE) == (0, 2)
+
+
+def test_in_place_keeps_file_if_code_changes(tmp_path, monkeypatch):
+    text = '/* one */\nint main(void)\n{\n    return 0;\n}\n'
+    write(tmp_path / 'Main.c', text)
+    monkeypatch.setitem(style_converter.CHECKS, 'A4', lambda lines: ['// one int main(void) { return 0; }'])
+    assert convert_directory(str(tmp_path), ['A4'], output=OUTPUT_IN_PLACE) == (0, 1)
+    assert read(tmp_path / 'Main.c') == text
@@ -0,0 +1,36 @@
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from style_server import ServerState, handle_request, METHOD_NOT_FOUND, INVALID_PARAMS
+
+
+def request(state, **fields):
+    """Send a request and decode its response"""
+    response = handle_request(state, json.dumps({'jsonrpc': '2.0', **fields}))
+    return None if response is None else json.loads(response)
+
+
+def test_convert_keeps_line_endings_of_file(tmp_path):
+    path = tmp_path / 'main.c'
+    with open(path, 'w', newline='') as f:
+        f.write('int main(void) {\r\n    return 0;\r\n}\r\n')
+    response = request(ServerState(), id=1, method='convert', params={'path': str(path), 'rules': ['CL1']})
+    assert response['result'] == {'filename': 'Main.c', 'text': 'int main(void) \r\n{\r\n    return 0;\r\n}\r\n'}
+
+
+def test_errors_are_returned_for_requests():
+    state = ServerState()
+    assert request(state, id=1, method='nothing')['error']['code'] == METHOD_NOT_FOUND
+    assert request(state, id=2, method='edit', params={'document': 'x'})['error']['code'] == INVALID_PARAMS
+
+
+def test_notifications_get_no_response():
+    state = ServerState()
+    assert request(state, method='stats') is None
+    assert request(state, method='nothing') is None
+    assert request(state, method='edit', params={'document': 'x'}) is None
+    assert request(state, method='check', params={'path': 'missing.c'}) is None
+    assert state.requests == 3
@@ -0,0 +1,52 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from text_edits import apply_edits, replace_text, replace_line, insert_line, delete_line
+
+
+def test_no_edits_copies_lines():
+    lines = ['a', 'b']
+    result = apply_edits(lines)
+    assert result == lines
+    assert result is not lines
+
+
+def test_edits_refer_to_original_lines():
+    lines = ['int a;', 'int b;', 'int c;']
+    edits = [delete_line(0), insert_line(1, 'int d;'), replace_text(2, 4, 5, 'e')]
+    assert apply_edits(lines, edits) == ['int b;', 'int d;', 'int e;']
+
+
+def test_spans_of_one_line_are_applied_by_column():
+    lines = ['count = count + 1;']
+    edits = [replace_text(0, 8, 13, 'iCount'), replace_text(0, 0, 5, 'iCount')]
+    assert apply_edits(lines, edits) == ['iCount = iCount + 1;']
+
+
+def test_edit_lists_of_several_rules_are_combined():
+    lines = ['/* c */', 'int f(void) {']
+    assert apply_edits(lines, [replace_line(0, '// c')], [replace_text(1, 12, 13, ''), insert_line(1, '{')]) \
+        == ['// c', 'int f(void) ', '{']
+
+
+def test_inserts_keep_their_order():
+    assert apply_edits(['x'], [insert_line(0, 'y'), insert_line(0, 'z')]) == ['x', 'y', 'z']
+
+
+def test_overlapping_spans_are_rejected():
+    with pytest.raises(ValueError):
+        apply_edits(['abcdef'], [replace_text(0, 0, 3, 'x'), replace_text(0, 2, 4, 'y')])
+
+
+def test_replaced_and_deleted_line_is_rejected():
+    with pytest.raises(ValueError):
+        apply_edits(['a', 'b'], [replace_line(1, 'c'), delete_line(1)])
+
+
+def test_edit_outside_the_lines_is_rejected():
+    with pytest.raises(ValueError):
+        apply_edits(['a'], [insert_line(1, 'b')])